@@ -0,0 +1,288 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# dependencies = ["ijson>=3.2.3", "filelock>=3.12.0", "watchfiles>=0.21"]
+# ///
+"""
+Benchmark harness for the .logging pipeline.
+
+Generates synthetic data (synth_telemetry.py) at several sizes and times each
+stage in a fresh subprocess, so peak RSS is per stage:
+
+    process      process-api-requests.process_log_file (parsed JSON fields)
+    process-raw  the same with raw=True
+    watcher      watcher.process_all over the log, then the latency of
+                 picking up single appended records
+    files        GET /api/files on server.py (first request builds the index,
+                 latency is measured on the following requests)
+    claude       process-claude-logs.convert_to_gemini_format over transcripts
+
+For every stage and size it reports records/s, MB/s, peak RSS and, where it
+applies, latency percentiles. --json writes the results for a later
+--baseline comparison; with --max-regression the exit code is 1 if any stage
+got slower than the baseline by more than that percentage.
+
+Usage:
+    uv run .logging/bench.py [--sizes 2,8,32] [--prompts 10] [--stages process,watcher]
+                             [--repeat 3] [--json results.json] [--baseline old.json]
+
+Sizes are session counts; every session has --prompts prompts.
+"""
+
+from __future__ import annotations
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+from urllib.request import urlopen
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from jsonscan import iter_values
+from pipeline_stats import peak_rss_mb
+from synth_telemetry import write_claude_logs, write_gemini_log
+
+# ---------- Configuration ----------
+STAGES = ("process", "process-raw", "watcher", "files", "claude")
+DEFAULT_SIZES = "2,8,32"
+# Records appended one by one for the watcher latency measurement
+WATCHER_APPENDS = 50
+FILES_REQUESTS = 50
+
+# ---------- Helpers ----------
+def load_script(name: str):
+    """Import a hyphenated script (process-api-requests.py) as a module."""
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), SCRIPT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def latency_summary(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+
+    def percentile(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {"count": len(ordered), "p50": percentile(0.50), "p95": percentile(0.95), "max": percentile(1.0)}
+
+# ---------- Stages (run in a child process) ----------
+def stage_process(data: Path, work: Path, raw: bool = False) -> dict:
+    module = load_script("process-api-requests")
+    log = data / "log.jsonl"
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = perf_counter()
+        stats = module.process_log_file(log, work / "requests", raw=raw)
+        seconds = perf_counter() - start
+    return {"records": stats["total_records"], "bytes": log.stat().st_size, "seconds": seconds}
+
+def stage_watcher(data: Path, work: Path) -> dict:
+    # watcher.py resolves .logging/ relative to the working directory at import
+    os.chdir(work)
+    log = work / ".logging" / "log.jsonl"
+    log.parent.mkdir(parents=True)
+    source = data / "log.jsonl"
+    with source.open("rb") as f:
+        ends = [end for _, end, _ in iter_values(f)]
+    tail = min(WATCHER_APPENDS, len(ends) - 1)
+    split = ends[-tail - 1]
+    with source.open("rb") as src, log.open("wb") as dst:
+        dst.write(src.read(split))
+        appends = [src.read(end - start) for start, end in zip(ends[-tail - 1:], ends[-tail:])]
+
+    watcher = load_script("watcher")
+    state = watcher.fresh_state()
+    writer = watcher.SessionWriter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = perf_counter()
+        state = watcher.process_all(state, writer)
+        seconds = perf_counter() - start
+
+        samples = []
+        with log.open("ab") as f:
+            for chunk in appends:
+                f.write(chunk)
+                f.flush()
+                begin = perf_counter()
+                state = watcher.process_all(state, writer)
+                samples.append(perf_counter() - begin)
+        writer.close()
+    return {"records": len(ends) - tail, "bytes": split, "seconds": seconds,
+            "latency_ms": latency_summary(samples)}
+
+def stage_files(data: Path, work: Path) -> dict:
+    # server.py serves requests/ relative to the working directory
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_script("process-api-requests").process_log_file(data / "log.jsonl", work / "requests")
+    os.chdir(work)
+    server = load_script("server")
+    httpd = server.ThreadPoolHTTPServer(("127.0.0.1", 0), server.CORSRequestHandler, 4)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/api/files"
+    try:
+        start = perf_counter()
+        with urlopen(url) as response:
+            files = json.loads(response.read())
+        seconds = perf_counter() - start
+        samples = []
+        for _ in range(FILES_REQUESTS):
+            begin = perf_counter()
+            with urlopen(url) as response:
+                response.read()
+            samples.append(perf_counter() - begin)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    size = sum(p.stat().st_size for p in (work / "requests").iterdir())
+    return {"records": len(files), "bytes": size, "seconds": seconds, "latency_ms": latency_summary(samples)}
+
+def stage_claude(data: Path, work: Path) -> dict:
+    module = load_script("process-claude-logs")
+    logs = sorted((data / "claude").rglob("*.jsonl"))
+    records = 0
+    start = perf_counter()
+    for log in logs:
+        parsed = module.parse_claude_log(log)
+        for _ in module.convert_to_gemini_format(parsed):
+            pass
+        records += parsed["event_count"]
+    seconds = perf_counter() - start
+    return {"records": records, "bytes": sum(log.stat().st_size for log in logs), "seconds": seconds}
+
+STAGE_FUNCTIONS = {
+    "process": stage_process,
+    "process-raw": lambda data, work: stage_process(data, work, raw=True),
+    "watcher": stage_watcher,
+    "files": stage_files,
+    "claude": stage_claude,
+}
+
+def run_stage_child(stage: str, data: Path):
+    """Entry point of the child process: run one stage, print its result as JSON."""
+    with tempfile.TemporaryDirectory(prefix=f"bench-{stage}-") as work:
+        result = STAGE_FUNCTIONS[stage](data, Path(work))
+        os.chdir(SCRIPT_DIR)
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+# ---------- Harness ----------
+def generate(data: Path, sessions: int, prompts: int, stages: List[str]) -> dict:
+    sizes = {}
+    if any(stage != "claude" for stage in stages):
+        sizes["gemini"] = write_gemini_log(data / "log.jsonl", sessions, prompts, metrics=True)
+    if "claude" in stages:
+        sizes["claude"] = write_claude_logs(data / "claude", sessions, prompts)
+    return sizes
+
+def measure(stage: str, data: Path, repeat: int) -> dict:
+    """Best of `repeat` child runs (highest peak RSS)."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--run-stage", stage, "--data", str(data)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run["seconds"])
+    rss = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None]
+    best["peak_rss_mb"] = max(rss) if rss else None
+    best["seconds"] = round(best["seconds"], 4)
+    best["records_per_s"] = round(best["records"] / best["seconds"], 1) if best["seconds"] else None
+    best["mb_per_s"] = round(best["bytes"] / 1e6 / best["seconds"], 2) if best["seconds"] else None
+    return best
+
+def compare(results: List[dict], baseline: List[dict]) -> Dict[tuple, float]:
+    """Percent change in seconds per (stage, sessions) against a baseline run."""
+    old = {(row["stage"], row["sessions"]): row for row in baseline}
+    changes = {}
+    for row in results:
+        before = old.get((row["stage"], row["sessions"]))
+        if before and before["seconds"]:
+            changes[(row["stage"], row["sessions"])] = round((row["seconds"] / before["seconds"] - 1) * 100, 1)
+    return changes
+
+def print_results(results: List[dict], changes: Dict[tuple, float]):
+    print(f"\n   {'stage':<12} {'sessions':>8} {'records':>9} {'MB':>8} {'s':>8} {'rec/s':>10} "
+          f"{'MB/s':>7} {'RSS MB':>7} {'p50 ms':>8} {'p95 ms':>8} {'Δ s':>7}")
+    for row in results:
+        latency = row.get("latency_ms") or {}
+        change = changes.get((row["stage"], row["sessions"]))
+        print(f"   {row['stage']:<12} {row['sessions']:>8} {row['records']:>9,} {row['bytes'] / 1e6:>8.1f} "
+              f"{row['seconds']:>8.3f} {row['records_per_s'] or 0:>10,.0f} {row['mb_per_s'] or 0:>7.1f} "
+              f"{row['peak_rss_mb'] or 0:>7.1f} {latency.get('p50', ''):>8} {latency.get('p95', ''):>8} "
+              f"{'' if change is None else f'{change:+.1f}%':>7}")
+
+# ---------- Main Function ----------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the .logging pipeline on synthetic telemetry")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated session counts (default: %(default)s)")
+    parser.add_argument("--prompts", type=int, default=10, help="Prompts per session (default: %(default)s)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage and size, best is kept (default: %(default)s)")
+    parser.add_argument("--json", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous --json output")
+    parser.add_argument("--max-regression", type=float,
+                        help="Exit with 1 if a stage is more than this many percent slower than the baseline")
+    parser.add_argument("--keep", type=Path, help="Generate data into this directory and keep it")
+    parser.add_argument("--run-stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--data", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        run_stage_child(args.run_stage, args.data)
+        return 0
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    root = args.keep or Path(tempfile.mkdtemp(prefix="bench-data-"))
+    results = []
+    try:
+        for sessions in sizes:
+            data = root / f"sessions-{sessions}"
+            print(f"🧪 Generating {sessions} sessions × {args.prompts} prompts...")
+            generated = generate(data, sessions, args.prompts, stages)
+            for kind, stats in generated.items():
+                print(f"   {kind}: {stats['records']:,} records, {stats['bytes'] / 1e6:.1f} MB")
+            for stage in stages:
+                print(f"⏱️  {stage}...")
+                results.append({"stage": stage, "sessions": sessions, "prompts": args.prompts,
+                                **measure(stage, data, args.repeat)})
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    changes = {}
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        changes = compare(results, baseline["results"])
+    print_results(results, changes)
+
+    if args.json:
+        args.json.write_text(json.dumps({"python": sys.version.split()[0], "results": results}, indent=2),
+                             encoding="utf-8")
+        print(f"\n💾 Results written to {args.json}")
+
+    if args.max_regression is not None and changes:
+        slower = {key: change for key, change in changes.items() if change > args.max_regression}
+        for (stage, sessions), change in slower.items():
+            print(f"❌ {stage} ({sessions} sessions) is {change:+.1f}% slower than the baseline")
+        if slower:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
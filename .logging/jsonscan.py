@@ -0,0 +1,110 @@
+"""
+Byte-level framing for streams of JSON values.
+
+Gemini CLI writes telemetry as pretty-printed JSON objects back-to-back, and
+session files are one JSON array of entries. Both can be huge, so instead of
+decoding everything to find where a value starts and ends, this module scans
+the raw bytes (tracking only nesting depth and string state) and yields the
+byte span of every complete object/array at a given nesting level.
+
+Callers use the spans to resume from a byte offset, to index entries, or to
+decode a single value with json.loads(). Incomplete trailing values (e.g. a
+record Gemini is still writing) are never yielded.
+
+Stdlib only, so every script in .logging can import it.
+"""
+
+from __future__ import annotations
+import re
+from typing import BinaryIO, Iterator, Tuple
+
+# Bytes that can change the scanner state. Everything else is skipped by the
+# regex engine, which keeps long string values (request_text etc.) cheap.
+_TOKEN = re.compile(rb'[\\"\[\]{}]')
+
+_BACKSLASH = 0x5C
+_QUOTE = 0x22
+_OPENERS = (0x7B, 0x5B)   # { [
+_CLOSERS = (0x7D, 0x5D)   # } ]
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def iter_values(f: BinaryIO, start: int = 0, level: int = 0,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yield (start, end, raw) for every complete object/array at `level`.
+
+    Args:
+        f: Binary file object, positioned anywhere (we seek to `start`)
+        start: Byte offset to begin scanning at; must be outside any value
+            at `level` (e.g. 0, or the `end` of a previously yielded value)
+        level: Nesting depth of the values to yield. 0 = top-level values
+            (log.jsonl records), 1 = elements of a top-level array (entries
+            of a session file)
+        chunk_size: Read size in bytes
+
+    `end` is exclusive, so `end` of one value is a valid `start` for the next
+    scan. Scalars at `level` are not yielded.
+    """
+    f.seek(start)
+    pos = start            # absolute offset of chunk[0]
+    depth = 0
+    in_str = False
+    escaped = False        # backslash was the last byte of the previous chunk
+    value_start = -1       # absolute offset of the value being collected
+    pending = []           # bytes of the current value from previous chunks
+
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        n = len(chunk)
+        i = 0
+        if escaped:
+            i = 1
+            escaped = False
+
+        while i < n:
+            m = _TOKEN.search(chunk, i)
+            if m is None:
+                break
+            j = m.start()
+            c = chunk[j]
+            i = j + 1
+
+            if in_str:
+                if c == _BACKSLASH:
+                    if i >= n:
+                        escaped = True
+                    i += 1
+                elif c == _QUOTE:
+                    in_str = False
+                continue
+
+            if c == _QUOTE:
+                in_str = True
+            elif c in _OPENERS:
+                if depth == level:
+                    value_start = pos + j
+                depth += 1
+            elif c in _CLOSERS:
+                depth -= 1
+                if depth == level and value_start >= 0:
+                    end = pos + j + 1
+                    if pending:
+                        pending.append(chunk[:j + 1])
+                        raw = b"".join(pending)
+                        pending = []
+                    else:
+                        raw = chunk[value_start - pos:j + 1]
+                    yield value_start, end, raw
+                    value_start = -1
+                elif depth < level:
+                    # Left the container holding our values (e.g. the
+                    # closing ']' of a session file); nothing more to find.
+                    return
+
+        if value_start >= 0:
+            pending.append(chunk[max(value_start - pos, 0):])
+        pos += n
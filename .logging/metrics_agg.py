@@ -0,0 +1,555 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+Rolling latency and token aggregates for Gemini CLI telemetry.
+
+Computes p50/p95/p99 latency per model (gemini_cli.api_response) and per
+function_name (gemini_cli.tool_call), token usage per type, model and
+session, and summaries of every gemini_cli.* metric (api.request.latency,
+tool.call.latency, token.usage, tool.execution.breakdown, memory.usage, ...)
+without keeping individual values around.
+
+Latencies go into LogSketch, a mergeable log-bucket quantile sketch
+(DDSketch-style, 1% relative accuracy, bounded bucket count). Data is kept in
+per-minute windows; a query merges the sketches of the last N minutes, so
+memory is bounded by the retention and not by the number of calls.
+
+Fed by:
+    server.py        log.jsonl tail and OTLP exports -> GET /api/metrics?minutes=N
+    this script      one pass over a log file:
+        uv run .logging/metrics_agg.py [--log .logging/log.jsonl] [--minutes N] [--json]
+
+Latency and token sections come from log events (exact per-call values).
+Metric data points (OTLP or metric records in log.jsonl) feed the `metrics`
+section only, so the two sources are never double counted. Cumulative
+counters and histograms are turned into deltas per series.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import math
+import sys
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from time import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from jsonscan import iter_values
+from telemetry_events import (
+    EVENT_RESPONSE, extract_attributes, get_event_name, get_event_timestamp, get_session_id,
+)
+
+# ---------- Configuration ----------
+BASE = Path(".")
+LOG_FILE = BASE / ".logging" / "log.jsonl"
+
+EVENT_TOOL_CALL = "gemini_cli.tool_call"
+
+DEFAULT_RETENTION_MINUTES = 60
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048
+# Sessions listed in token usage (most tokens first)
+MAX_SESSIONS_REPORTED = 50
+
+QUANTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+# api_response attribute -> gemini_cli.token.usage `type`
+TOKEN_FIELDS = {
+    "input_token_count": "input",
+    "output_token_count": "output",
+    "cached_content_token_count": "cache",
+    "thoughts_token_count": "thought",
+    "tool_token_count": "tool",
+}
+
+# Attributes on every log/metric; not useful as series labels
+COMMON_ATTRIBUTES = {"session.id", "installation.id", "user.email", "service.name", "service.version"}
+
+# ---------- Sketch ----------
+class LogSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees.
+
+    A value v > 0 is counted in bucket ceil(log_gamma(v)), so any quantile is
+    answered within RELATIVE_ACCURACY of the true value. Two sketches with
+    the same accuracy merge by adding bucket counts, which is what makes
+    per-minute windows (and merging them) cheap. If the bucket count exceeds
+    `max_buckets`, the lowest buckets are collapsed (low quantiles lose
+    accuracy first; p50-p99 are unaffected in practice).
+    """
+
+    __slots__ = ("gamma", "_log_gamma", "max_buckets", "buckets", "zero", "count", "sum", "min", "max")
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY, max_buckets: int = MAX_BUCKETS):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets: Dict[int, float] = {}
+        self.zero = 0.0
+        self.count = 0.0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: float = 1):
+        if count <= 0 or value is None or math.isnan(value):
+            return
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero += count
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other: "LogSketch"):
+        if other.count == 0:
+            return
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.max_buckets
+        lowest = keys[excess]
+        for key in keys[:excess]:
+            self.buckets[lowest] += self.buckets.pop(key)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return max(self.min, 0.0)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        if self.count == 0:
+            return {"count": 0}
+        result = {
+            "count": round(self.count),
+            "mean": round(self.sum / self.count, 3),
+            "min": round(self.min, 3),
+            "max": round(self.max, 3),
+        }
+        for name, q in QUANTILES:
+            result[name] = round(self.quantile(q), 3)
+        return result
+
+def add_histogram(sketch: LogSketch, bounds: List[float], counts: List[float],
+                  low: Optional[float] = None, high: Optional[float] = None):
+    """
+    Add pre-bucketed histogram counts (explicit bounds) to a sketch, each
+    bucket represented by its midpoint (clamped to the histogram min/max).
+    """
+    for i, count in enumerate(counts):
+        if not count:
+            continue
+        lower = bounds[i - 1] if i > 0 else (low if low is not None else 0.0)
+        upper = bounds[i] if i < len(bounds) else (high if high is not None else lower)
+        value = (lower + upper) / 2
+        if low is not None:
+            value = max(value, low)
+        if high is not None:
+            value = min(value, high)
+        sketch.add(value, count)
+
+# ---------- Input Normalization ----------
+def _minute(timestamp) -> int:
+    """Minute bucket of an ISO timestamp (arrival time if missing/invalid)."""
+    if isinstance(timestamp, str):
+        try:
+            return int(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp() // 60)
+        except ValueError:
+            pass
+    return int(time() // 60)
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def series_label(attributes: dict) -> str:
+    """Stable label for a metric series: its non-common attributes."""
+    parts = [f"{k}={attributes[k]}" for k in sorted(attributes) if k not in COMMON_ATTRIBUTES]
+    return ",".join(parts) or "all"
+
+def _hr_time_to_iso(hr_time) -> Optional[str]:
+    """OpenTelemetry JS HrTime [seconds, nanos] -> ISO timestamp."""
+    if isinstance(hr_time, list) and len(hr_time) == 2:
+        dt = datetime.fromtimestamp(hr_time[0] + hr_time[1] / 1e9, tz=timezone.utc)
+        return dt.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    return None
+
+# OpenTelemetry JS enums as written by Gemini's file exporter
+_JS_DATA_POINT_KINDS = {0: "histogram", 1: "exponentialHistogram", 2: "gauge", 3: "sum"}
+_JS_TEMPORALITY = {0: "delta", 1: "cumulative"}
+
+def file_metric_points(record: dict) -> List[dict]:
+    """
+    Metric records in log.jsonl (OpenTelemetry JS ResourceMetrics / metric
+    data as Gemini's file exporter writes them) -> flattened points like
+    otlp_receiver.flatten_metrics(). Returns [] for other records.
+    """
+    if "scopeMetrics" in record:
+        metrics = [m for scope in record.get("scopeMetrics") or [] for m in scope.get("metrics") or []]
+    elif "descriptor" in record and "dataPoints" in record:
+        metrics = [record]
+    else:
+        return []
+
+    points = []
+    for metric in metrics:
+        descriptor = metric.get("descriptor") or {}
+        kind = _JS_DATA_POINT_KINDS.get(metric.get("dataPointType"))
+        if kind is None:
+            continue
+        for dp in metric.get("dataPoints") or []:
+            point = {
+                "name": descriptor.get("name", ""),
+                "unit": descriptor.get("unit"),
+                "kind": kind,
+                "temporality": _JS_TEMPORALITY.get(metric.get("aggregationTemporality")),
+                "timestamp": _hr_time_to_iso(dp.get("endTime")),
+                "attributes": dp.get("attributes") or {},
+            }
+            value = dp.get("value")
+            if isinstance(value, dict):
+                point["count"] = value.get("count", 0)
+                point["sum"] = value.get("sum")
+                point["min"] = value.get("min")
+                point["max"] = value.get("max")
+                buckets = value.get("buckets") or {}
+                point["explicitBounds"] = buckets.get("boundaries") or []
+                point["bucketCounts"] = buckets.get("counts") or []
+            else:
+                point["value"] = value
+            points.append(point)
+    return points
+
+# ---------- Aggregator ----------
+class _Window:
+    __slots__ = ("sketches", "counters")
+
+    def __init__(self):
+        self.sketches: Dict[tuple, LogSketch] = {}
+        self.counters: Counter = Counter()
+
+class MetricsAggregator:
+    """
+    Thread-safe rolling aggregates over telemetry records and metric points.
+
+    Keys:
+        ("api", model)                latency sketch from api_response duration_ms
+        ("tool", function_name)       latency sketch from tool_call duration_ms
+        ("tokens", type)              counter
+        ("tokens_model", model, type) counter
+        ("tokens_session", sid, type) counter
+        ("metric", name, label)       sketch (histograms, gauges) or counter (sums)
+    """
+
+    def __init__(self, retention_minutes: int = DEFAULT_RETENTION_MINUTES):
+        self.retention_minutes = retention_minutes
+        self._windows: "OrderedDict[int, _Window]" = OrderedDict()
+        self._metric_info: Dict[str, dict] = {}
+        # Last cumulative state per series, to turn cumulative points into deltas
+        self._cumulative: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    # ----- input -----
+    def add_record(self, record: dict):
+        """Feed one telemetry record (log.jsonl object or flattened OTLP log record)."""
+        if not isinstance(record, dict):
+            return
+        points = file_metric_points(record)
+        if points:
+            for point in points:
+                self.add_point(point)
+            return
+
+        event_name = get_event_name(record)
+        if event_name not in (EVENT_RESPONSE, EVENT_TOOL_CALL):
+            return
+        attrs = extract_attributes(record)
+        minute = _minute(get_event_timestamp(record))
+        duration = _number(attrs.get("duration_ms"))
+        with self._lock:
+            window = self._window(minute)
+            if event_name == EVENT_TOOL_CALL:
+                if duration is not None:
+                    self._sketch(window, ("tool", attrs.get("function_name") or "unknown")).add(duration)
+                return
+
+            model = attrs.get("model") or "unknown"
+            if duration is not None:
+                self._sketch(window, ("api", model)).add(duration)
+            session_id = get_session_id(attrs)
+            for field, token_type in TOKEN_FIELDS.items():
+                tokens = _number(attrs.get(field))
+                if not tokens:
+                    continue
+                window.counters[("tokens", token_type)] += tokens
+                window.counters[("tokens_model", model, token_type)] += tokens
+                if session_id:
+                    window.counters[("tokens_session", session_id, token_type)] += tokens
+
+    def add_point(self, point: dict):
+        """Feed one flattened metric data point (see otlp_receiver.flatten_metrics)."""
+        name = point.get("name")
+        if not name:
+            return
+        attributes = point.get("attributes") or {}
+        label = series_label(attributes)
+        key = ("metric", name, label)
+        kind = point.get("kind") or ("sum" if "value" in point else "histogram")
+        minute = _minute(point.get("timestamp"))
+
+        with self._lock:
+            self._metric_info.setdefault(name, {"kind": kind, "unit": point.get("unit")})
+            delta = self._delta(name, label, point)
+            if delta is None:
+                return
+            window = self._window(minute)
+            if kind in ("sum", "gauge"):
+                value = _number(delta.get("value"))
+                if value is None:
+                    return
+                if kind == "sum":
+                    window.counters[key] += value
+                else:
+                    self._sketch(window, key).add(value)
+            elif delta.get("bucketCounts"):
+                sketch = self._sketch(window, key)
+                sum_before = sketch.sum
+                add_histogram(sketch, delta.get("explicitBounds") or [],
+                              delta["bucketCounts"], point.get("min"), point.get("max"))
+                if _number(delta.get("sum")) is not None:
+                    # Keep the exact sum (and so the mean) instead of the midpoints'
+                    sketch.sum = sum_before + _number(delta["sum"])
+            elif delta.get("count"):
+                # Summary / exponential histogram: only count and sum are known
+                self._sketch(window, key).add(delta.get("sum", 0) / delta["count"], delta["count"])
+
+    def _delta(self, name: str, label: str, point: dict) -> Optional[dict]:
+        """Delta part of a point; cumulative points are diffed against the last one."""
+        if point.get("kind") == "gauge" or point.get("temporality") != "cumulative":
+            return point
+
+        series = (name, label)
+        last = self._cumulative.get(series)
+        self._cumulative[series] = point
+        if "value" in point:
+            value = _number(point["value"])
+            if value is None:
+                return None
+            previous = _number(last.get("value")) if last else None
+            # First sight of a series or a counter reset: the value is the delta
+            return {"value": value - previous if previous is not None and value >= previous else value}
+
+        count = _number(point.get("count")) or 0
+        previous_count = (_number(last.get("count")) or 0) if last else 0
+        if not last or count < previous_count or last.get("explicitBounds") != point.get("explicitBounds"):
+            return point
+        counts = point.get("bucketCounts") or []
+        previous_counts = last.get("bucketCounts") or []
+        return {
+            "count": count - previous_count,
+            "sum": (_number(point.get("sum")) or 0) - (_number(last.get("sum")) or 0),
+            "explicitBounds": point.get("explicitBounds"),
+            "bucketCounts": [c - p for c, p in zip(counts, previous_counts)] if previous_counts else counts,
+        }
+
+    def _window(self, minute: int) -> _Window:
+        window = self._windows.get(minute)
+        if window is None:
+            out_of_order = bool(self._windows) and minute < next(reversed(self._windows))
+            window = self._windows[minute] = _Window()
+            if out_of_order:
+                # e.g. records of an older session appended late
+                self._windows = OrderedDict(sorted(self._windows.items()))
+            newest = next(reversed(self._windows))
+            while next(iter(self._windows)) <= newest - self.retention_minutes:
+                self._windows.popitem(last=False)
+        return self._windows.get(minute) or _Window()
+
+    @staticmethod
+    def _sketch(window: _Window, key: tuple) -> LogSketch:
+        sketch = window.sketches.get(key)
+        if sketch is None:
+            sketch = window.sketches[key] = LogSketch()
+        return sketch
+
+    # ----- output -----
+    def snapshot(self, minutes: Optional[int] = None) -> dict:
+        """
+        Merge the windows of the last `minutes` minutes (default: retention),
+        counted back from the most recent window with data.
+        """
+        minutes = min(minutes or self.retention_minutes, self.retention_minutes)
+        sketches: Dict[tuple, LogSketch] = {}
+        counters: Counter = Counter()
+        with self._lock:
+            if self._windows:
+                newest = next(reversed(self._windows))
+                for minute, window in self._windows.items():
+                    if minute <= newest - minutes:
+                        continue
+                    for key, sketch in window.sketches.items():
+                        merged = sketches.get(key)
+                        if merged is None:
+                            merged = sketches[key] = LogSketch()
+                        merged.merge(sketch)
+                    counters.update(window.counters)
+                start = max(next(iter(self._windows)), newest - minutes + 1)
+                window_range = [_minute_iso(start), _minute_iso(newest + 1)]
+            else:
+                window_range = None
+            metric_info = dict(self._metric_info)
+
+        latency = {"api": {}, "tool": {}}
+        metrics: Dict[str, dict] = {}
+        for key, sketch in sorted(sketches.items()):
+            if key[0] in latency:
+                latency[key[0]][key[1]] = sketch.summary()
+            else:
+                _metric_entry(metrics, metric_info, key[1])["series"][key[2]] = sketch.summary()
+
+        tokens = {"by_type": {}, "by_model": {}, "by_session": {}}
+        session_totals: Counter = Counter()
+        for key, value in sorted(counters.items()):
+            if key[0] == "tokens":
+                tokens["by_type"][key[1]] = round(value)
+            elif key[0] == "tokens_model":
+                tokens["by_model"].setdefault(key[1], {})[key[2]] = round(value)
+            elif key[0] == "tokens_session":
+                session_totals[key[1]] += value
+            elif key[0] == "metric":
+                _metric_entry(metrics, metric_info, key[1])["series"][key[2]] = {"total": round(value, 3)}
+        for session_id, _ in session_totals.most_common(MAX_SESSIONS_REPORTED):
+            tokens["by_session"][session_id] = {
+                token_type: round(counters[("tokens_session", session_id, token_type)])
+                for token_type in TOKEN_FIELDS.values()
+                if counters[("tokens_session", session_id, token_type)]
+            }
+
+        return {
+            "minutes": minutes,
+            "window": window_range,
+            "latency_ms": latency,
+            "tokens": tokens,
+            "metrics": metrics,
+        }
+
+def _metric_entry(metrics: dict, metric_info: dict, name: str) -> dict:
+    entry = metrics.get(name)
+    if entry is None:
+        info = metric_info.get(name, {})
+        entry = metrics[name] = {"kind": info.get("kind"), "unit": info.get("unit"), "series": {}}
+    return entry
+
+def _minute_iso(minute: int) -> str:
+    return datetime.fromtimestamp(minute * 60, tz=timezone.utc).strftime("%Y-%m-%dT%H:%MZ")
+
+# ---------- Report ----------
+def aggregate_log(log_path: Path, retention_minutes: int) -> MetricsAggregator:
+    """Single pass over a log file."""
+    aggregator = MetricsAggregator(retention_minutes)
+    with log_path.open("rb") as f:
+        for _, _, raw in iter_values(f):
+            try:
+                aggregator.add_record(json.loads(raw))
+            except ValueError:
+                continue
+    return aggregator
+
+def _format_summary(name: str, summary: dict) -> str:
+    if not summary.get("count"):
+        return f"   {name:<32} -"
+    return (f"   {name:<32} n={summary['count']:<6} p50={summary['p50']:>9.1f}  "
+            f"p95={summary['p95']:>9.1f}  p99={summary['p99']:>9.1f}  max={summary['max']:>9.1f}")
+
+def print_report(snapshot: dict):
+    window = snapshot["window"]
+    print(f"📊 Telemetry metrics ({window[0]} – {window[1]})" if window else "📊 Telemetry metrics (no data)")
+    sections: Iterable[Tuple[str, dict]] = (
+        ("API latency per model (ms)", snapshot["latency_ms"]["api"]),
+        ("Tool latency per function (ms)", snapshot["latency_ms"]["tool"]),
+    )
+    for title, rows in sections:
+        print(f"\n⏱️  {title}")
+        for name, summary in rows.items():
+            print(_format_summary(name, summary))
+        if not rows:
+            print("   -")
+
+    tokens = snapshot["tokens"]
+    print("\n🔢 Tokens per type")
+    for token_type, value in tokens["by_type"].items():
+        print(f"   {token_type:<32} {value:,}")
+    print("\n🔢 Tokens per session")
+    for session_id, by_type in tokens["by_session"].items():
+        print(f"   {session_id:<40} {sum(by_type.values()):>10,}  {by_type}")
+
+    if snapshot["metrics"]:
+        print("\n📈 Metrics")
+        for name, entry in snapshot["metrics"].items():
+            unit = f" ({entry['unit']})" if entry.get("unit") else ""
+            print(f"   {name}{unit}")
+            for label, summary in entry["series"].items():
+                if "total" in summary:
+                    print(f"      {label:<30} total={summary['total']:,}")
+                else:
+                    print("   " + _format_summary(label, summary))
+
+# ---------- Main Function ----------
+def main():
+    parser = argparse.ArgumentParser(description="Latency percentiles and token usage from Gemini CLI telemetry")
+    parser.add_argument("--log", type=Path, default=LOG_FILE, help=f"Telemetry log (default: {LOG_FILE})")
+    parser.add_argument("--minutes", type=int, default=DEFAULT_RETENTION_MINUTES,
+                        help="Aggregate the last N minutes of data (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="Print the snapshot as JSON")
+    args = parser.parse_args()
+
+    if not args.log.exists():
+        print(f"❌ Log file not found: {args.log}")
+        return 1
+
+    snapshot = aggregate_log(args.log, args.minutes).snapshot(args.minutes)
+    if args.json:
+        print(json.dumps(snapshot, indent=2, ensure_ascii=False))
+    else:
+        print_report(snapshot)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
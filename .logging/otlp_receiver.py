@@ -0,0 +1,732 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+OTLP/HTTP receiver for Gemini CLI telemetry.
+
+Instead of letting Gemini CLI write pretty-printed records to
+.logging/log.jsonl (which the processor and watcher then re-read, and which
+has to be truncated while Gemini may still be writing), Gemini can export
+straight to this receiver:
+
+    .gemini/settings.json
+    {
+      "telemetry": {
+        "enabled": true,
+        "target": "local",
+        "otlpEndpoint": "http://localhost:4318",
+        "otlpProtocol": "http",
+        "logPrompts": true
+      }
+    }
+
+Log records are flattened to the same shape as the records in log.jsonl
+({"attributes": {...}, ...}), reduced to ops with record_to_op() and grouped
+by session and prompt_id into .logging/requests/ session files via
+SessionStore, like process-api-requests.py does. Every export request is one
+batch: its entries are written (and the telemetry database flushed) before
+the exporter gets its 200, so acknowledged data is on disk. Session files are
+written under process-api-requests.py's .process.lock, so the two never
+update the same files at once.
+
+Malformed requests get 400 (not retried by exporters); when the batch cannot
+be stored (disk full, permissions, lock held too long, database errors) the
+answer is 503, so the exporter retries it later.
+
+Endpoints (OTLP/HTTP, JSON or protobuf, optionally gzip-encoded):
+    POST /v1/logs     -> session files (+ telemetry.db with --db)
+    POST /v1/metrics  -> telemetry.db metric_points with --db
+    POST /v1/traces   -> accepted and discarded
+
+The same endpoints are mounted in server.py, so the viewer server can be the
+exporter target. Standalone:
+
+    uv run .logging/otlp_receiver.py [--port 4318] [--host localhost] [--db [PATH]]
+
+Stdlib only: the protobuf messages are decoded with a minimal wire-format
+reader that knows just the OTLP fields used here.
+"""
+
+from __future__ import annotations
+import argparse
+import base64
+import json
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from session_archive import open_session_store
+from session_store import get_existing_sessions, session_file_path
+from telemetry_db import DEFAULT_DB_FILE, TelemetryDB
+from telemetry_events import record_to_op
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ---------- Configuration ----------
+BASE = Path(".")
+DEFAULT_OUTPUT_DIR = BASE / ".logging" / "requests"
+DEFAULT_PORT = 4318
+
+LOGS_PATH = "/v1/logs"
+METRICS_PATH = "/v1/metrics"
+TRACES_PATH = "/v1/traces"
+OTLP_PATHS = (LOGS_PATH, METRICS_PATH, TRACES_PATH)
+
+# Largest (decompressed) export request accepted
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+# process-api-requests.py's lock file, next to the requests/ directory
+PROCESS_LOCK_NAME = ".process.lock"
+# Seconds to wait for the processor before answering 503
+LOCK_TIMEOUT = 10
+
+# ---------- Protobuf Wire Format ----------
+_VARINT, _I64, _LEN, _I32 = 0, 1, 2, 5
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+def _fields(buf: bytes) -> Iterator[Tuple[int, int, object]]:
+    """Yield (field_number, wire_type, value) for each field of a message."""
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == _VARINT:
+            value, pos = _read_varint(buf, pos)
+        elif wire_type == _I64:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire_type == _LEN:
+            length, pos = _read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == _I32:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"unsupported wire type {wire_type}")
+        if pos > end:
+            raise ValueError("truncated message")
+        yield number, wire_type, value
+
+def _signed64(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _fixed64(raw: bytes) -> int:
+    return struct.unpack("<Q", raw)[0]
+
+def _double(raw: bytes) -> float:
+    return struct.unpack("<d", raw)[0]
+
+def _packed(wire_type: int, value, item: str) -> list:
+    """Repeated fixed64/double field, packed or not."""
+    if wire_type == _LEN:
+        return list(struct.unpack(f"<{len(value) // 8}{item}", value))
+    return [struct.unpack(f"<{item}", value)[0]]
+
+# Decoders below build the OTLP/JSON mapping of each message, so protobuf
+# and JSON payloads share one flattening path.
+
+def _pb_any_value(buf: bytes) -> dict:
+    for number, wire_type, value in _fields(buf):
+        if number == 1:
+            return {"stringValue": value.decode("utf-8", "replace")}
+        if number == 2:
+            return {"boolValue": bool(value)}
+        if number == 3:
+            return {"intValue": _signed64(value)}
+        if number == 4:
+            return {"doubleValue": _double(value)}
+        if number == 5:
+            return {"arrayValue": {"values": [_pb_any_value(v) for n, _, v in _fields(value) if n == 1]}}
+        if number == 6:
+            return {"kvlistValue": {"values": [_pb_key_value(v) for n, _, v in _fields(value) if n == 1]}}
+        if number == 7:
+            return {"bytesValue": base64.b64encode(value).decode("ascii")}
+    return {}
+
+def _pb_key_value(buf: bytes) -> dict:
+    kv = {"key": "", "value": {}}
+    for number, _, value in _fields(buf):
+        if number == 1:
+            kv["key"] = value.decode("utf-8", "replace")
+        elif number == 2:
+            kv["value"] = _pb_any_value(value)
+    return kv
+
+def _pb_attributes_holder(buf: bytes, attributes_field: int = 1) -> dict:
+    """Resource / InstrumentationScope: just name and attributes."""
+    msg = {"attributes": []}
+    for number, _, value in _fields(buf):
+        if number == attributes_field:
+            msg["attributes"].append(_pb_key_value(value))
+        elif number == 1:
+            msg["name"] = value.decode("utf-8", "replace")
+    return msg
+
+def _pb_log_record(buf: bytes) -> dict:
+    record = {"attributes": []}
+    for number, _, value in _fields(buf):
+        if number == 1:
+            record["timeUnixNano"] = _fixed64(value)
+        elif number == 11:
+            record["observedTimeUnixNano"] = _fixed64(value)
+        elif number == 2:
+            record["severityNumber"] = value
+        elif number == 3:
+            record["severityText"] = value.decode("utf-8", "replace")
+        elif number == 5:
+            record["body"] = _pb_any_value(value)
+        elif number == 6:
+            record["attributes"].append(_pb_key_value(value))
+        elif number == 12:
+            record["eventName"] = value.decode("utf-8", "replace")
+    return record
+
+def decode_logs_request(buf: bytes) -> dict:
+    """ExportLogsServiceRequest (protobuf) -> OTLP/JSON mapping."""
+    resource_logs = []
+    for number, _, rl in _fields(buf):
+        if number != 1:
+            continue
+        entry = {"resource": {"attributes": []}, "scopeLogs": []}
+        for n, _, value in _fields(rl):
+            if n == 1:
+                entry["resource"] = _pb_attributes_holder(value)
+            elif n == 2:
+                scope_logs = {"scope": {}, "logRecords": []}
+                for m, _, v in _fields(value):
+                    if m == 1:
+                        scope_logs["scope"] = _pb_attributes_holder(v, attributes_field=3)
+                    elif m == 2:
+                        scope_logs["logRecords"].append(_pb_log_record(v))
+                entry["scopeLogs"].append(scope_logs)
+        resource_logs.append(entry)
+    return {"resourceLogs": resource_logs}
+
+def _pb_number_point(buf: bytes) -> dict:
+    """NumberDataPoint (gauge and sum)."""
+    point = {"attributes": []}
+    for number, _, value in _fields(buf):
+        if number == 7:
+            point["attributes"].append(_pb_key_value(value))
+        elif number == 3:
+            point["timeUnixNano"] = _fixed64(value)
+        elif number == 4:
+            point["asDouble"] = _double(value)
+        elif number == 6:
+            point["asInt"] = _signed64(_fixed64(value))
+    return point
+
+def _pb_distribution_point(buf: bytes, fields: Dict[int, str]) -> dict:
+    """
+    Histogram, exponential histogram and summary data points: attributes,
+    time, count and sum (plus min/max/buckets where `fields` maps them).
+    """
+    point = {"attributes": []}
+    for number, wire_type, value in _fields(buf):
+        name = fields.get(number)
+        if name == "attributes":
+            point["attributes"].append(_pb_key_value(value))
+        elif name in ("timeUnixNano", "count"):
+            point[name] = _fixed64(value)
+        elif name in ("sum", "min", "max"):
+            point[name] = _double(value)
+        elif name == "bucketCounts":
+            point.setdefault(name, []).extend(_packed(wire_type, value, "Q"))
+        elif name == "explicitBounds":
+            point.setdefault(name, []).extend(_packed(wire_type, value, "d"))
+    return point
+
+_HISTOGRAM_POINT = {9: "attributes", 3: "timeUnixNano", 4: "count", 5: "sum",
+                    6: "bucketCounts", 7: "explicitBounds", 11: "min", 12: "max"}
+_EXPONENTIAL_HISTOGRAM_POINT = {1: "attributes", 3: "timeUnixNano", 4: "count", 5: "sum",
+                                12: "min", 13: "max"}
+_SUMMARY_POINT = {7: "attributes", 3: "timeUnixNano", 4: "count", 5: "sum"}
+
+# Metric field number -> (JSON name, data point decoder)
+_METRIC_DATA = {
+    5: ("gauge", _pb_number_point),
+    7: ("sum", _pb_number_point),
+    9: ("histogram", lambda buf: _pb_distribution_point(buf, _HISTOGRAM_POINT)),
+    10: ("exponentialHistogram", lambda buf: _pb_distribution_point(buf, _EXPONENTIAL_HISTOGRAM_POINT)),
+    11: ("summary", lambda buf: _pb_distribution_point(buf, _SUMMARY_POINT)),
+}
+
+def _pb_metric(buf: bytes) -> dict:
+    metric = {}
+    for number, _, value in _fields(buf):
+        if number == 1:
+            metric["name"] = value.decode("utf-8", "replace")
+        elif number == 3:
+            metric["unit"] = value.decode("utf-8", "replace")
+        elif number in _METRIC_DATA:
+            kind, decode_point = _METRIC_DATA[number]
+            data = {"dataPoints": []}
+            for n, _, v in _fields(value):
+                if n == 1:
+                    data["dataPoints"].append(decode_point(v))
+                elif n == 2 and kind != "summary":
+                    data["aggregationTemporality"] = v
+            metric[kind] = data
+    return metric
+
+def decode_metrics_request(buf: bytes) -> dict:
+    """ExportMetricsServiceRequest (protobuf) -> OTLP/JSON mapping."""
+    resource_metrics = []
+    for number, _, rm in _fields(buf):
+        if number != 1:
+            continue
+        entry = {"resource": {"attributes": []}, "scopeMetrics": []}
+        for n, _, value in _fields(rm):
+            if n == 1:
+                entry["resource"] = _pb_attributes_holder(value)
+            elif n == 2:
+                entry["scopeMetrics"].append({
+                    "metrics": [_pb_metric(v) for m, _, v in _fields(value) if m == 2]
+                })
+        resource_metrics.append(entry)
+    return {"resourceMetrics": resource_metrics}
+
+# ---------- Flattening ----------
+def any_value(value: Optional[dict]):
+    """OTLP AnyValue (JSON mapping) -> plain Python value."""
+    if not isinstance(value, dict):
+        return value
+    if "stringValue" in value:
+        return value["stringValue"]
+    if "intValue" in value:
+        # JSON mapping encodes int64 as a string
+        return int(value["intValue"])
+    if "doubleValue" in value:
+        return float(value["doubleValue"])
+    if "boolValue" in value:
+        return bool(value["boolValue"])
+    if "arrayValue" in value:
+        return [any_value(v) for v in value["arrayValue"].get("values", [])]
+    if "kvlistValue" in value:
+        return attributes_dict(value["kvlistValue"].get("values", []))
+    if "bytesValue" in value:
+        return value["bytesValue"]
+    return None
+
+def attributes_dict(attributes: Optional[list]) -> dict:
+    """OTLP KeyValue list -> {key: value}."""
+    return {kv.get("key", ""): any_value(kv.get("value")) for kv in attributes or []}
+
+def nanos_to_iso(nanos) -> Optional[str]:
+    """Unix nanoseconds (int or JSON string) -> ISO 8601 UTC, like event.timestamp."""
+    try:
+        nanos = int(nanos)
+    except (TypeError, ValueError):
+        return None
+    if nanos <= 0:
+        return None
+    dt = datetime.fromtimestamp(nanos / 1e9, tz=timezone.utc)
+    return dt.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+def flatten_logs(payload: dict) -> List[dict]:
+    """
+    ExportLogsServiceRequest (JSON mapping) -> records shaped like the
+    objects Gemini CLI writes to log.jsonl.
+    """
+    records = []
+    for resource_logs in payload.get("resourceLogs") or []:
+        resource = attributes_dict((resource_logs.get("resource") or {}).get("attributes"))
+        for scope_logs in resource_logs.get("scopeLogs") or []:
+            scope = (scope_logs.get("scope") or {}).get("name")
+            for log_record in scope_logs.get("logRecords") or []:
+                attributes = attributes_dict(log_record.get("attributes"))
+                if log_record.get("eventName") and "event.name" not in attributes:
+                    attributes["event.name"] = log_record["eventName"]
+                records.append({
+                    "timestamp": nanos_to_iso(log_record.get("timeUnixNano"))
+                                 or nanos_to_iso(log_record.get("observedTimeUnixNano")),
+                    "severityText": log_record.get("severityText"),
+                    "body": any_value(log_record.get("body")),
+                    "attributes": attributes,
+                    "resource": resource,
+                    "scope": scope,
+                })
+    return records
+
+def _number(point: dict):
+    if "asDouble" in point:
+        return float(point["asDouble"])
+    if "asInt" in point:
+        return int(point["asInt"])
+    return None
+
+# AggregationTemporality enum (numeric in protobuf, either form in JSON)
+_TEMPORALITY = {1: "delta", 2: "cumulative",
+                "AGGREGATION_TEMPORALITY_DELTA": "delta",
+                "AGGREGATION_TEMPORALITY_CUMULATIVE": "cumulative"}
+
+def flatten_metrics(payload: dict) -> List[dict]:
+    """
+    ExportMetricsServiceRequest (JSON mapping) -> one dict per data point:
+    {name, unit, kind, temporality, timestamp, attributes, value} for
+    sums/gauges and {..., count, sum, ...} for histograms and summaries.
+    Resource attributes are merged under the point's attributes.
+    """
+    points = []
+    for resource_metrics in payload.get("resourceMetrics") or []:
+        resource = attributes_dict((resource_metrics.get("resource") or {}).get("attributes"))
+        for scope_metrics in resource_metrics.get("scopeMetrics") or []:
+            for metric in scope_metrics.get("metrics") or []:
+                for kind in ("sum", "gauge", "histogram", "exponentialHistogram", "summary"):
+                    data = metric.get(kind)
+                    if not isinstance(data, dict):
+                        continue
+                    for dp in data.get("dataPoints") or []:
+                        point = {
+                            "name": metric.get("name", ""),
+                            "unit": metric.get("unit"),
+                            "kind": kind,
+                            "temporality": _TEMPORALITY.get(data.get("aggregationTemporality")),
+                            "timestamp": nanos_to_iso(dp.get("timeUnixNano")),
+                            "attributes": {**resource, **attributes_dict(dp.get("attributes"))},
+                        }
+                        if kind in ("sum", "gauge"):
+                            point["value"] = _number(dp)
+                        else:
+                            point["count"] = int(dp.get("count", 0))
+                            point["sum"] = float(dp["sum"]) if "sum" in dp else None
+                            for key in ("min", "max"):
+                                if key in dp:
+                                    point[key] = float(dp[key])
+                            # JSON mapping encodes fixed64 counts as strings
+                            if "bucketCounts" in dp:
+                                point["bucketCounts"] = [int(c) for c in dp["bucketCounts"]]
+                            if "explicitBounds" in dp:
+                                point["explicitBounds"] = [float(b) for b in dp["explicitBounds"]]
+                        points.append(point)
+    return points
+
+# ---------- Session Files ----------
+@contextmanager
+def process_lock(path: Path, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+    """
+    Hold the lock file process-api-requests.py takes with filelock.FileLock.
+
+    filelock locks the open file with flock (Unix) or msvcrt.locking
+    (Windows); taking the same OS lock here keeps this module stdlib-only.
+    Raises TimeoutError (an OSError) if it is not free within `timeout`.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"{path} is held by another process")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+class SessionSink:
+    """
+    Groups ops by session and prompt_id and writes them to session files.
+
+    Each batch reopens the touched session files (the sidecar index makes
+    that cheap) instead of keeping them open, so process-api-requests.py
+    and the viewer's rename/delete can work on the same directory. Batches
+    are written under the processor's lock file (see process_lock).
+    """
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.lock_file = output_dir.parent / PROCESS_LOCK_NAME
+        self._paths: Optional[Dict[str, Path]] = None
+
+    def _path_for(self, session_id: str, first_timestamp: Optional[str]) -> Path:
+        if self._paths is None or not self._paths.get(session_id, Path()).exists():
+            # First use, new session or renamed/deleted in the viewer
+            self._paths = get_existing_sessions(self.output_dir)
+        path = self._paths.get(session_id)
+        if path is None:
+            path = session_file_path(session_id, first_timestamp or "", self.output_dir)
+            self._paths[session_id] = path
+        return path
+
+    def write(self, ops: List[Optional[tuple]]) -> Dict[str, int]:
+        """Merge a batch of ops into the session files; returns stats."""
+        stats = {"requests": 0, "responses": 0, "errors": 0, "skipped": 0,
+                 "sessions_created": 0, "sessions_updated": 0}
+
+        # session_id -> [first_timestamp, {prompt_id: {kind: payload}}]
+        sessions: Dict[str, list] = OrderedDict()
+        for op in ops:
+            if op is None:
+                stats["skipped"] += 1
+                continue
+            session_id, prompt_id, timestamp, kind, payload = op
+            session = sessions.setdefault(session_id, [timestamp, OrderedDict()])
+            if session[0] is None:
+                session[0] = timestamp
+            updates = session[1].setdefault(prompt_id, {})
+            if kind is None:
+                stats["skipped"] += 1
+                continue
+            updates[kind] = payload
+            stats[kind + "s"] += 1
+
+        if not sessions:
+            return stats
+        with process_lock(self.lock_file):
+            for session_id, (first_timestamp, prompts) in sessions.items():
+                store = open_session_store(self._path_for(session_id, first_timestamp))
+                for prompt_id, updates in prompts.items():
+                    entry = store.get(prompt_id)
+                    if entry is not None and not updates:
+                        continue
+                    entry = entry or {"request": None, "response": None, "error": None}
+                    entry.update(updates)
+                    store.upsert(prompt_id, entry)
+                store.close()
+                stats["sessions_created" if store.created else "sessions_updated"] += 1
+        return stats
+
+# ---------- Receiver ----------
+class BodyTooLarge(ValueError):
+    """Export request exceeds MAX_BODY_BYTES once decompressed."""
+
+def decompress(body: bytes, content_encoding: str) -> bytes:
+    """Undo Content-Encoding gzip/deflate, bounded by MAX_BODY_BYTES."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "gzip":
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        decoder = zlib.decompressobj()
+    elif encoding == "identity":
+        return body
+    else:
+        raise ValueError(f"unsupported Content-Encoding: {encoding}")
+    data = decoder.decompress(body, MAX_BODY_BYTES + 1)
+    if len(data) > MAX_BODY_BYTES:
+        raise BodyTooLarge("decompressed body too large")
+    return data
+
+def status_body(message: str, is_json: bool) -> bytes:
+    """google.rpc.Status with just a message, in the request's encoding."""
+    if is_json:
+        return json.dumps({"message": message}).encode("utf-8")
+    data = message.encode("utf-8")
+    length = b""
+    n = len(data)
+    while True:
+        if n < 0x80:
+            length += bytes([n])
+            break
+        length += bytes([(n & 0x7F) | 0x80])
+        n >>= 7
+    return b"\x12" + length + data
+
+class OTLPReceiver:
+    """
+    Turns OTLP/HTTP export requests into session files, telemetry database
+    rows and listener callbacks.
+
+    handle() is transport-agnostic so the same receiver can sit behind
+    server.py's handler or the standalone server below. Batches are
+    processed one at a time.
+
+    Listeners:
+        record_listeners: called with each flattened log record
+        op_listeners:     called with each (session_id, prompt_id, timestamp,
+                          kind, payload) op of a logs batch (e.g. /api/live)
+        metric_listeners: called with each flattened metric data point
+    """
+
+    def __init__(self, output_dir: Path = DEFAULT_OUTPUT_DIR, db: Optional[TelemetryDB] = None,
+                 verbose: bool = False):
+        self.sink = SessionSink(output_dir)
+        self.db = db
+        self.verbose = verbose
+        self.record_listeners: List[Callable[[dict], None]] = []
+        self.op_listeners: List[Callable[[tuple], None]] = []
+        self.metric_listeners: List[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+
+    def handle(self, path: str, content_type: str, content_encoding: str,
+               body: bytes) -> Tuple[int, str, bytes]:
+        """Process one export request; returns (status, content_type, body)."""
+        is_json = (content_type or "").split(";")[0].strip().lower() == "application/json"
+        reply_type = "application/json" if is_json else "application/x-protobuf"
+
+        try:
+            body = decompress(body, content_encoding)
+            if path == LOGS_PATH:
+                payload = json.loads(body) if is_json else decode_logs_request(body)
+                self.export_logs(flatten_logs(payload))
+            elif path == METRICS_PATH:
+                payload = json.loads(body) if is_json else decode_metrics_request(body)
+                self.export_metrics(flatten_metrics(payload))
+            elif path != TRACES_PATH:
+                return 404, reply_type, status_body("unknown OTLP path", is_json)
+        except BodyTooLarge as e:
+            return 413, reply_type, status_body(str(e), is_json)
+        except (OSError, sqlite3.Error) as e:
+            # Disk full, permissions, lock timeout, database errors: retryable
+            return 503, reply_type, status_body(f"export not stored: {e}", is_json)
+        except (ValueError, TypeError, AttributeError, KeyError, IndexError, struct.error, EOFError,
+                zlib.error) as e:
+            return 400, reply_type, status_body(f"invalid export request: {e}", is_json)
+
+        # Empty Export*ServiceResponse: full success
+        return 200, reply_type, b"{}" if is_json else b""
+
+    def export_logs(self, records: List[dict]):
+        ops = [record_to_op(record) for record in records]
+        with self._lock:
+            stats = self.sink.write(ops)
+            if self.db is not None:
+                for record in records:
+                    self.db.ingest(record)
+                self.db.flush()
+        if self.verbose:
+            print(f"📥 {len(records)} log record(s): {stats['requests']} request(s), "
+                  f"{stats['responses']} response(s), {stats['errors']} error(s), "
+                  f"{stats['sessions_created']} new session(s)")
+        for record in records:
+            for listener in self.record_listeners:
+                listener(record)
+        for op in ops:
+            if op is None or op[3] is None:
+                continue
+            for listener in self.op_listeners:
+                listener(op)
+
+    def export_metrics(self, points: List[dict]):
+        if self.db is not None:
+            with self._lock:
+                for point in points:
+                    self.db.ingest_metric(point)
+                self.db.flush()
+        if self.verbose:
+            print(f"📈 {len(points)} metric point(s)")
+        for point in points:
+            for listener in self.metric_listeners:
+                listener(point)
+
+    def close(self):
+        with self._lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+def read_request_body(handler: BaseHTTPRequestHandler) -> Optional[bytes]:
+    """Read the request body, answering 411/413 itself (returns None then)."""
+    length = handler.headers.get("Content-Length")
+    if length is None or not length.isdigit():
+        handler.send_error(411, "Content-Length required")
+        return None
+    if int(length) > MAX_BODY_BYTES:
+        handler.send_error(413, "Export request too large")
+        handler.close_connection = True
+        return None
+    return handler.rfile.read(int(length))
+
+def serve_export(handler: BaseHTTPRequestHandler, receiver: OTLPReceiver):
+    """Answer an OTLP export POST on any BaseHTTPRequestHandler."""
+    body = read_request_body(handler)
+    if body is None:
+        return
+    status, content_type, reply = receiver.handle(
+        handler.path.split("?")[0],
+        handler.headers.get("Content-Type", ""),
+        handler.headers.get("Content-Encoding", ""),
+        body)
+    handler.send_response(status)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(reply)))
+    handler.end_headers()
+    handler.wfile.write(reply)
+
+# ---------- Standalone Server ----------
+class OTLPRequestHandler(BaseHTTPRequestHandler):
+    receiver: OTLPReceiver = None
+
+    def do_POST(self):
+        serve_export(self, self.receiver)
+
+    def log_message(self, format, *args):
+        if len(args) > 1 and args[1] == "200":
+            return
+        super().log_message(format, *args)
+
+def main():
+    parser = argparse.ArgumentParser(description="OTLP/HTTP receiver for Gemini CLI telemetry")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--host", default="localhost", help="Interface to bind (default: localhost)")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help=f"Session file directory (default: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument("--db", type=Path, nargs="?", const=DEFAULT_DB_FILE, metavar="PATH",
+                        help=f"Also feed the SQLite telemetry store (default: {DEFAULT_DB_FILE})")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print a line per export batch")
+    args = parser.parse_args()
+
+    receiver = OTLPReceiver(args.output_dir, TelemetryDB(args.db) if args.db else None, args.verbose)
+    OTLPRequestHandler.receiver = receiver
+    httpd = ThreadingHTTPServer((args.host, args.port), OTLPRequestHandler)
+
+    print("📡 Gemini CLI OTLP Receiver")
+    print("="*60)
+    print(f"Listening on: http://{args.host}:{args.port} ({LOGS_PATH}, {METRICS_PATH})")
+    print(f"Session files: {args.output_dir}")
+    if args.db:
+        print(f"Telemetry database: {args.db}")
+    print("\nPress Ctrl+C to stop")
+    print("="*60)
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down receiver...")
+    finally:
+        httpd.server_close()
+        receiver.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
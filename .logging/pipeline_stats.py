@@ -0,0 +1,179 @@
+"""
+Stage timings, counters and profiling for the processing scripts.
+
+process-api-requests.py (--stats, --profile) and watcher.py (--stats) charge
+their wall time to pipeline stages with PipelineStats.lap(stage): every lap
+charges the time since the previous lap, so a sequential loop is covered
+stage by stage without nested timers, and a disabled instance costs one
+attribute check per call. Counters (records, bytes, entries) and gauges
+(offsets, sizes) sit next to the timings; peak memory is the process's peak
+RSS (plus the traced peak when tracemalloc is running).
+
+profile(mode) wraps a run in cProfile or tracemalloc and prints the report,
+optionally saving it (cProfile: a .prof file for pstats/snakeviz;
+tracemalloc: the text report).
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+import cProfile
+import io
+import pstats
+import sys
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+PROFILE_TOP = 25
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+class PipelineStats:
+    """
+    Wall time per stage plus counters and gauges.
+
+    Usage:
+        stats = PipelineStats()
+        for record in records:      # time waiting for the record ...
+            stats.lap("parse")      # ... is charged to "parse"
+            op = normalize(record)
+            stats.lap("normalize")
+        stats.count("records")
+        print(stats.format())
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.gauges: Dict[str, int] = {}
+        self.started = perf_counter()
+        self._last = self.started
+
+    def lap(self, stage: str):
+        """Charge the time since the previous lap (or skip) to `stage`."""
+        if self.enabled:
+            now = perf_counter()
+            self.seconds[stage] += now - self._last
+            self._last = now
+
+    def skip(self):
+        """Restart the lap clock without charging anything (e.g. after idling)."""
+        if self.enabled:
+            self._last = perf_counter()
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def set(self, name: str, value: int):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def snapshot(self) -> dict:
+        elapsed = perf_counter() - self.started
+        timed = sum(self.seconds.values()) or 1.0
+        result = {
+            "elapsed_s": round(elapsed, 3),
+            "stages": {
+                stage: {"seconds": round(seconds, 4), "share": round(seconds / timed, 3)}
+                for stage, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])
+            },
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if tracemalloc.is_tracing():
+            result["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 1)
+        return result
+
+    def format(self, title: str = "Pipeline stats") -> str:
+        snapshot = self.snapshot()
+        elapsed = snapshot["elapsed_s"] or 1e-9
+        lines = [f"⏱️  {title} ({snapshot['elapsed_s']:.2f}s)"]
+        for stage, timing in snapshot["stages"].items():
+            lines.append(f"   {stage:<14} {timing['seconds']:>9.3f}s  {timing['share'] * 100:5.1f}%")
+        for name, value in snapshot["counters"].items():
+            if name.endswith("bytes"):
+                lines.append(f"   {name:<14} {value / 1e6:>9.2f} MB  ({value / 1e6 / elapsed:,.1f} MB/s)")
+            else:
+                lines.append(f"   {name:<14} {value:>10,}  ({value / elapsed:,.0f}/s)")
+        for name, value in snapshot["gauges"].items():
+            lines.append(f"   {name:<14} {value:>10,}")
+        if snapshot["peak_rss_mb"] is not None:
+            lines.append(f"   {'peak RSS':<14} {snapshot['peak_rss_mb']:>9.1f} MB")
+        if "traced_peak_mb" in snapshot:
+            lines.append(f"   {'traced peak':<14} {snapshot['traced_peak_mb']:>9.1f} MB")
+        return "\n".join(lines)
+
+
+def _cprofile_report(profiler: cProfile.Profile, top: int) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+    return out.getvalue()
+
+
+def _tracemalloc_report(snapshot: tracemalloc.Snapshot, top: int) -> str:
+    current, peak = tracemalloc.get_traced_memory()
+    lines: List[str] = [f"Traced memory: current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB",
+                        f"Top {top} allocation sites (live at the end of the run):"]
+    for stat in snapshot.statistics("lineno")[:top]:
+        lines.append(f"  {stat}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profile(mode: Optional[str], output: Optional[Path] = None, top: int = PROFILE_TOP) -> Iterator[None]:
+    """
+    Run the body under cProfile or tracemalloc (mode None: no profiling),
+    then print the report and save it to `output` if given.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"unknown profile mode: {mode}")
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            print(f"\n🔬 cProfile (top {top} by cumulative time)")
+            print(_cprofile_report(profiler, top))
+            if output is not None:
+                profiler.dump_stats(str(output))
+                print(f"💾 Profile saved to {output} (python -m pstats {output})")
+        return
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        report = _tracemalloc_report(tracemalloc.take_snapshot(), top)
+        tracemalloc.stop()
+        print("\n🔬 tracemalloc")
+        print(report)
+        if output is not None:
+            output.write_text(report + "\n", encoding="utf-8")
+            print(f"💾 Report saved to {output}")
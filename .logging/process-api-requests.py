@@ -16,167 +16,220 @@ Options:
     --no-clear          Don't clear the log file after processing
     --output-dir PATH   Output directory (default: .logging)
     --verbose          Enable verbose debug output
+    --jobs N           Decode the log with N worker processes (0 = all cores)
+    --db [PATH]        Also feed the SQLite telemetry store (default: .logging/telemetry.db)
+    --raw              Store request_text/response_text/function_args as the
+                       original JSON text instead of decoding them
+    --dedup            Store request_text history once per message in a chunk
+                       table (<session>.json.chunks) and reference it by hash
+    --format FORMAT    Format of new session files: json (default) or archive
+                       (compressed frames + index, see session_archive.py)
+    --stats            Print per-stage timings, counters and peak memory
+    --profile MODE     Also profile the run: cprofile or tracemalloc
+    --profile-out PATH Save the profile (.prof for cprofile, text for tracemalloc)
     --help             Show this help message
 """
 
 from __future__ import annotations
-import json
+import io
 import argparse
-import re
+import os
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
 import ijson
 from filelock import FileLock, Timeout
 
+from pipeline_stats import PROFILE_MODES, PipelineStats, profile
+from session_archive import SESSION_FORMATS, SessionArchive, open_session_store
+from session_store import ChunkTable, SessionStore, dedup_history, get_existing_sessions, session_file_path
+from telemetry_db import DEFAULT_DB_FILE, TelemetryDB, record_rows
+from telemetry_events import JSON_STRING_FIELDS, parse_json_fields, record_to_op
+
 # ---------- Configuration ----------
 BASE = Path(".")
 LOG_FILE = BASE / ".logging" / "log.jsonl"
 LOCK_FILE = BASE / ".logging" / ".process.lock"
 DEFAULT_OUTPUT_DIR = BASE / ".logging" / "requests"
 
-# Event types we care about
-EVENT_REQUEST = "gemini_cli.api_request"
-EVENT_RESPONSE = "gemini_cli.api_response"
-EVENT_ERROR = "gemini_cli.api_error"
+# Below this size the process pool costs more than it saves
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
 
 # ---------- Helper Functions ----------
 def timestamp_now() -> str:
     """Return current timestamp in YYYY-MM-DD_HH-mm-ss format."""
     return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
-def get_existing_sessions(output_dir: Path) -> Dict[str, Path]:
-    """
-    Scan output directory for existing session files.
-    Returns dict mapping session_id -> file_path
+# ---------- Record Decoding ----------
+def iter_ops(log_path: Path, verbose: bool = False, db: Optional[TelemetryDB] = None,
+             raw: bool = False, stats: Optional[PipelineStats] = None):
+    """Yield one op per record of the log file, decoding on a single core."""
+    stats = stats or PipelineStats(enabled=False)
+    with log_path.open("rb") as f:
+        stats.skip()
+        for record in ijson.items(f, "", multiple_values=True):
+            stats.lap("parse")
+            if db is not None:
+                db.ingest(record)
+                stats.lap("db")
+            op = record_to_op(record, verbose, parse_json=False)
+            stats.lap("normalize")
+            # JSON field decoding is its own stage (same result as parse_json=True)
+            if op is not None and op[3] is not None and not raw:
+                op = op[:4] + (parse_json_fields(op[4], JSON_STRING_FIELDS, verbose),)
+                stats.lap("decode")
+            yield op
+
+def find_chunk_boundaries(log_path: Path, chunks: int) -> List[int]:
     """
-    output_dir.mkdir(parents=True, exist_ok=True)
-    sessions = {}
-
-    # Pattern: YYYY-MM-DD_HH-MM-SS-{session-id}.json
-    pattern = re.compile(r'(\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})-(.+)\.json')
-
-    for file_path in output_dir.glob("*.json"):
-        match = pattern.match(file_path.name)
-        if match:
-            session_id = match.group(7)  # Group 7 captures the session ID
-            sessions[session_id] = file_path
-
-    return sessions
-
-def load_session_file(file_path: Path) -> List[dict]:
-    """Load existing session data from file."""
-    if not file_path.exists():
-        return []
+    Split the log into byte ranges that start at top-level objects.
 
+    Gemini pretty-prints each record with nested lines indented, so a '{' at
+    the start of a line can only open a new top-level record (and compact
+    JSONL has one record per line). Returns sorted offsets including 0 and
+    the file size.
+    """
+    size = log_path.stat().st_size
+    bounds = [0]
+    with log_path.open("rb") as f:
+        for k in range(1, chunks):
+            pos = max(size * k // chunks, bounds[-1])
+            f.seek(pos)
+            while True:
+                window = f.read(1 << 16)
+                if not window:
+                    pos = size
+                    break
+                i = window.find(b"\n{")
+                if i >= 0:
+                    pos += i + 1
+                    break
+                if len(window) < 2:
+                    pos = size
+                    break
+                # Keep the last byte in case the window split "\n{"
+                pos += len(window) - 1
+                f.seek(pos)
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return bounds
+
+def _parse_chunk(args: tuple) -> tuple:
+    """
+    Process pool worker: decode records in [start, end) into ops, plus
+    telemetry database rows when `with_rows` is set.
+
+    Returns (ops, rows, error). Payloads that a later op in the same chunk
+    overwrites (same session, prompt and kind) are dropped to None before
+    pickling; the merge only counts those ops, and the entry ends up with
+    the last payload exactly as on the sequential path. On a parse error
+    the ops decoded so far are returned with the error message, mirroring
+    where the sequential ijson loop stops.
+    """
+    log_path, start, end, with_rows, raw = args
+    with open(log_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    ops = []
+    rows = []
+    error = None
     try:
-        with file_path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        for record in ijson.items(io.BytesIO(data), "", multiple_values=True):
+            if with_rows:
+                rows.extend(record_rows(record))
+            ops.append(record_to_op(record, parse_json=not raw))
     except Exception as e:
-        print(f"⚠️  Warning: Could not load {file_path.name}: {e}")
-        return []
-
-def extract_attributes(record: dict) -> dict:
-    """Extract attributes from OTLP-style record."""
-    return record.get("attributes", {}) if isinstance(record.get("attributes"), dict) else {}
-
-def get_prompt_id(attrs: dict) -> Optional[str]:
-    """Extract prompt_id from attributes."""
-    return attrs.get("prompt_id")
-
-def get_session_id(attrs: dict) -> Optional[str]:
-    """Extract session.id from attributes."""
-    return attrs.get("session.id")
-
-def get_event_timestamp(record: dict) -> Optional[str]:
-    """Extract timestamp from record."""
-    # Try attributes first (where event.timestamp actually is)
-    attrs = extract_attributes(record)
-    timestamp = attrs.get("event.timestamp")
-    if timestamp:
-        return timestamp
-    # Fallbacks for other formats
-    return (record.get("timestamp") or
-            record.get("event_timestamp") or
-            record.get("time"))
-
-def get_event_name(record: dict) -> Optional[str]:
-    """Extract event name from record."""
-    attrs = extract_attributes(record)
-    return attrs.get("event.name") or record.get("event") or record.get("name")
-
-def parse_json_fields(attrs: dict, fields: List[str], verbose: bool = False) -> dict:
-    """
-    Parse JSON string fields into objects for cleaner output.
-
-    Args:
-        attrs: Attribute dictionary potentially containing JSON strings
-        fields: List of field names to attempt parsing
-        verbose: Enable debug output
+        error = str(e)
+
+    seen = set()
+    for i in range(len(ops) - 1, -1, -1):
+        op = ops[i]
+        if op is None or op[3] is None:
+            continue
+        key = (op[0], op[1], op[3])
+        if key in seen:
+            ops[i] = op[:4] + (None,)
+        else:
+            seen.add(key)
+    return ops, rows, error
 
-    Returns:
-        New dict with parsed fields
+def iter_ops_parallel(log_path: Path, jobs: int, db: Optional[TelemetryDB] = None,
+                      raw: bool = False, stats: Optional[PipelineStats] = None):
     """
-    result = attrs.copy()
-
-    for field in fields:
-        if field in result and isinstance(result[field], str):
-            try:
-                parsed = json.loads(result[field])
-                result[field] = parsed
-                if verbose:
-                    print(f"   ✓ Parsed JSON field: {field}")
-            except (json.JSONDecodeError, TypeError, ValueError) as e:
-                # Keep as string if parsing fails
-                if verbose:
-                    print(f"   ⚠ Could not parse {field}: {e}")
-                pass
-
-    return result
-
-# Fields that commonly contain JSON strings
-JSON_STRING_FIELDS = [
-    "request_text",
-    "response_text",
-    "function_args",  # tool arguments might be JSON strings
-]
+    Yield the same ops as iter_ops(), decoding chunks in a process pool.
+    Chunk results are consumed in file order; with `stats`, waiting for
+    them is charged to the "workers" stage (parse, normalize and decode
+    happen in the pool).
+
+    At most `jobs * 2` chunks are in flight: the next chunk is submitted
+    when one is merged, so decoded ops never pile up for the whole file
+    when the workers outpace the merge loop.
+    """
+    stats = stats or PipelineStats(enabled=False)
+    # A few chunks per worker keeps the pool busy when records vary in size
+    bounds = find_chunk_boundaries(log_path, jobs * 4)
+    ranges = iter([(str(log_path), a, b, db is not None, raw) for a, b in zip(bounds, bounds[1:])])
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque(pool.submit(_parse_chunk, chunk) for chunk in islice(ranges, jobs * 2))
+        stats.skip()
+        while pending:
+            ops, rows, error = pending.popleft().result()
+            for chunk in islice(ranges, 1):
+                pending.append(pool.submit(_parse_chunk, chunk))
+            stats.lap("workers")
+            if db is not None:
+                db.add_rows(rows)
+                stats.lap("db")
+            yield from ops
+            if error:
+                raise ValueError(error)
 
 # ---------- Event Processing ----------
-def save_session_data(session_id: str, session_data: dict, first_timestamp: str,
-                     existing_sessions: dict, output_dir: Path, verbose: bool) -> Path:
-    """
-    Save session data to file.
-    Handles both new and existing session files.
+def process_log_file(log_path: Path, output_dir: Path, verbose: bool = False, jobs: int = 1,
+                     db: Optional[TelemetryDB] = None, raw: bool = False,
+                     dedup: bool = False, session_format: str = "json",
+                     pipeline_stats: Optional[PipelineStats] = None) -> Dict[str, any]:
     """
-    # Convert dict to list format
-    data_list = list(session_data.values())
+    Parse log file and extract API events grouped by session.
+    Processes records in order and creates/updates session files as needed.
 
-    # Determine output file path
-    if session_id in existing_sessions:
-        # Update existing file
-        output_file = existing_sessions[session_id]
-        if verbose:
-            print(f"   💾 Updating: {output_file.name}")
+    With jobs > 1 (and a log bigger than PARALLEL_MIN_BYTES) records are
+    decoded in a process pool; grouping still happens here, in file order,
+    so the session files are identical to a sequential run.
 
-        # For existing files, just overwrite with updated data
-        temp_file = output_file.with_suffix(".tmp")
-        with temp_file.open("w", encoding="utf-8") as f:
-            json.dump(data_list, f, ensure_ascii=False, indent=2)
-        temp_file.replace(output_file)
-    else:
-        # Create new file
-        if verbose:
-            print(f"   💾 Creating new session file")
-        output_file = save_session_file(data_list, session_id, first_timestamp or "", output_dir)
+    If `db` is given, every record is also normalized into the telemetry
+    database (see telemetry_db.py).
 
-    return output_file
+    With raw=True, request_text/response_text/function_args are stored as
+    the JSON text from the log instead of being decoded into nested objects
+    (and re-encoded with indent=2). request_text repeats the whole
+    conversation every turn, so this saves decoding and re-encoding O(N²)
+    history bytes per session; the viewer and extract-reflection-data.py
+    decode these fields when they read them.
 
-def process_log_file(log_path: Path, output_dir: Path, verbose: bool = False) -> Dict[str, any]:
-    """
-    Parse log file and extract API events grouped by session.
-    Processes records in order and creates/updates session files as needed.
+    With dedup=True, request_text histories are stored content-addressed
+    (see session_store.ChunkTable): each message once per session, and each
+    request as a list of message hashes.
+
+    New sessions are written as `session_format` ("json" or "archive", see
+    session_archive.py); existing session files keep their own format.
+
+    `pipeline_stats` (see pipeline_stats.py) collects per-stage timings
+    (parse, db, normalize, decode, lookup, group, dedup, serialize, write)
+    and record/byte counters.
+
+    Only the entry of the prompt currently being assembled is kept in memory.
+    When the next prompt_id starts, the entry is written to the session file
+    through SessionStore (appended, or replaced in place if the prompt_id is
+    already stored), so memory stays proportional to one entry and existing
+    session files are never re-read or rewritten in full.
 
     Returns:
         Dict with processing statistics
@@ -184,9 +237,12 @@ def process_log_file(log_path: Path, output_dir: Path, verbose: bool = False) ->
     if not log_path.exists():
         print(f"❌ Log file not found: {log_path}")
         return {}
+    timing = pipeline_stats or PipelineStats(enabled=False)
 
     # Get existing sessions
+    timing.skip()
     existing_sessions = get_existing_sessions(output_dir)
+    timing.lap("lookup")
     print(f"📂 Found {len(existing_sessions)} existing session file(s)")
 
     # Stats
@@ -203,139 +259,142 @@ def process_log_file(log_path: Path, output_dir: Path, verbose: bool = False) ->
 
     # Current session tracking
     current_session_id = None
-    current_session_data = {}  # prompt_id -> {prompt_id, request, response, error}
     current_session_first_timestamp = None
+    store: Optional[SessionStore | SessionArchive] = None
+    chunks: Optional[ChunkTable] = None
+    current_prompt_id = None
+    current_entry: Optional[dict] = None  # {request, response, error}
     session_files_written = []
 
+    def flush_entry():
+        """Write the entry being assembled to the current session file."""
+        nonlocal store, chunks, current_entry
+        if current_entry is None:
+            return
+        timing.lap("group")
+        if store is None:
+            path = existing_sessions.get(current_session_id) or session_file_path(
+                current_session_id, current_session_first_timestamp or "", output_dir,
+                SESSION_FORMATS[session_format])
+            if verbose:
+                print(f"   💾 {'Updating' if path.exists() else 'Creating'}: {path.name}")
+            store = open_session_store(path)
+            timing.lap("lookup")
+        if dedup:
+            if chunks is None:
+                chunks = ChunkTable(store.path)
+            dedup_history(current_entry, chunks)
+            # Chunks must be on disk before an entry references them
+            chunks.flush()
+            timing.lap("dedup")
+        data = store.encode(current_entry)
+        timing.lap("serialize")
+        store.upsert(current_prompt_id, current_entry, data)
+        timing.lap("write")
+        timing.count("entries_written")
+        timing.count("written_bytes", len(data))
+        current_entry = None
+
+    def close_session():
+        """Flush and close the current session file, updating stats."""
+        nonlocal store, chunks
+        flush_entry()
+        if chunks is not None:
+            chunks.close()
+            chunks = None
+        if store is None:
+            return
+        store.close()
+        timing.lap("write")
+        session_files_written.append(store.path)
+        stats["sessions_processed"] += 1
+        if store.created:
+            stats["sessions_created"] += 1
+            # Later records for this session append to the same file
+            existing_sessions[current_session_id] = store.path
+        else:
+            stats["sessions_updated"] += 1
+        store = None
+
     print(f"📖 Reading log file: {log_path}")
     print(f"⏳ Processing events...")
+    if jobs > 1 and log_path.stat().st_size >= PARALLEL_MIN_BYTES:
+        print(f"⚡ Decoding with {jobs} worker processes")
+        ops = iter_ops_parallel(log_path, jobs, db, raw, timing)
+    else:
+        ops = iter_ops(log_path, verbose, db, raw, timing)
 
-    with log_path.open("rb") as f:
-        try:
-            records = ijson.items(f, "", multiple_values=True)
-
-            for record in records:
-                stats["total_records"] += 1
-
-                # Progress indicator
-                if verbose and stats["total_records"] % 100 == 0:
-                    print(f"   Processed {stats['total_records']} records...")
-
-                # Extract metadata
-                event_name = get_event_name(record)
-                attrs = extract_attributes(record)
-                prompt_id = get_prompt_id(attrs)
-                session_id = get_session_id(attrs)
-                timestamp = get_event_timestamp(record)
-
-                # Skip records without session_id or prompt_id
-                if not session_id or not prompt_id:
-                    stats["skipped"] += 1
-                    continue
-
-                # Check if session changed
-                if current_session_id is not None and session_id != current_session_id:
-                    # Save current session before switching
-                    if current_session_data:
-                        file_path = save_session_data(
-                            current_session_id,
-                            current_session_data,
-                            current_session_first_timestamp,
-                            existing_sessions,
-                            output_dir,
-                            verbose
-                        )
-                        session_files_written.append(file_path)
-                        stats["sessions_processed"] += 1
-
-                        if current_session_id in existing_sessions:
-                            stats["sessions_updated"] += 1
-                        else:
-                            stats["sessions_created"] += 1
-
-                    # Reset for new session
-                    current_session_data = {}
-                    current_session_first_timestamp = None
-
-                # Set current session
-                if current_session_id != session_id:
-                    current_session_id = session_id
-                    print(f"🔄 Processing session: {session_id}")
-
-                    # Load existing data if session file exists
-                    if session_id in existing_sessions:
-                        print(f"   ↪ Appending to existing session file")
-                        existing_data = load_session_file(existing_sessions[session_id])
-                        # Convert list to dict keyed by prompt_id
-                        for entry in existing_data:
-                            # Extract prompt_id from request, response, or error attributes
-                            entry_prompt_id = None
-                            if entry.get("request") and "prompt_id" in entry["request"]:
-                                entry_prompt_id = entry["request"]["prompt_id"]
-                            elif entry.get("response") and "prompt_id" in entry["response"]:
-                                entry_prompt_id = entry["response"]["prompt_id"]
-                            elif entry.get("error") and "prompt_id" in entry["error"]:
-                                entry_prompt_id = entry["error"]["prompt_id"]
-
-                            if entry_prompt_id:
-                                current_session_data[entry_prompt_id] = entry
-
-                # Track first timestamp for this session
-                if current_session_first_timestamp is None and timestamp:
-                    current_session_first_timestamp = timestamp
-
-                # Initialize entry if needed
-                if prompt_id not in current_session_data:
-                    current_session_data[prompt_id] = {
-                        "request": None,
-                        "response": None,
-                        "error": None
-                    }
-
-                # Process based on event type (parse JSON fields before storing)
-                if event_name == EVENT_REQUEST:
-                    current_session_data[prompt_id]["request"] = parse_json_fields(attrs, JSON_STRING_FIELDS, verbose)
-                    stats["requests"] += 1
-                    if verbose:
-                        print(f"   ✓ Request: {prompt_id}")
-
-                elif event_name == EVENT_RESPONSE:
-                    current_session_data[prompt_id]["response"] = parse_json_fields(attrs, JSON_STRING_FIELDS, verbose)
-                    stats["responses"] += 1
-                    if verbose:
-                        print(f"   ✓ Response: {prompt_id}")
-
-                elif event_name == EVENT_ERROR:
-                    current_session_data[prompt_id]["error"] = parse_json_fields(attrs, JSON_STRING_FIELDS, verbose)
-                    stats["errors"] += 1
-                    if verbose:
-                        print(f"   ✓ Error: {prompt_id}")
-                else:
-                    stats["skipped"] += 1
-
-            # Save final session
-            if current_session_id and current_session_data:
-                file_path = save_session_data(
-                    current_session_id,
-                    current_session_data,
-                    current_session_first_timestamp,
-                    existing_sessions,
-                    output_dir,
-                    verbose
-                )
-                session_files_written.append(file_path)
-                stats["sessions_processed"] += 1
-
-                if current_session_id in existing_sessions:
-                    stats["sessions_updated"] += 1
-                else:
-                    stats["sessions_created"] += 1
-
-        except Exception as e:
-            print(f"⚠️  Warning: Error parsing log file: {e}")
+    try:
+        for op in ops:
+            stats["total_records"] += 1
+
+            # Progress indicator
+            if verbose and stats["total_records"] % 100 == 0:
+                print(f"   Processed {stats['total_records']} records...")
+
+            # Skip records without session_id or prompt_id
+            if op is None:
+                stats["skipped"] += 1
+                continue
+
+            session_id, prompt_id, timestamp, kind, payload = op
+
+            # Check if session changed
+            if current_session_id != session_id:
+                # Save current session before switching
+                close_session()
+                current_prompt_id = None
+                current_session_first_timestamp = None
+
+                current_session_id = session_id
+                print(f"🔄 Processing session: {session_id}")
+
+                # Existing session files are appended to in place
+                if session_id in existing_sessions:
+                    print(f"   ↪ Appending to existing session file")
+                    store = open_session_store(existing_sessions[session_id])
+                    timing.lap("lookup")
+
+            # Track first timestamp for this session
+            if current_session_first_timestamp is None and timestamp:
+                current_session_first_timestamp = timestamp
+
+            # Switch to this prompt's entry (loaded from disk if stored)
+            if prompt_id != current_prompt_id:
+                flush_entry()
+                current_prompt_id = prompt_id
+                current_entry = (store.get(prompt_id) if store is not None else None) or {
+                    "request": None,
+                    "response": None,
+                    "error": None
+                }
+                timing.lap("lookup")
+
+            if kind is None:
+                stats["skipped"] += 1
+                continue
+
+            # payload is None when a later record overwrites it (parallel mode)
+            if payload is not None:
+                current_entry[kind] = payload
+            stats[kind + "s"] += 1
             if verbose:
-                import traceback
-                traceback.print_exc()
+                print(f"   ✓ {kind.capitalize()}: {prompt_id}")
+
+    except Exception as e:
+        print(f"⚠️  Warning: Error parsing log file: {e}")
+        if verbose:
+            import traceback
+            traceback.print_exc()
+
+    # Save final session (also after a parse error, e.g. a trailing record
+    # Gemini is still writing, so complete records are never lost)
+    close_session()
+    if db is not None:
+        db.flush()
+        timing.lap("db")
+    timing.count("records", stats["total_records"])
+    timing.count("log_bytes", log_path.stat().st_size)
 
     stats["session_files"] = session_files_written
     return stats
@@ -372,34 +431,6 @@ def format_output(grouped_events: Dict[str, Dict[str, any]], parse_json: bool =
 
     return output
 
-def save_session_file(data: List[dict], session_id: str, first_timestamp: str, output_dir: Path) -> Path:
-    """
-    Save session data to file.
-    Filename format: {first_timestamp}-{session_id}.json
-    """
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Format timestamp for filename (YYYY-MM-DD_HH-MM-SS)
-    try:
-        # Parse ISO timestamp and format for filename
-        dt = datetime.fromisoformat(first_timestamp.replace('Z', '+00:00'))
-        timestamp_str = dt.strftime("%Y-%m-%d_%H-%M-%S")
-    except:
-        # Fallback to current time if parsing fails
-        timestamp_str = timestamp_now()
-
-    output_file = output_dir / f"{timestamp_str}-{session_id}.json"
-
-    # Write to temp file first, then replace (atomic operation)
-    temp_file = output_file.with_suffix(".tmp")
-
-    with temp_file.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-    temp_file.replace(output_file)
-
-    return output_file
-
 def clear_log_file(log_path: Path, verbose: bool = False):
     """Clear the log file content."""
     if verbose:
@@ -459,13 +490,56 @@ def main():
         action="store_true",
         help="Enable verbose debug output"
     )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Decode the log with N worker processes (0 = all cores, default: 1)"
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_DB_FILE,
+        metavar="PATH",
+        help=f"Also feed the SQLite telemetry store (default: {DEFAULT_DB_FILE})"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Store request_text history content-addressed (each message once per session)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(SESSION_FORMATS),
+        default="json",
+        help="Format of new session files (default: json; existing files keep theirs)"
+    )
     parser.add_argument(
         "--raw",
         action="store_true",
-        help="Keep JSON strings as-is (don't parse to objects)"
+        help="Store JSON string fields as the original text (readers decode them on demand)"
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print per-stage timings, record/byte counters and peak memory"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        help="Profile the run with cProfile or tracemalloc and print the report (implies --stats)"
+    )
+    parser.add_argument(
+        "--profile-out",
+        type=Path,
+        metavar="PATH",
+        help="Save the profile (.prof file for cprofile, text report for tracemalloc)"
     )
 
     args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
 
     print("🚀 Gemini CLI API Request Processor")
     print("="*60)
@@ -491,7 +565,17 @@ def main():
             print(f"✓ Lock acquired\n")
 
             # Process log file
-            stats = process_log_file(LOG_FILE, args.output_dir, args.verbose)
+            db = TelemetryDB(args.db) if args.db else None
+            pipeline_stats = PipelineStats() if args.stats or args.profile else None
+            try:
+                with profile(args.profile, args.profile_out):
+                    stats = process_log_file(LOG_FILE, args.output_dir, args.verbose, jobs, db,
+                                             args.raw, args.dedup, args.format, pipeline_stats)
+                    if pipeline_stats is not None:
+                        print("\n" + pipeline_stats.format("Stage timings"))
+            finally:
+                if db is not None:
+                    db.close()
 
             if stats.get('sessions_processed', 0) == 0:
                 print(f"\n⚠️  No sessions found in log file.")
@@ -9,14 +9,43 @@ Usage:
     python process-claude-logs.py
     # or with uv:
     uv run process-claude-logs.py
+    # store sessions as compressed archives (see session_archive.py):
+    python process-claude-logs.py --format archive
+
+Runs are incremental: a checkpoint manifest (.logging/.claude-checkpoints.json)
+records each log's inode, size, resume offset and output file, so only
+lines appended since the last run are converted, and their entries are
+added to the existing session file (also after it was renamed in the
+viewer). Use --rebuild to convert again from scratch into the same files.
+
+With --jobs N, logs are converted by N worker processes, one log per task;
+results and progress lines are reported in the same order as a serial run.
+
+Conversion is a generator pipeline (read line -> event -> entry -> append
+to the session file), so memory is bounded by the largest single
+interaction, not by the size of the transcript.
 """
 
 import json
 import os
+import re
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from session_archive import SESSION_FORMATS, load_entry_index, open_session_store
+from session_store import SESSION_SUFFIXES, entry_prompt_id, sidecar_paths
+
+DEFAULT_CHECKPOINT_FILE = Path('.logging/.claude-checkpoints.json')
+# Used when a turn has no assistant message naming its model
+DEFAULT_MODEL = 'claude-sonnet-4-5-20250929'
+# Anthropic usage fields summed per turn
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+CHECKPOINT_VERSION = 1
+# Timestamp prefix of session filenames, kept when the viewer renames a session
+FILENAME_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}-')
 
 
 def find_claude_logs() -> List[Path]:
@@ -36,38 +65,160 @@ def find_claude_logs() -> List[Path]:
     return sorted(log_files, key=lambda x: x.stat().st_mtime, reverse=True)
 
 
-def parse_claude_log(log_file: Path) -> Dict[str, Any]:
-    """Parse a Claude Code JSONL log file."""
-    events = []
-    session_id = None
-
-    with open(log_file, 'r', encoding='utf-8') as f:
+def find_session_id(log_file: Path) -> Optional[str]:
+    """Return the first sessionId in a log, reading only as far as needed."""
+    with open(log_file, 'rb') as f:
         for line in f:
+            if b'"sessionId"' not in line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'sessionId' in event:
+                return event['sessionId']
+    return None
+
+
+def iter_claude_events(parsed_log: Dict[str, Any], start_offset: int) -> Iterator[Dict[str, Any]]:
+    """Yield the events of parsed_log['log_file'] one line at a time.
+
+    Only complete lines are parsed (Claude Code may be writing the last
+    one). While iterating, parsed_log['offset'] is the byte offset of the
+    current event, parsed_log['end_offset'] the offset after the last
+    complete line read and parsed_log['event_count'] the events so far.
+    """
+    end_offset = start_offset
+    with open(parsed_log['log_file'], 'rb') as f:
+        f.seek(start_offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset = end_offset
+            end_offset += len(line)
+            parsed_log['end_offset'] = end_offset
             if line.strip():
                 try:
                     event = json.loads(line)
-                    events.append(event)
-                    if 'sessionId' in event and session_id is None:
-                        session_id = event['sessionId']
                 except json.JSONDecodeError:
                     continue
-
+                parsed_log['offset'] = offset
+                parsed_log['event_count'] += 1
+                yield event
+
+
+def parse_claude_log(log_file: Path, start_offset: int = 0, session_id: Optional[str] = None) -> Dict[str, Any]:
+    """Open a Claude Code JSONL log file for parsing, from `start_offset` on.
+
+    'events' is a generator (see iter_claude_events), so nothing is read
+    until the log is converted.
+    """
+    parsed_log = {
+        'session_id': session_id or find_session_id(log_file) or log_file.stem,
+        'log_file': log_file,
+        'offset': start_offset,
+        'end_offset': start_offset,
+        'event_count': 0
+    }
+    parsed_log['events'] = iter_claude_events(parsed_log, start_offset)
+    return parsed_log
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+
+
+class TurnStats:
+    """Latency, token usage and model of one user turn, over all its assistant messages."""
+
+    def __init__(self, timestamp: Any):
+        self.started = parse_timestamp(timestamp)
+        self.finished = None
+        self.model = None
+        # Claude Code logs every content block of a message as its own line,
+        # each repeating the message's usage: count each message id once
+        self.usage_by_message: Dict[Any, Dict[str, Any]] = {}
+
+    def add_assistant(self, event: Dict[str, Any]):
+        msg = event['message']
+        timestamp = parse_timestamp(event.get('timestamp'))
+        if timestamp is not None:
+            self.finished = timestamp
+        if msg.get('model'):
+            self.model = msg['model']
+        usage = msg.get('usage')
+        if isinstance(usage, dict):
+            self.usage_by_message[msg.get('id') or len(self.usage_by_message)] = usage
+
+    def response_fields(self) -> Dict[str, Any]:
+        """Gemini-style response fields; input_token_count includes cached input, as Gemini's does."""
+        totals = {field: 0 for field in USAGE_FIELDS}
+        for usage in self.usage_by_message.values():
+            for field in USAGE_FIELDS:
+                totals[field] += usage.get(field) or 0
+        duration_ms = 0
+        if self.started is not None and self.finished is not None:
+            duration_ms = max(0, round((self.finished - self.started).total_seconds() * 1000))
+        input_count = (totals['input_tokens'] + totals['cache_creation_input_tokens']
+                       + totals['cache_read_input_tokens'])
+        return {
+            'model': self.model or DEFAULT_MODEL,
+            'duration_ms': duration_ms,
+            'input_token_count': input_count,
+            'output_token_count': totals['output_tokens'],
+            'cached_content_token_count': totals['cache_read_input_tokens'],
+            'cache_creation_token_count': totals['cache_creation_input_tokens'],
+            'total_token_count': input_count + totals['output_tokens']
+        }
+
+
+def build_entry(session_id: str, prompt_counter: int, request: Dict[str, Any],
+                response_parts: List[Dict[str, Any]], stats: TurnStats) -> Dict[str, Any]:
+    """Build the {request, response, error} entry of one finished turn."""
+    fields = stats.response_fields()
+    request['model'] = fields['model']
     return {
-        'session_id': session_id or log_file.stem,
-        'events': events,
-        'log_file': log_file
+        'request': request,
+        'response': {
+            'session.id': session_id,
+            'model': fields['model'],
+            'status_code': 200,
+            'duration_ms': fields['duration_ms'],
+            'input_token_count': fields['input_token_count'],
+            'output_token_count': fields['output_token_count'],
+            'cached_content_token_count': fields['cached_content_token_count'],
+            'cache_creation_token_count': fields['cache_creation_token_count'],
+            'total_token_count': fields['total_token_count'],
+            'response_text': response_parts,
+            'prompt_id': f"{session_id}########{prompt_counter}",
+            'auth_type': 'claude-api-key',
+            'event.timestamp': request.get('event.timestamp', '')
+        },
+        'error': None
     }
 
 
-def convert_to_gemini_format(parsed_log: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """Convert Claude Code log to Gemini-compatible format."""
+def convert_to_gemini_format(parsed_log: Dict[str, Any], prompt_counter: int = 0) -> Iterator[Dict[str, Any]]:
+    """Convert Claude Code log to Gemini-compatible format, yielding one entry at a time.
+
+    When exhausted, sets parsed_log['resume'] = (offset, prompt_counter) of
+    the last user message: the entry it starts can still grow, so the next
+    incremental run converts again from there (its entries replace earlier
+    ones by prompt_id).
+
+    Each response carries the turn's model, its latency (user message to
+    last assistant message) and the usage of all its assistant messages.
+    """
     session_id = parsed_log['session_id']
     events = parsed_log['events']
 
-    gemini_format = []
     current_request = None
     current_response_parts = []
-    prompt_counter = 0
+    current_stats = None
+    resume = None
 
     for event in events:
         event_type = event.get('type')
@@ -78,25 +229,12 @@ def convert_to_gemini_format(parsed_log: Dict[str, Any]) -> List[Dict[str, Any]]
 
             # If we have a pending response, finalize it first
             if current_request and current_response_parts:
-                gemini_format.append({
-                    'request': current_request,
-                    'response': {
-                        'session.id': session_id,
-                        'model': 'claude-sonnet-4-5-20250929',
-                        'status_code': 200,
-                        'duration_ms': 0,
-                        'input_token_count': 0,
-                        'output_token_count': 0,
-                        'total_token_count': 0,
-                        'response_text': current_response_parts,
-                        'prompt_id': f"{session_id}########{prompt_counter}",
-                        'auth_type': 'claude-api-key',
-                        'event.timestamp': current_request.get('event.timestamp', '')
-                    },
-                    'error': None
-                })
+                yield build_entry(session_id, prompt_counter, current_request, current_response_parts,
+                                  current_stats)
                 prompt_counter += 1
 
+            resume = (parsed_log['offset'], prompt_counter)
+
             # Start new request
             user_content = msg.get('content', '')
 
@@ -136,11 +274,12 @@ def convert_to_gemini_format(parsed_log: Dict[str, Any]) -> List[Dict[str, Any]]
                 'session.id': session_id,
                 'event.name': 'claude.api_request',
                 'event.timestamp': event.get('timestamp', ''),
-                'model': 'claude-sonnet-4-5-20250929',
+                'model': DEFAULT_MODEL,
                 'prompt_id': f"{session_id}########{prompt_counter}",
                 'request_text': request_text
             }
             current_response_parts = []
+            current_stats = TurnStats(event.get('timestamp'))
 
         # Assistant message = response
         elif event_type == 'assistant' and 'message' in event:
@@ -188,48 +327,172 @@ def convert_to_gemini_format(parsed_log: Dict[str, Any]) -> List[Dict[str, Any]]
                             }]
                         })
 
-            # Extract token usage if available
-            usage = msg.get('usage', {})
-            if current_request:
-                current_request['input_tokens'] = usage.get('input_tokens', 0)
-                current_request['output_tokens'] = usage.get('output_tokens', 0)
+            # Token usage, model and timing of the turn
+            if current_stats is not None:
+                current_stats.add_assistant(event)
+
+    parsed_log['resume'] = resume or (parsed_log['end_offset'], prompt_counter)
 
     # Finalize last request/response pair
     if current_request and current_response_parts:
-        gemini_format.append({
-            'request': current_request,
-            'response': {
-                'session.id': session_id,
-                'model': 'claude-sonnet-4-5-20250929',
-                'status_code': 200,
-                'duration_ms': 0,
-                'input_token_count': current_request.get('input_tokens', 0),
-                'output_token_count': current_request.get('output_tokens', 0),
-                'total_token_count': current_request.get('input_tokens', 0) + current_request.get('output_tokens', 0),
-                'response_text': current_response_parts,
-                'prompt_id': f"{session_id}########{prompt_counter}",
-                'auth_type': 'claude-api-key',
-                'event.timestamp': current_request.get('event.timestamp', '')
-            },
-            'error': None
-        })
-
-    return gemini_format
-
+        yield build_entry(session_id, prompt_counter, current_request, current_response_parts, current_stats)
+
+
+def save_processed_log(data: Iterable[Dict[str, Any]], session_id: str, output_dir: Path,
+                       session_format: str = 'json', output_file: Optional[Path] = None
+                       ) -> Tuple[Optional[Path], int]:
+    """Save processed log in Gemini-compatible format (JSON array or session archive).
+
+    Entries are written one at a time as `data` yields them: added to
+    `output_file` if given (replacing entries with the same prompt_id),
+    otherwise to a new session file; files are created with the first entry.
+    Returns (output file or None if `data` was empty, number of entries).
+    """
+    if output_file is None:
+        # Use timestamp-based filename like Gemini does
+        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        filename = f"{timestamp}-{session_id[:8]}{SESSION_FORMATS[session_format]}"
+        output_file = output_dir / filename
+
+    store = None
+    count = 0
+    try:
+        for entry in data:
+            if store is None:
+                store = open_session_store(output_file)
+            store.upsert(entry_prompt_id(entry), entry)
+            count += 1
+    finally:
+        if store is not None:
+            store.close()
+    return (output_file if store is not None else None), count
+
+
+# ---------- Checkpoints ----------
+def load_checkpoints(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Return {log path: checkpoint} from the manifest ({} if missing or invalid)."""
+    try:
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+        if manifest.get('version') == CHECKPOINT_VERSION:
+            return manifest['files']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+
+def save_checkpoints(path: Path, checkpoints: Dict[str, Dict[str, Any]]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps({'version': CHECKPOINT_VERSION, 'files': checkpoints}, indent=2), encoding='utf-8')
+    tmp.replace(path)
+
+
+def is_unchanged(checkpoint: Optional[Dict[str, Any]], stat: os.stat_result) -> bool:
+    return (checkpoint is not None and checkpoint['inode'] == stat.st_ino
+            and checkpoint['size'] == stat.st_size and Path(checkpoint['output']).exists())
+
+
+def locate_output(checkpoint: Dict[str, Any]) -> Optional[Path]:
+    """
+    Return the session file a checkpoint writes to, or None if it is gone.
+
+    The viewer renames sessions to '<timestamp>-<title>', so a missing file
+    is looked up among the files with its timestamp prefix, by the session
+    id in its first entry's prompt_id ('<session id>########<n>').
+    """
+    output = Path(checkpoint['output'])
+    if output.exists():
+        return output
+    match = FILENAME_TIMESTAMP.match(output.name)
+    if match is None or not output.parent.is_dir():
+        return None
+    prefix = f"{checkpoint['session_id']}########"
+    for candidate in sorted(output.parent.glob(f'{match.group(0)}*')):
+        if candidate.suffix not in SESSION_SUFFIXES:
+            continue
+        try:
+            entries = load_entry_index(candidate)
+        except (OSError, ValueError):
+            continue
+        if entries and str(entries[0][0]).startswith(prefix):
+            return candidate
+    return None
+
+
+def resume_from(checkpoint: Optional[Dict[str, Any]], stat: os.stat_result,
+                output_file: Optional[Path]) -> Optional[Dict[str, Any]]:
+    """Return the checkpoint if the log can be continued from it (same file, not truncated)."""
+    if (checkpoint is None or output_file is None or checkpoint['inode'] != stat.st_ino
+            or checkpoint['offset'] > stat.st_size):
+        return None
+    return checkpoint
+
+
+def process_log(log_file: Path, stat: os.stat_result, checkpoint: Optional[Dict[str, Any]],
+                output_dir: Path, session_format: str, rebuild: bool = False,
+                report: Callable[[str], None] = print) -> Optional[Dict[str, Any]]:
+    """
+    Convert one Claude Code log, continuing from its checkpoint if possible.
+    With `rebuild`, or if the log was replaced, it is converted from scratch
+    into the checkpoint's session file.
+    Returns the new checkpoint, or None if the log holds no interactions yet.
+    Progress lines go to `report`.
+    """
+    output_file = locate_output(checkpoint) if checkpoint is not None else None
+    resume = None if rebuild else resume_from(checkpoint, stat, output_file)
+    if resume is not None:
+        parsed = parse_claude_log(log_file, resume['offset'], resume['session_id'])
+        gemini_data = convert_to_gemini_format(parsed, resume['prompt_counter'])
+    else:
+        if output_file is not None:
+            # Rewrite the same session file (and drop its stale sidecars)
+            if not rebuild:
+                report(f"   ♻️  Loggen er endret, konverterer på nytt")
+            for path in [output_file, *sidecar_paths(output_file)]:
+                path.unlink(missing_ok=True)
+        parsed = parse_claude_log(log_file)
+        gemini_data = convert_to_gemini_format(parsed)
+
+    saved_file, count = save_processed_log(gemini_data, parsed['session_id'], output_dir, session_format,
+                                           output_file)
+    if resume is None and not count:
+        if not parsed['event_count']:
+            report(f"   ⏭️  Ingen events funnet, hopper over")
+        else:
+            report(f"   ⏭️  Ingen interaksjoner funnet, hopper over")
+        return None
+    if count:
+        output_file = saved_file
+        report(f"   ✅ Lagret: {output_file.name}")
+        report(f"   📊 {count} {'nye/oppdaterte ' if resume else ''}interaksjoner")
+    else:
+        report(f"   ⏭️  Ingen nye interaksjoner")
 
-def save_processed_log(data: List[Dict[str, Any]], session_id: str, output_dir: Path):
-    """Save processed log in Gemini-compatible format."""
-    output_dir.mkdir(parents=True, exist_ok=True)
+    offset, prompt_counter = parsed['resume']
+    return {
+        'inode': stat.st_ino,
+        'size': stat.st_size,
+        'offset': offset,
+        'prompt_counter': prompt_counter,
+        'session_id': parsed['session_id'],
+        'output': str(output_file)
+    }
 
-    # Use timestamp-based filename like Gemini does
-    timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    filename = f"{timestamp}-{session_id[:8]}.json"
-    output_file = output_dir / filename
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+def convert_log_job(job: Tuple[Path, os.stat_result, Optional[Dict[str, Any]], Path, str, bool],
+                    report: Optional[Callable[[str], None]] = None
+                    ) -> Tuple[Optional[Dict[str, Any]], List[str], Optional[str]]:
+    """
+    Convert one log and return (checkpoint, progress lines, error).
 
-    return output_file
+    Pool workers buffer their progress lines (report=None), so the parent
+    prints each log's report in order; a serial run passes report=print.
+    """
+    lines: List[str] = []
+    try:
+        return process_log(*job, report=report or lines.append), lines, None
+    except Exception as e:
+        return None, lines, str(e)
 
 
 def main():
@@ -253,8 +516,33 @@ def main():
         action='store_true',
         help='Process all sessions (ignores --limit)'
     )
+    parser.add_argument(
+        '--format',
+        choices=sorted(SESSION_FORMATS),
+        default='json',
+        help='Output format: json (default) or archive (compressed, indexed)'
+    )
+    parser.add_argument(
+        '--checkpoint-file',
+        type=Path,
+        default=DEFAULT_CHECKPOINT_FILE,
+        help=f'Checkpoint manifest for incremental runs (default: {DEFAULT_CHECKPOINT_FILE})'
+    )
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Convert every selected log from scratch (into the same session files)'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Convert logs with N worker processes (0 = all cores, default: 1)'
+    )
 
     args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
 
     print("🔍 Søker etter Claude Code logger...")
     log_files = find_claude_logs()
@@ -272,36 +560,52 @@ def main():
     else:
         print(f"📝 Prosesserer alle {len(log_files)} sesjoner...")
 
+    checkpoints = load_checkpoints(args.checkpoint_file)
     processed_count = 0
+    unchanged_count = 0
+    pending = []
     for log_file in log_files:
         try:
+            stat = log_file.stat()
+        except OSError as e:
             print(f"\n🔄 Prosesserer: {log_file.name}")
-            parsed = parse_claude_log(log_file)
-
-            if not parsed['events']:
-                print(f"   ⏭️  Ingen events funnet, hopper over")
-                continue
-
-            gemini_data = convert_to_gemini_format(parsed)
-
-            if not gemini_data:
-                print(f"   ⏭️  Ingen interaksjoner funnet, hopper over")
-                continue
-
-            output_file = save_processed_log(
-                gemini_data,
-                parsed['session_id'],
-                args.output_dir
-            )
-
-            print(f"   ✅ Lagret: {output_file.name}")
-            print(f"   📊 {len(gemini_data)} interaksjoner")
-            processed_count += 1
-
-        except Exception as e:
             print(f"   ❌ Feil: {e}")
             continue
-
+        checkpoint = checkpoints.get(str(log_file))
+        if not args.rebuild and is_unchanged(checkpoint, stat):
+            unchanged_count += 1
+            continue
+        pending.append((log_file, stat, checkpoint, args.output_dir, args.format, args.rebuild))
+
+    pool = None
+    if jobs > 1 and len(pending) > 1:
+        print(f"⚡ Bruker {min(jobs, len(pending))} prosesser")
+        pool = ProcessPoolExecutor(max_workers=min(jobs, len(pending)))
+    try:
+        # map() yields in submission order, so the report matches a serial run
+        results = pool.map(convert_log_job, pending) if pool else None
+        for job in pending:
+            log_file = job[0]
+            print(f"\n🔄 Prosesserer: {log_file.name}")
+            if results is None:
+                new_checkpoint, _, error = convert_log_job(job, report=print)
+            else:
+                new_checkpoint, lines, error = next(results)
+                for line in lines:
+                    print(line)
+            if error is not None:
+                print(f"   ❌ Feil: {error}")
+            elif new_checkpoint is not None:
+                checkpoints[str(log_file)] = new_checkpoint
+                processed_count += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    save_checkpoints(args.checkpoint_file, checkpoints)
+
+    if unchanged_count:
+        print(f"\n⏭️  {unchanged_count} uendrede logger hoppet over")
     print(f"\n✨ Ferdig! Prosesserte {processed_count} sesjoner")
     print(f"📁 Filer lagret i: {args.output_dir}")
     print(f"\n💡 For å se logger, kjør:")
@@ -10,19 +10,75 @@ Serves the .logging directory with CORS headers enabled and automatically
 opens the viewer in your default browser.
 
 Usage:
-    uv run .logging/server.py [port]
-    python .logging/server.py [port]
+    uv run .logging/server.py [port] [--workers N] [--host HOST]
+    python .logging/server.py [port] [--workers N] [--host HOST]
 
-Default port: 8000
+Default port: 8000. Requests are served concurrently by a bounded pool of
+worker threads (default: 8), so a large session download does not block
+/api/files, rename or delete.
+
+GET /api/metrics?minutes=N returns rolling p50/p95/p99 latency per model
+and tool, token usage and gemini_cli.* metric summaries (metrics_agg.py),
+fed by the log.jsonl tail and OTLP exports.
+
+The server is also an OTLP/HTTP receiver (POST /v1/logs, /v1/metrics; see
+otlp_receiver.py): point Gemini CLI's otlpEndpoint at http://localhost:8000
+and session files are written without going through log.jsonl. Use
+--db [PATH] to also feed the SQLite telemetry store.
 """
 
 import sys
 import json
+import os
+import argparse
 import re
+import gzip
+import hashlib
+import queue
+import shutil
+import threading
+import itertools
+import time
 import webbrowser
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from pathlib import Path
-from urllib.parse import unquote, quote
+from urllib.parse import unquote, urlsplit, parse_qs
+
+from jsonscan import iter_values
+from metrics_agg import MetricsAggregator
+from otlp_receiver import OTLP_PATHS, OTLPReceiver, serve_export
+from session_archive import is_archive, iter_archive_raw, iter_session_raw, load_entry_index, read_entries_raw
+from session_store import (
+    JSON_SUFFIX, REFS_KEY, SESSION_SUFFIXES, chunks_path, encode_entry, expand_entry, gzip_path, load_chunks,
+    sidecar_paths,
+)
+from telemetry_db import TelemetryDB
+from telemetry_events import record_to_op
+
+# Persistent /api/files metadata cache (relative to the .logging directory)
+FILES_INDEX_FILE = Path('.files-index.json')
+
+DEFAULT_WORKERS = 8
+
+# /api/live: telemetry log followed by the shared tailer (relative to .logging)
+LIVE_LOG_FILE = Path('log.jsonl')
+LIVE_POLL_SECONDS = 0.5
+LIVE_KEEPALIVE_SECONDS = 15
+# SSE connections stay open, so they get their own slots on top of --workers
+MAX_LIVE_CLIENTS = 16
+# Updates a slow client may lag behind before it is disconnected
+LIVE_QUEUE_SIZE = 256
+# Most recently updated prompts replayed to newly connected clients
+LIVE_RECENT_PROMPTS = 50
+
+# /api/sessions/<filename>/entries page sizes
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Session files smaller than this are not worth compressing
+GZIP_MIN_BYTES = 16 * 1024
 
 
 def to_kebab_case(text):
@@ -69,12 +125,13 @@ def parse_session_filename(filename):
     Handles both new and old formats:
     - New: {timestamp}-{kebab-title}.json
     - Old: {timestamp}-{session_id}--{title}.json (backwards compatibility)
+    Session archives (.archive) are named the same way.
     
     Returns:
         dict with 'timestamp' and 'title', or None if invalid
         Note: session_id is NOT in new filenames, must be loaded from JSON
     """
-    name = filename.replace(".json", "")
+    name = re.sub(r"\.(json|archive)$", "", filename)
     
     # Check for old format with '--' separator
     if "--" in name:
@@ -101,13 +158,14 @@ def parse_session_filename(filename):
     return None
 
 
-def build_session_filename(timestamp, session_id, title=None):
+def build_session_filename(timestamp, session_id, title=None, suffix=JSON_SUFFIX):
     """Build session filename in format: {timestamp}-{kebab-title}.json
     
     Args:
         timestamp: Timestamp string in YYYY-MM-DD_HH-MM-SS format
         session_id: Session UUID (used as default title if no custom title)
         title: Optional custom title (will be kebab-cased)
+        suffix: '.json', or '.archive' for session archives
     
     Returns:
         Filename like '2025-10-30_01-13-48-fase-1-started.json' (with title)
@@ -116,77 +174,758 @@ def build_session_filename(timestamp, session_id, title=None):
     if title:
         sanitized = sanitize_title(title)
         if sanitized:
-            return f"{timestamp}-{sanitized}.json"
+            return f"{timestamp}-{sanitized}{suffix}"
     
     # Use session_id as default title (already in kebab-case format)
-    return f"{timestamp}-{session_id}.json"
+    return f"{timestamp}-{session_id}{suffix}"
+
+
+def read_session_id(json_file):
+    """Return session.id of the first request in a session file.
+
+    Only the first entry is decoded, so large session files cost a few
+    kilobytes of reading.
+    """
+    if is_archive(json_file):
+        raws = iter_archive_raw(json_file)
+    else:
+        with json_file.open('rb') as f:
+            raws = [raw for _, _, raw in itertools.islice(iter_values(f, level=1), 1)]
+    for raw in raws:
+        first_item = json.loads(raw)
+        if first_item.get('request'):
+            return first_item['request'].get('session.id')
+        return None
+    return None
+
+
+def describe_session_file(json_file, stat):
+    """Build the /api/files entry for one session file, or None if the name is invalid."""
+    parsed = parse_session_filename(json_file.name)
+    if not parsed:
+        return None
+
+    timestamp_str = parsed['timestamp']
+    year, month, day = timestamp_str.split('_')[0].split('-')
+    time_part = timestamp_str.split('_')[1]
+    hour, minute, second = time_part.split('-')
+    timestamp = f"{year}-{month}-{day}T{hour}:{minute}:{second}"
+
+    # Extract session ID from JSON content
+    try:
+        session_id = read_session_id(json_file)
+    except Exception:
+        # If we can't read the file, use title as fallback
+        session_id = parsed['title']
+
+    return {
+        'filename': json_file.name,
+        'timestamp': timestamp,
+        'sessionId': session_id,
+        'title': parsed['title'],
+        'size': stat.st_size
+    }
+
+
+def is_session_filename(name):
+    """True for a plain '<name>.json' or '<name>.archive' inside requests/ (no path components)."""
+    return (name.endswith(SESSION_SUFFIXES) and not name.startswith('.')
+            and '/' not in name and '\\' not in name)
+
+
+def compressed_variant(session_file, stat):
+    """Return the gzip variant of a session file, creating it if needed.
+
+    The variant's mtime is set to the source's mtime, so it is reused for as
+    long as the source is unchanged. Returns None if the source changed
+    while compressing.
+    """
+    gz_file = gzip_path(session_file)
+    try:
+        if gz_file.stat().st_mtime_ns == stat.st_mtime_ns:
+            return gz_file
+    except OSError:
+        pass
+
+    tmp = gz_file.with_name(f'{gz_file.name}.{threading.get_ident()}.tmp')
+    with session_file.open('rb') as src, gzip.open(tmp, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    if session_file.stat().st_mtime_ns != stat.st_mtime_ns:
+        tmp.unlink(missing_ok=True)
+        return None
+    os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    tmp.replace(gz_file)
+    return gz_file
+
+
+def parse_byte_range(header, size):
+    """Parse a single-range 'bytes=' header.
+
+    Returns (start, end) inclusive, None if the header should be ignored
+    (malformed or multi-range), or False if the range is unsatisfiable.
+    """
+    match = re.fullmatch(r'\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*', header)
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or size == 0:
+        return False
+    return start, end
+
+
+class LiveTail:
+    """Follows log.jsonl and fans out grouped updates to /api/live clients.
+
+    A single background thread reads records appended since its byte offset
+    (jsonscan framing, so a record Gemini is still writing waits until it is
+    complete), groups them by session and prompt_id like process_log_file,
+    and encodes each update once for all subscribers. Truncation (e.g. by
+    process-api-requests.py) or replacement of the log restarts from the top.
+    Ops received over OTLP are pushed in directly through publish_op().
+    Every decoded record is also handed to `record_listeners` (metrics).
+
+    Events carry an `id:` ("<start>-<seq>"), so a reconnecting EventSource
+    sends Last-Event-ID and is only primed with what it has not seen yet.
+    """
+
+    def __init__(self, log_file, poll_seconds=LIVE_POLL_SECONDS):
+        self.log_file = log_file
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self.record_listeners = []
+        self._recent = OrderedDict()  # (session_id, prompt_id) -> {kind: (seq, encoded event)}
+        self._run_id = format(int(time.time()), 'x')
+        self._seq = 0
+        self._thread = None
+        self._offset = None
+        self._inode = None
+
+    def subscribe(self, last_event_id=None):
+        """Register a client; returns its queue, primed with recent prompts
+        (only events after `last_event_id` when it is from this run)."""
+        run_id, _, seq = (last_event_id or '').partition('-')
+        after = int(seq) if run_id == self._run_id and seq.isdigit() else 0
+        with self._lock:
+            if len(self._subscribers) >= MAX_LIVE_CLIENTS:
+                return None
+            q = queue.Queue(LIVE_QUEUE_SIZE)
+            for events in list(self._recent.values())[-LIVE_RECENT_PROMPTS:]:
+                for seq, event in events.values():
+                    if seq > after:
+                        q.put_nowait(event)
+            self._subscribers.add(q)
+        self.start()
+        return q
+
+    def start(self):
+        """Start following the log (idempotent)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live-tail', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _publish(self, key, kind, event):
+        with self._lock:
+            self._seq += 1
+            event = f'id: {self._run_id}-{self._seq}\n'.encode('ascii') + event
+            events = self._recent.pop(key, {})
+            events[kind] = (self._seq, event)
+            self._recent[key] = events
+            while len(self._recent) > LIVE_RECENT_PROMPTS:
+                self._recent.popitem(last=False)
+            for q in list(self._subscribers):
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    # Too slow: drop it; the handler sees None and disconnects
+                    self._subscribers.discard(q)
+                    q.queue.clear()
+                    q.put_nowait(None)
+
+    def _start_offset(self, f, size):
+        """Offset of the last record start ('{' at a line start) near EOF."""
+        pos = size
+        while pos > 0:
+            start = max(0, pos - (1 << 16))
+            f.seek(start)
+            window = f.read(pos - start + 1)
+            i = window.rfind(b'\n{')
+            if i >= 0:
+                return start + i + 1
+            pos = start
+        return 0
+
+    def _run(self):
+        last_error = None
+        while True:
+            try:
+                self._poll()
+                last_error = None
+            except OSError:
+                pass
+            except Exception as e:
+                # A bad record or a failing listener must not stop the tail;
+                # the offset is already past the record, so polling goes on
+                error = f'{type(e).__name__}: {e}'
+                if error != last_error:
+                    print(f'⚠️  Live tail error at offset {self._offset} of {self.log_file}: {error}',
+                          file=sys.stderr)
+                last_error = error
+            time.sleep(self.poll_seconds)
+
+    def _poll(self):
+        try:
+            stat = self.log_file.stat()
+        except FileNotFoundError:
+            self._offset = 0
+            return
+
+        with self.log_file.open('rb') as f:
+            if self._offset is None:
+                # First poll: only follow what is written from now on. Skip
+                # the complete records at EOF (clients get those from the
+                # session listing); a record still being written is new.
+                self._offset = self._start_offset(f, stat.st_size)
+                for _, end, _ in iter_values(f, self._offset):
+                    self._offset = end
+            elif stat.st_size < self._offset or stat.st_ino != self._inode:
+                self._offset = 0
+            self._inode = stat.st_ino
+
+            for _, end, raw in iter_values(f, self._offset):
+                self._offset = end
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    continue
+                for listener in self.record_listeners:
+                    listener(record)
+                if not isinstance(record, dict):
+                    continue
+                op = record_to_op(record)
+                if op is None or op[3] is None:
+                    continue
+                self.publish_op(op)
+
+    def publish_op(self, op):
+        """Encode a (session_id, prompt_id, timestamp, kind, payload) op once and fan it out."""
+        session_id, prompt_id, timestamp, kind, payload = op
+        data = json.dumps({
+            'sessionId': session_id,
+            'promptId': prompt_id,
+            'timestamp': timestamp,
+            'kind': kind,
+            'data': payload
+        }, ensure_ascii=False)
+        event = f'event: entry\ndata: {data}\n\n'.encode('utf-8')
+        self._publish((session_id, prompt_id), kind, event)
+
+
+class SessionFileIndex:
+    """Cached metadata for /api/files.
+
+    Entries are keyed by filename and reused while the file's mtime and size
+    are unchanged, so listing an unchanged directory only costs a scandir.
+    The cache is persisted to `cache_file` to survive server restarts; it is
+    read on the first snapshot, so relative paths resolve against the
+    directory main() serves from (the instance is created at import time).
+    """
+
+    def __init__(self, requests_dir, cache_file):
+        self.requests_dir = requests_dir
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        try:
+            entries = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            entries = None
+        return entries if isinstance(entries, dict) else {}
+
+    def snapshot(self):
+        """Return (etag, files) for the current directory contents, newest first."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            current = {}
+            changed = False
+            if self.requests_dir.exists():
+                with os.scandir(self.requests_dir) as it:
+                    for dir_entry in it:
+                        if not is_session_filename(dir_entry.name) or not dir_entry.is_file():
+                            continue
+                        stat = dir_entry.stat()
+                        cached = self._entries.get(dir_entry.name)
+                        if (cached and cached['mtime_ns'] == stat.st_mtime_ns
+                                and cached['size'] == stat.st_size):
+                            current[dir_entry.name] = cached
+                            continue
+                        info = describe_session_file(Path(dir_entry.path), stat)
+                        current[dir_entry.name] = {
+                            'mtime_ns': stat.st_mtime_ns,
+                            'size': stat.st_size,
+                            'info': info
+                        }
+                        changed = True
+
+            if changed or current.keys() != self._entries.keys():
+                self._entries = current
+                try:
+                    tmp = self.cache_file.with_suffix('.tmp')
+                    tmp.write_text(json.dumps(current), encoding='utf-8')
+                    tmp.replace(self.cache_file)
+                except OSError:
+                    pass
+
+            names = sorted(current, reverse=True)
+            digest = hashlib.sha1()
+            for name in names:
+                digest.update(f"{name}:{current[name]['mtime_ns']}:{current[name]['size']}\n".encode())
+            files = [current[name]['info'] for name in names if current[name]['info']]
+            return digest.hexdigest(), files
+
+
+class EntryIndexCache:
+    """In-memory cache of session entry indexes ([prompt_id, start, end] spans).
+
+    Indexes come from session_store.load_index, which reuses the session's
+    .idx sidecar or rebuilds it with a streaming scan (or from an archive's
+    footer), and are kept per (filename, mtime, size) so repeated page
+    requests skip the sidecar too.
+    """
+
+    def __init__(self, max_sessions=32):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def get(self, session_file, stat):
+        key = (session_file.name, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            spans = self._cache.get(key)
+            if spans is None:
+                spans = load_entry_index(session_file)
+                if len(self._cache) >= self.max_sessions:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = spans
+            return spans
+
+
+class ChunkCache:
+    """In-memory cache of deduplicated sessions' chunk tables (hash -> JSON text).
+
+    Kept per (filename, mtime, size) of the `.chunks` file; the table is
+    append-only, so a changed key just means new messages were added.
+    """
+
+    def __init__(self, max_sessions=8):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def get(self, session_file):
+        try:
+            stat = chunks_path(session_file).stat()
+        except FileNotFoundError:
+            return {}
+        key = (session_file.name, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            chunks = self._cache.get(key)
+            if chunks is None:
+                chunks = load_chunks(session_file)
+                for old in [k for k in self._cache if k[0] == session_file.name]:
+                    del self._cache[old]
+                if len(self._cache) >= self.max_sessions:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = chunks
+            return chunks
+
+
+file_index = SessionFileIndex(Path('requests'), FILES_INDEX_FILE)
+entry_indexes = EntryIndexCache()
+chunk_tables = ChunkCache()
+live_tail = LiveTail(LIVE_LOG_FILE)
+otlp_receiver = OTLPReceiver(Path('requests'))
+otlp_receiver.op_listeners.append(live_tail.publish_op)
+metrics = MetricsAggregator()
+live_tail.record_listeners.append(metrics.add_record)
+otlp_receiver.record_listeners.append(metrics.add_record)
+otlp_receiver.metric_listeners.append(metrics.add_point)
 
 
 class CORSRequestHandler(SimpleHTTPRequestHandler):
     """HTTP request handler with CORS headers enabled."""
 
+    # Per-response Cache-Control; handlers that send validators override it
+    cache_control = 'no-store, no-cache, must-revalidate'
+
     def end_headers(self):
         """Add CORS headers to all responses."""
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Range, If-None-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag, X-Total-Count, Content-Range, Content-Encoding')
+        self.send_header('Cache-Control', self.cache_control)
         super().end_headers()
 
     def do_GET(self):
         """Handle GET requests, including API endpoints."""
+        url = urlsplit(self.path)
+
         # API endpoint to list JSON files
-        if self.path == '/api/files':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+        if url.path == '/api/files':
+            self.send_file_list(parse_qs(url.query))
+            return
+
+        # Rolling latency/token aggregates
+        if url.path == '/api/metrics':
+            self.send_metrics(parse_qs(url.query))
+            return
+
+        # Server-Sent Events stream of new telemetry
+        if url.path == '/api/live':
+            self.send_live_events()
+            return
 
-            # Get all JSON files from requests/ folder
-            requests_dir = Path('requests')
-            if requests_dir.exists():
-                files = []
-                for json_file in sorted(requests_dir.glob('*.json'), reverse=True):
-                    stat = json_file.stat()
-
-                    # Parse filename to extract timestamp and title
-                    parsed = parse_session_filename(json_file.name)
-                    if parsed:
-                        timestamp_str = parsed['timestamp']
-                        year, month, day = timestamp_str.split('_')[0].split('-')
-                        time_part = timestamp_str.split('_')[1]
-                        hour, minute, second = time_part.split('-')
-                        timestamp = f"{year}-{month}-{day}T{hour}:{minute}:{second}"
-                        
-                        # Extract session ID from JSON content
-                        session_id = None
-                        try:
-                            with json_file.open('r', encoding='utf-8') as f:
-                                data = json.load(f)
-                                # Get session.id from first request
-                                if data and len(data) > 0:
-                                    first_item = data[0]
-                                    if 'request' in first_item and first_item['request']:
-                                        session_id = first_item['request'].get('session.id')
-                        except Exception:
-                            # If we can't read the file, use title as fallback
-                            session_id = parsed['title']
-
-                        files.append({
-                            'filename': json_file.name,
-                            'timestamp': timestamp,
-                            'sessionId': session_id,
-                            'title': parsed['title'],
-                            'size': stat.st_size
-                        })
-
-                self.wfile.write(json.dumps(files).encode())
-            else:
-                self.wfile.write(b'[]')
+        # API endpoint to page through a session's entries
+        match = re.fullmatch(r'/api/sessions/([^/]+)/entries', url.path)
+        if match:
+            self.send_session_entries(unquote(match.group(1)), parse_qs(url.query))
+            return
+
+        # Session files: validators, Range and gzip
+        name = self.session_file_name(url.path)
+        if name:
+            self.send_session_file(name)
             return
 
         # Default file serving
         super().do_GET()
 
+    def do_HEAD(self):
+        """Handle HEAD requests, answering session files like GET."""
+        name = self.session_file_name(urlsplit(self.path).path)
+        if name:
+            self.send_session_file(name, head_only=True)
+            return
+        super().do_HEAD()
+
+    @staticmethod
+    def session_file_name(path):
+        """Return the filename if `path` is /requests/<name>.json, else None."""
+        if not path.startswith('/requests/'):
+            return None
+        name = unquote(path[len('/requests/'):])
+        return name if is_session_filename(name) else None
+
+    def send_live_events(self):
+        """Stream request/response/error updates from log.jsonl as SSE.
+
+        Each `entry` event carries {sessionId, promptId, timestamp, kind,
+        data}; `data` is the event's attributes with JSON fields parsed,
+        i.e. what process-api-requests.py stores under entry[kind].
+        """
+        q = live_tail.subscribe(self.headers.get('Last-Event-ID'))
+        if q is None:
+            self.send_error(503, 'Too many live clients')
+            return
+
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.end_headers()
+            self.wfile.write(b'retry: 2000\n\n')
+            self.wfile.flush()
+            while True:
+                try:
+                    event = q.get(timeout=LIVE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    event = b': keepalive\n\n'
+                if event is None:
+                    break
+                self.wfile.write(event)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            live_tail.unsubscribe(q)
+            self.close_connection = True
+
+    def send_metrics(self, query):
+        """Return MetricsAggregator.snapshot() for the last `minutes` minutes."""
+        try:
+            minutes = int(query.get('minutes', ['0'])[0]) or None
+        except ValueError:
+            self.send_error(400, 'Invalid minutes')
+            return
+        body = json.dumps(metrics.snapshot(minutes), ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_session_entries(self, filename, query):
+        """Return a page of a session's entries without loading the whole file.
+
+        Response: {"filename", "total", "offset", "limit", "entries": [...]}.
+        Entries are copied verbatim from the session file using the byte
+        spans of its index, so no entry is decoded or re-encoded (archive
+        entries are decompressed, and sent as compact JSON).
+
+        Entries of deduplicated sessions (process-api-requests.py --dedup)
+        have their request_text expanded from the chunk table. With
+        `refs=1` they are sent as stored ({"$refs": [...]}) instead, plus
+        "chunks": {hash: message} for the hashes used on the page, so
+        history shared between entries is transferred once.
+        """
+        # Strip 'requests/' prefix if present (frontend sends full path)
+        if filename.startswith('requests/'):
+            filename = filename[9:]
+        if not is_session_filename(filename):
+            self.send_error(400, 'Invalid filename')
+            return
+
+        try:
+            offset = int(query.get('offset', ['0'])[0])
+            limit = int(query.get('limit', [str(DEFAULT_PAGE_SIZE)])[0])
+            if offset < 0 or not 0 <= limit <= MAX_PAGE_SIZE:
+                raise ValueError
+        except ValueError:
+            self.send_error(400, f'Invalid offset or limit (max {MAX_PAGE_SIZE})')
+            return
+
+        send_refs = query.get('refs', ['0'])[0] == '1'
+        path = Path('requests') / filename
+        chunk_map = {}
+        try:
+            stat = path.stat()
+            spans = entry_indexes.get(path, stat)
+            raws = read_entries_raw(path, spans[offset:offset + limit])
+            if any(REFS_KEY.encode() in raw for raw in raws):
+                chunks = chunk_tables.get(path)
+                decoded = {}
+                for i, raw in enumerate(raws):
+                    if REFS_KEY.encode() not in raw:
+                        continue
+                    entry = json.loads(raw)
+                    if send_refs:
+                        for digest in entry['request']['request_text'][REFS_KEY]:
+                            chunk_map[digest] = chunks[digest]
+                    else:
+                        raws[i] = json.dumps(expand_entry(entry, chunks, decoded), ensure_ascii=False).encode('utf-8')
+        except FileNotFoundError:
+            self.send_error(404, 'File not found')
+            return
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+
+        head = json.dumps({
+            'filename': filename,
+            'total': len(spans),
+            'offset': offset,
+            'limit': limit
+        })
+        body = head[:-1].encode() + b', "entries": [' + b','.join(raws) + b']'
+        if send_refs:
+            body += b', "chunks": {' + ','.join(
+                f'"{digest}": {encoded}' for digest, encoded in chunk_map.items()).encode('utf-8') + b'}'
+        body += b'}'
+
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_session_file(self, name, head_only=False):
+        """Serve a session file with ETag/Last-Modified, Range and gzip support.
+
+        Responses are revalidated (no-cache) instead of no-store, so an
+        unchanged session is answered with 304. A single byte range is served
+        as 206 from the original file; otherwise clients accepting gzip get a
+        compressed variant cached next to the session file.
+
+        Archives and deduplicated sessions are decoded to a JSON array on
+        the fly (see send_decoded_session).
+        """
+        path = Path('requests') / name
+        try:
+            stat = path.stat()
+        except OSError:
+            self.send_error(404, 'File not found')
+            return
+
+        try:
+            chunks_stat = chunks_path(path).stat()
+        except OSError:
+            chunks_stat = None
+        if chunks_stat or is_archive(path):
+            self.send_decoded_session(path, stat, chunks_stat, head_only)
+            return
+
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = self.date_time_string(stat.st_mtime)
+        self.cache_control = 'no-cache'
+
+        accepts_gzip = 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        use_gzip = accepts_gzip and stat.st_size >= GZIP_MIN_BYTES
+        variant_etag = etag[:-1] + '-gzip"' if use_gzip else etag
+
+        if_none_match = self.headers.get('If-None-Match')
+        not_modified = (etag in if_none_match or variant_etag in if_none_match or if_none_match.strip() == '*'
+                        if if_none_match else self.headers.get('If-Modified-Since') == last_modified)
+        if not_modified:
+            self.send_response(304)
+            self.send_header('ETag', variant_etag)
+            self.send_header('Last-Modified', last_modified)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        byte_range = None
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range', etag) in (etag, last_modified):
+            byte_range = parse_byte_range(range_header, stat.st_size)
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{stat.st_size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        source, start, length = path, 0, stat.st_size
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{stat.st_size}')
+        else:
+            gz_file = compressed_variant(path, stat) if use_gzip else None
+            self.send_response(200)
+            if gz_file:
+                source, length = gz_file, gz_file.stat().st_size
+                self.send_header('Content-Encoding', 'gzip')
+                etag = variant_etag
+
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        if head_only:
+            return
+
+        with source.open('rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining:
+                chunk = f.read(min(remaining, 1 << 16))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def send_decoded_session(self, path, stat, chunks_stat=None, head_only=False):
+        """Serve an archive or a deduplicated session file as a JSON array.
+
+        Archive entries are decompressed and deduplicated request_text is
+        expanded. The JSON is generated while streaming, so it has no
+        Content-Length and no Range/gzip support; ETag/304 still apply.
+        """
+        chunks_mtime_ns = chunks_stat.st_mtime_ns if chunks_stat else 0
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{chunks_mtime_ns:x}-x"'
+        last_modified = self.date_time_string(max(stat.st_mtime, chunks_stat.st_mtime if chunks_stat else 0))
+        self.cache_control = 'no-cache'
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and (etag in if_none_match or if_none_match.strip() == '*'):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Accept-Ranges', 'none')
+        self.end_headers()
+        self.close_connection = True
+        if head_only:
+            return
+
+        chunks = chunk_tables.get(path) if chunks_stat else {}
+        decoded = {}
+        separator = b'[\n'
+        for raw in iter_session_raw(path):
+            if chunks and REFS_KEY.encode() in raw:
+                raw = encode_entry(expand_entry(json.loads(raw), chunks, decoded))
+            self.wfile.write(separator + raw)
+            separator = b',\n'
+        self.wfile.write(b'[]' if separator == b'[\n' else b'\n]')
+
+    def send_file_list(self, query):
+        """List session files from the cached index.
+
+        Supports ?offset=&limit= pagination (total count in X-Total-Count)
+        and ETag/If-None-Match, so an unchanged listing is answered with 304.
+        """
+        try:
+            offset = int(query.get('offset', ['0'])[0])
+            limit = int(query['limit'][0]) if 'limit' in query else None
+            if offset < 0 or (limit is not None and limit < 0):
+                raise ValueError
+        except ValueError:
+            self.send_error(400, 'Invalid offset or limit')
+            return
+
+        version, files = file_index.snapshot()
+        etag = f'"{version}-{offset}-{limit}"'
+        self.cache_control = 'no-cache'
+
+        if etag in (self.headers.get('If-None-Match') or ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        page = files[offset:] if limit is None else files[offset:offset + limit]
+        body = json.dumps(page).encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('X-Total-Count', str(len(files)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        """Handle POST requests: OTLP/HTTP exports."""
+        if urlsplit(self.path).path in OTLP_PATHS:
+            serve_export(self, otlp_receiver)
+            return
+        self.send_error(404, 'Not found')
+
     def do_PUT(self):
         """Handle PUT requests for API endpoints."""
         # API endpoint to rename session file
@@ -221,7 +960,8 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
                 new_filename = build_session_filename(
                     parsed['timestamp'],
                     None,  # Session ID not needed when we have a custom title
-                    new_title
+                    new_title,
+                    Path(current_filename).suffix
                 )
 
                 # Rename the file
@@ -238,6 +978,9 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
                     return
 
                 old_path.rename(new_path)
+                for old_sidecar, new_sidecar in zip(sidecar_paths(old_path), sidecar_paths(new_path)):
+                    if old_sidecar.exists():
+                        old_sidecar.replace(new_sidecar)
 
                 # Return success with new filename
                 self.send_response(200)
@@ -297,8 +1040,10 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
                     self.send_error(404, 'File not found')
                     return
 
-                # Delete the file
+                # Delete the file (and its index/gzip sidecars, if any)
                 file_path.unlink()
+                for sidecar in sidecar_paths(file_path):
+                    sidecar.unlink(missing_ok=True)
 
                 # Return success
                 self.send_response(200)
@@ -327,12 +1072,47 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
 
     def log_message(self, format, *args):
         """Customize log messages to be more concise."""
-        if args[1] == '200':
-            # Only log non-200 responses to reduce noise
+        if len(args) > 1 and args[1] in ('200', '206', '304'):
+            # Only log unsuccessful responses to reduce noise
             return
         super().log_message(format, *args)
 
 
+class ThreadPoolHTTPServer(HTTPServer):
+    """HTTPServer that handles connections on a bounded pool of threads.
+
+    Like socketserver.ThreadingMixIn, but with a fixed number of threads
+    (`workers`, plus MAX_LIVE_CLIENTS slots for long-lived /api/live
+    streams); further connections wait in the pool's queue instead of
+    spawning unbounded threads.
+    """
+
+    request_queue_size = 64
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        # Long-lived /api/live streams must not starve regular requests
+        self.executor = ThreadPoolExecutor(max_workers=workers + MAX_LIVE_CLIENTS,
+                                           thread_name_prefix='http-worker')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_worker, request, client_address)
+
+    def process_request_worker(self, request, client_address):
+        """Same as ThreadingMixIn.process_request_thread, run on the pool."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
 def main():
     # Fix encoding for Windows console
     import io
@@ -340,32 +1120,43 @@ def main():
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-    # Parse port from command line args
-    port = 8000
-    if len(sys.argv) > 1:
-        try:
-            port = int(sys.argv[1])
-        except ValueError:
-            print(f"Invalid port number: {sys.argv[1]}")
-            print("Usage: python server.py [port]")
-            sys.exit(1)
+    parser = argparse.ArgumentParser(description='HTTP server for the API Request Viewer')
+    parser.add_argument('port', nargs='?', type=int, default=8000,
+                        help='Port to listen on (default: 8000)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Maximum concurrent requests (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--host', default='localhost',
+                        help='Interface to bind, e.g. 0.0.0.0 to share the viewer (default: localhost)')
+    parser.add_argument('--db', type=Path, nargs='?', const=Path(__file__).parent / 'telemetry.db',
+                        metavar='PATH', help='Feed OTLP exports into the SQLite telemetry store '
+                                             '(default: .logging/telemetry.db)')
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    port = args.port
+    # Resolve before changing directory
+    db_path = args.db.resolve() if args.db else None
 
     # Change to .logging directory
     script_dir = Path(__file__).parent
-    import os
     os.chdir(script_dir)
 
     # Create server
-    server_address = ('localhost', port)
-    httpd = HTTPServer(server_address, CORSRequestHandler)
+    server_address = (args.host, port)
+    httpd = ThreadPoolHTTPServer(server_address, CORSRequestHandler, args.workers)
+    if db_path:
+        otlp_receiver.db = TelemetryDB(db_path)
+    # Follow log.jsonl from now on so /api/metrics is fed without /api/live clients
+    live_tail.start()
 
     # Print startup message
     url = f'http://localhost:{port}/api-viewer.html'
     print('='*60)
     print('🚀 API Request Viewer Server')
     print('='*60)
-    print(f'Server running at: http://localhost:{port}')
+    print(f'Server running at: http://{args.host}:{port} ({args.workers} workers)')
     print(f'Viewer URL: {url}')
+    print(f'OTLP endpoint: http://{args.host}:{port} (/v1/logs, /v1/metrics)')
     print('\nPress Ctrl+C to stop the server')
     print('='*60)
 
@@ -379,6 +1170,8 @@ def main():
     except KeyboardInterrupt:
         print('\n\n👋 Shutting down server...')
         httpd.shutdown()
+        httpd.server_close()
+        otlp_receiver.close()
         print('✅ Server stopped')
 
 
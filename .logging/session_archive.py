@@ -0,0 +1,452 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+Compressed session archives: an alternative to the JSON array session files.
+
+A `<name>.archive` file holds the same entries as `<name>.json`, one
+compressed frame per entry, followed by a footer index:
+
+    b"SESSARC1"                                  header
+    [u32 length][u8 kind=0][zlib(compact JSON)]  one frame per entry
+    ...
+    [u32 length][u8 kind=1][zlib(footer JSON)]   footer frame
+    [u64 footer offset][b"SIDX"]                 trailer
+
+The footer is {"version": 1, "entries": [[prompt_id, timestamp, start, end], ...]}
+in session order, where start/end is the byte span of the entry's
+compressed payload. Reading one entry is one seek and one decompress, and
+entries can be selected by prompt_id or timestamp from the footer alone.
+
+SessionArchive has the SessionStore interface (get/upsert/close), so
+process-api-requests.py writes archives incrementally: new frames are
+written over the old footer, and replacing an entry that is not the last
+frame appends a new frame and repoints the index (the old frame is dead
+space until the archive is compacted). If the trailer is missing, e.g. the
+writer was killed, the index is rebuilt by walking the frames.
+
+zlib is used rather than zstd so the module stays stdlib-only like the
+other shared modules (server.py has no dependencies).
+
+Convert existing sessions either way:
+    uv run .logging/session_archive.py to-archive .logging/requests/*.json
+    uv run .logging/session_archive.py to-json .logging/requests/*.archive
+    uv run .logging/session_archive.py info .logging/requests/<name>.archive
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import shutil
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from session_store import (
+    ARCHIVE_SUFFIX, JSON_SUFFIX, SessionStore, chunks_path, encode_entry, entry_prompt_id, index_path,
+    iter_entry_spans, load_index,
+)
+
+MAGIC = b"SESSARC1"
+TRAILER = struct.Struct(">Q4s")
+TRAILER_MAGIC = b"SIDX"
+FRAME = struct.Struct(">IB")
+KIND_ENTRY = 0
+KIND_FOOTER = 1
+FORMAT_VERSION = 1
+COMPRESS_LEVEL = 6
+
+SESSION_FORMATS = {"json": JSON_SUFFIX, "archive": ARCHIVE_SUFFIX}
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.endswith(ARCHIVE_SUFFIX)
+
+
+def entry_timestamp(entry: dict) -> Optional[str]:
+    """Return the first event.timestamp of an entry's request, response, or error."""
+    for kind in ("request", "response", "error"):
+        attrs = entry.get(kind)
+        if isinstance(attrs, dict) and attrs.get("event.timestamp"):
+            return attrs["event.timestamp"]
+    return None
+
+
+def encode_compact(entry: dict) -> bytes:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _frame(kind: int, data: bytes) -> bytes:
+    payload = zlib.compress(data, COMPRESS_LEVEL)
+    return FRAME.pack(len(payload), kind) + payload
+
+
+# ---------- Reading ----------
+def _read_footer(f) -> Optional[Tuple[List[list], int]]:
+    """Return (entries, footer offset) from the trailer, or None if it is missing/damaged."""
+    size = f.seek(0, 2)
+    if size < len(MAGIC) + FRAME.size + TRAILER.size:
+        return None
+    f.seek(size - TRAILER.size)
+    footer_offset, magic = TRAILER.unpack(f.read(TRAILER.size))
+    if magic != TRAILER_MAGIC or not len(MAGIC) <= footer_offset < size - TRAILER.size:
+        return None
+    f.seek(footer_offset)
+    length, kind = FRAME.unpack(f.read(FRAME.size))
+    if kind != KIND_FOOTER or footer_offset + FRAME.size + length + TRAILER.size != size:
+        return None
+    try:
+        footer = json.loads(zlib.decompress(f.read(length)))
+        return footer["entries"], footer_offset
+    except (zlib.error, ValueError, KeyError, TypeError):
+        return None
+
+
+def _scan_frames(f) -> Tuple[List[list], int]:
+    """Rebuild the index by walking the frames; returns (entries, end of last good frame)."""
+    entries: List[list] = []
+    positions = {}
+    pos = len(MAGIC)
+    f.seek(pos)
+    while True:
+        header = f.read(FRAME.size)
+        if len(header) < FRAME.size:
+            break
+        length, kind = FRAME.unpack(header)
+        start = pos + FRAME.size
+        payload = f.read(length)
+        if len(payload) < length:
+            break
+        if kind == KIND_ENTRY:
+            try:
+                entry = json.loads(zlib.decompress(payload))
+            except (zlib.error, ValueError):
+                break
+            prompt_id = entry_prompt_id(entry)
+            span = [prompt_id, entry_timestamp(entry), start, start + length]
+            # A later frame for the same prompt_id replaced the earlier one
+            if prompt_id is not None and prompt_id in positions:
+                entries[positions[prompt_id]] = span
+            else:
+                if prompt_id is not None:
+                    positions[prompt_id] = len(entries)
+                entries.append(span)
+        elif kind != KIND_FOOTER:
+            break
+        pos = start + length
+    return entries, pos
+
+
+def _load(f) -> Tuple[List[list], int, bool]:
+    """Return (entries, end of entry frames, footer was valid)."""
+    f.seek(0)
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a session archive")
+    footer = _read_footer(f)
+    if footer is not None:
+        return footer[0], footer[1], True
+    entries, end = _scan_frames(f)
+    return entries, end, False
+
+
+def read_archive_index(path: Path) -> List[list]:
+    """Return [[prompt_id, timestamp, start, end], ...] for an archive."""
+    with path.open("rb") as f:
+        return _load(f)[0]
+
+
+def read_frame(f, start: int, end: int) -> bytes:
+    """Return the compact JSON of the entry whose payload spans [start, end)."""
+    f.seek(start)
+    return zlib.decompress(f.read(end - start))
+
+
+def iter_archive_raw(path: Path) -> Iterator[bytes]:
+    """Yield the compact JSON of every entry, in session order."""
+    with path.open("rb") as f:
+        for _, _, start, end in _load(f)[0]:
+            yield read_frame(f, start, end)
+
+
+def iter_archive(path: Path) -> Iterator[dict]:
+    for raw in iter_archive_raw(path):
+        yield json.loads(raw)
+
+
+def select_entries(path: Path, prompt_id: Optional[str] = None, since: Optional[str] = None,
+                   until: Optional[str] = None) -> List[dict]:
+    """
+    Return the entries matching a prompt_id and/or an ISO timestamp range
+    [since, until), decompressing only the matching frames.
+    """
+    with path.open("rb") as f:
+        spans = _load(f)[0]
+        return [json.loads(read_frame(f, start, end)) for pid, ts, start, end in spans
+                if (prompt_id is None or pid == prompt_id)
+                and (since is None or (ts or "") >= since)
+                and (until is None or (ts or "") < until)]
+
+
+# ---------- Either format ----------
+def load_entry_index(path: Path) -> List[list]:
+    """Return [[prompt_id, start, end], ...] for a JSON session file or an archive."""
+    if is_archive(path):
+        return [[pid, start, end] for pid, _, start, end in read_archive_index(path)]
+    return load_index(path)
+
+
+def read_entries_raw(path: Path, spans: List[list]) -> List[bytes]:
+    """Return the JSON of the entries at `spans` (from load_entry_index)."""
+    archive = is_archive(path)
+    with path.open("rb") as f:
+        raws = []
+        for _, start, end in spans:
+            if archive:
+                raws.append(read_frame(f, start, end))
+            else:
+                f.seek(start)
+                raws.append(f.read(end - start))
+        return raws
+
+
+def iter_session_raw(path: Path) -> Iterator[bytes]:
+    """Yield the JSON of every entry of a JSON session file or an archive."""
+    if is_archive(path):
+        yield from iter_archive_raw(path)
+        return
+    with path.open("rb") as f:
+        for _, _, _, raw in iter_entry_spans(f):
+            yield raw
+
+
+def load_session(path: Path) -> List[dict]:
+    """Load all entries of a JSON session file or an archive."""
+    if is_archive(path):
+        return list(iter_archive(path))
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_session_store(path: Path):
+    """Open a SessionStore or SessionArchive, depending on the file's suffix."""
+    return SessionArchive(path) if is_archive(path) else SessionStore(path)
+
+
+# ---------- Writing ----------
+def write_archive(path: Path, entries) -> Path:
+    """Write entries (dicts or compact JSON bytes) as a new archive, atomically."""
+    tmp = path.with_name(path.name + ".tmp")
+    index = []
+    with tmp.open("wb") as f:
+        f.write(MAGIC)
+        for entry in entries:
+            if isinstance(entry, (bytes, bytearray)):
+                raw, entry = bytes(entry), json.loads(entry)
+            else:
+                raw = encode_compact(entry)
+            start = f.tell() + FRAME.size
+            f.write(_frame(KIND_ENTRY, raw))
+            index.append([entry_prompt_id(entry), entry_timestamp(entry), start, f.tell()])
+        _write_footer(f, index, f.tell())
+    tmp.replace(path)
+    return path
+
+
+def _write_footer(f, entries: List[list], offset: int):
+    footer = json.dumps({"version": FORMAT_VERSION, "entries": entries}, ensure_ascii=False)
+    f.seek(offset)
+    f.write(_frame(KIND_FOOTER, footer.encode("utf-8")) + TRAILER.pack(offset, TRAILER_MAGIC))
+    f.truncate()
+
+
+def save_session(path: Path, entries: List[dict]) -> Path:
+    """Write a complete session in the format given by the path's suffix."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if is_archive(path):
+        return write_archive(path, entries)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+    return path
+
+
+class SessionArchive:
+    """
+    Read/append/replace entries of one archive by prompt_id.
+
+    Same interface as SessionStore:
+        store = SessionArchive(path)
+        entry = store.get(prompt_id) or {"request": None, ...}
+        store.upsert(prompt_id, entry)
+        store.close()   # writes the footer index
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.created = not path.exists()
+        if self.created:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._entries: List[list] = []
+            self._end = len(MAGIC)
+            with path.open("wb") as f:
+                f.write(MAGIC)
+        else:
+            with path.open("rb") as f:
+                self._entries, self._end, valid = _load(f)
+        self._positions = {pid: i for i, (pid, _, _, _) in enumerate(self._entries) if pid is not None}
+        self._dirty = self.created or not valid
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, prompt_id: str) -> bool:
+        return prompt_id in self._positions
+
+    def get(self, prompt_id: str) -> Optional[dict]:
+        """Load a single entry from disk, or None if the prompt_id is unknown."""
+        i = self._positions.get(prompt_id)
+        if i is None:
+            return None
+        _, _, start, end = self._entries[i]
+        with self.path.open("rb") as f:
+            return json.loads(read_frame(f, start, end))
+
+    def encode(self, entry: dict) -> bytes:
+        """Frame upsert() writes for `entry` (to time serialization separately)."""
+        return _frame(KIND_ENTRY, encode_compact(entry))
+
+    def upsert(self, prompt_id: Optional[str], entry: dict, frame: Optional[bytes] = None):
+        """Append a new entry, or replace the stored entry with this prompt_id."""
+        if frame is None:
+            frame = self.encode(entry)
+        i = self._positions.get(prompt_id) if prompt_id is not None else None
+        # The last frame can be overwritten in place; others become dead space
+        offset = self._end
+        if i is not None and self._entries[i][3] == self._end:
+            offset = self._entries[i][2] - FRAME.size
+        with self.path.open("r+b") as f:
+            f.seek(offset)
+            f.write(frame)
+            # Drops the old footer: a crash before close() leaves an archive
+            # that is re-indexed by scanning, never a stale index
+            f.truncate()
+        self._end = offset + len(frame)
+        span = [prompt_id, entry_timestamp(entry), offset + FRAME.size, self._end]
+        if i is None:
+            self._entries.append(span)
+            if prompt_id is not None:
+                self._positions[prompt_id] = len(self._entries) - 1
+        else:
+            self._entries[i] = span
+        self._dirty = True
+
+    def dead_bytes(self) -> int:
+        """Bytes held by replaced frames."""
+        live = sum(FRAME.size + end - start for _, _, start, end in self._entries)
+        return self._end - len(MAGIC) - live
+
+    def compact(self):
+        """Rewrite the archive without dead frames."""
+        with self.path.open("rb") as f:
+            raws = [read_frame(f, start, end) for _, _, start, end in self._entries]
+        write_archive(self.path, raws)
+        with self.path.open("rb") as f:
+            self._entries, self._end, _ = _load(f)
+        self._dirty = False
+
+    def close(self):
+        """Write the footer index (compacting first if over half the frames are dead)."""
+        if self._dirty and self.dead_bytes() > self._end // 2:
+            self.compact()
+        if self._dirty:
+            with self.path.open("r+b") as f:
+                _write_footer(f, self._entries, self._end)
+            self._dirty = False
+
+
+# ---------- Conversion ----------
+def _move_sidecars(source: Path, target: Path, keep: bool):
+    """Carry the dedup chunk table over to the converted file."""
+    old_chunks = chunks_path(source)
+    if old_chunks.exists():
+        if keep:
+            shutil.copyfile(old_chunks, chunks_path(target))
+        else:
+            old_chunks.replace(chunks_path(target))
+    if not keep:
+        index_path(source).unlink(missing_ok=True)
+
+
+def convert_session(source: Path, keep: bool = False) -> Path:
+    """
+    Convert a JSON session file to an archive or an archive to JSON,
+    streaming entries so memory stays proportional to one entry.
+    """
+    if is_archive(source):
+        target = source.with_name(source.name[:-len(ARCHIVE_SUFFIX)] + JSON_SUFFIX)
+    else:
+        target = source.with_name(source.name[:-len(JSON_SUFFIX)] + ARCHIVE_SUFFIX)
+    if target.exists():
+        raise FileExistsError(f"{target.name} already exists")
+
+    if is_archive(source):
+        tmp = target.with_name(target.name + ".tmp")
+        with tmp.open("wb") as f:
+            separator = b"[\n"
+            for raw in iter_archive_raw(source):
+                f.write(separator + encode_entry(json.loads(raw)))
+                separator = b",\n"
+            f.write(b"[]" if separator == b"[\n" else b"\n]")
+        tmp.replace(target)
+    else:
+        write_archive(target, (json.loads(raw) for raw in iter_session_raw(source)))
+    _move_sidecars(source, target, keep)
+    if not keep:
+        source.unlink()
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and inspect session archives")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("to-archive", "Convert .json session files to .archive"),
+                            ("to-json", "Convert .archive session files to .json")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("files", nargs="+", type=Path)
+        p.add_argument("--keep", action="store_true", help="Keep the source files")
+
+    p = sub.add_parser("info", help="Show an archive's index")
+    p.add_argument("file", type=Path)
+
+    args = parser.parse_args()
+
+    if args.command == "info":
+        index = read_archive_index(args.file)
+        print(f"📦 {args.file.name}: {len(index)} entries, {args.file.stat().st_size:,} bytes")
+        for prompt_id, timestamp, start, end in index:
+            print(f"   {timestamp or '-':<28} {prompt_id or '-'} ({end - start:,} bytes)")
+        return 0
+
+    want_archive = args.command == "to-archive"
+    converted = 0
+    for source in args.files:
+        if not source.name.endswith(JSON_SUFFIX if want_archive else ARCHIVE_SUFFIX):
+            print(f"⏭️  Skipping {source.name}")
+            continue
+        try:
+            target = convert_session(source, keep=args.keep)
+        except (OSError, ValueError) as e:
+            print(f"❌ {source.name}: {e}")
+            continue
+        print(f"✅ {source.name} → {target.name} ({target.stat().st_size:,} bytes)")
+        converted += 1
+    print(f"\n✨ Converted {converted} session file(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
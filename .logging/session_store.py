@@ -0,0 +1,422 @@
+"""
+Append-oriented storage for session files in .logging/requests/.
+
+A session file is a JSON array of {"request", "response", "error"} entries,
+byte-for-byte what json.dump(entries, indent=2, ensure_ascii=False) would
+write, so api-viewer.html and other readers keep working unchanged.
+
+Instead of loading the whole array and dumping it again on every run,
+SessionStore appends new entries in place and replaces existing ones by
+prompt_id. Entry positions are kept in a small sidecar index next to the
+session file (`<name>.json.idx`: prompt_id -> byte span). The index is
+validated against the session file's size/mtime and rebuilt with a streaming
+scan (jsonscan) when it is missing or stale, so memory use stays
+proportional to a single entry.
+
+Optionally (process-api-requests.py --dedup) the conversation history in
+request_text is stored content-addressed: every message is written once to
+a chunk table next to the session file (`<name>.json.chunks`) and requests
+reference their history as {"$refs": [hash, ...]}. expand_entry() turns a
+stored entry back into the original; server.py does that when serving.
+
+Sessions can also be stored as compressed archives (`<name>.archive`, see
+session_archive.py); get_existing_sessions() finds both kinds.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from jsonscan import iter_values
+
+INDEX_SUFFIX = ".idx"
+CHUNKS_SUFFIX = ".chunks"
+# Cached compressed copy served by server.py
+GZIP_SUFFIX = ".gz"
+JSON_SUFFIX = ".json"
+ARCHIVE_SUFFIX = ".archive"
+SESSION_SUFFIXES = (JSON_SUFFIX, ARCHIVE_SUFFIX)
+# Key of a deduplicated request_text: {"$refs": [chunk hash, ...]}
+REFS_KEY = "$refs"
+
+# Entry spans start at the entry's "{", as jsonscan finds them; the indent
+# json.dump puts before each entry is written as part of _OPEN/_SEPARATOR
+_INDENT = b"  "
+_OPEN = b"[\n" + _INDENT
+_CLOSE = b"\n]"
+_SEPARATOR = b",\n" + _INDENT
+_EMPTY = b"[]"
+# Bumped when the meaning of index spans changes (2: spans start at "{")
+INDEX_VERSION = 2
+# Longest tail after the last entry that _tail_ok() accepts as whitespace + "]"
+_TAIL_MAX = 4096
+
+
+def index_path(session_file: Path) -> Path:
+    """Return the sidecar index path for a session file."""
+    return session_file.with_name(session_file.name + INDEX_SUFFIX)
+
+
+def chunks_path(session_file: Path) -> Path:
+    """Return the chunk table path for a session file."""
+    return session_file.with_name(session_file.name + CHUNKS_SUFFIX)
+
+
+def gzip_path(session_file: Path) -> Path:
+    """Return the cached gzip variant path for a session file."""
+    return session_file.with_name(session_file.name + GZIP_SUFFIX)
+
+
+def sidecar_paths(session_file: Path) -> List[Path]:
+    """Files stored next to a session file that follow it on rename/delete."""
+    return [index_path(session_file), gzip_path(session_file), chunks_path(session_file)]
+
+
+def session_file_path(session_id: str, first_timestamp: str, output_dir: Path,
+                      suffix: str = JSON_SUFFIX) -> Path:
+    """
+    Build the path of a new session file.
+    Filename format: {first_timestamp}-{session_id}.json (or .archive)
+    """
+    # Format timestamp for filename (YYYY-MM-DD_HH-MM-SS)
+    try:
+        dt = datetime.fromisoformat(first_timestamp.replace('Z', '+00:00'))
+        timestamp_str = dt.strftime("%Y-%m-%d_%H-%M-%S")
+    except (AttributeError, ValueError):
+        # Fallback to current time if parsing fails
+        timestamp_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+    return output_dir / f"{timestamp_str}-{session_id}{suffix}"
+
+
+def get_existing_sessions(output_dir: Path) -> Dict[str, Path]:
+    """
+    Scan output directory for existing session files (.json and .archive).
+    Returns dict mapping session_id -> file_path; if a session exists in
+    both formats, the .json file wins.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    sessions = {}
+
+    # Pattern: YYYY-MM-DD_HH-MM-SS-{session-id}.json|.archive
+    pattern = re.compile(r'(\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})-(.+)\.(?:json|archive)$')
+
+    for file_path in sorted(output_dir.glob("*.archive")) + sorted(output_dir.glob("*.json")):
+        match = pattern.match(file_path.name)
+        if match:
+            session_id = match.group(7)  # Group 7 captures the session ID
+            sessions[session_id] = file_path
+
+    return sessions
+
+
+def entry_prompt_id(entry: dict) -> Optional[str]:
+    """Extract prompt_id from an entry's request, response, or error."""
+    for kind in ("request", "response", "error"):
+        attrs = entry.get(kind)
+        if isinstance(attrs, dict) and "prompt_id" in attrs:
+            return attrs["prompt_id"]
+    return None
+
+
+def encode_entry(entry: dict) -> bytes:
+    """Encode one entry exactly as json.dump(..., indent=2) nests it in the array."""
+    text = json.dumps(entry, ensure_ascii=False, indent=2)
+    return ("  " + text.replace("\n", "\n  ")).encode("utf-8")
+
+
+def iter_entry_spans(f: BinaryIO) -> Iterator[Tuple[Optional[str], int, int, bytes]]:
+    """Yield (prompt_id, start, end, raw) for every entry of a session file."""
+    for start, end, raw in iter_values(f, level=1):
+        try:
+            prompt_id = entry_prompt_id(json.loads(raw))
+        except ValueError:
+            prompt_id = None
+        yield prompt_id, start, end, raw
+
+
+def load_index(session_file: Path) -> List[list]:
+    """
+    Return [[prompt_id, start, end], ...] for a session file, using the
+    sidecar index when it matches the file and rebuilding it otherwise.
+    """
+    stat = session_file.stat()
+    idx_file = index_path(session_file)
+    try:
+        index = json.loads(idx_file.read_text(encoding="utf-8"))
+        if (index.get("version") == INDEX_VERSION and index["size"] == stat.st_size
+                and index["mtime_ns"] == stat.st_mtime_ns):
+            return index["entries"]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    with session_file.open("rb") as f:
+        entries = [[pid, start, end] for pid, start, end, _ in iter_entry_spans(f)]
+    write_index(session_file, entries)
+    return entries
+
+
+def write_index(session_file: Path, entries: List[list]):
+    """Write the sidecar index for the current state of `session_file`."""
+    stat = session_file.stat()
+    index = {"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "entries": entries}
+    tmp = index_path(session_file).with_suffix(".tmp")
+    tmp.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(index_path(session_file))
+
+
+class SessionStore:
+    """
+    Read/append/replace entries of one session file by prompt_id.
+
+    Usage:
+        store = SessionStore(path)
+        entry = store.get(prompt_id) or {"request": None, ...}
+        store.upsert(prompt_id, entry)
+        store.close()   # persists the sidecar index
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.created = not path.exists()
+        if self.created:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(_EMPTY)
+            self._entries: List[list] = []
+        else:
+            self._entries = load_index(path)
+        self._positions = {pid: i for i, (pid, _, _) in enumerate(self._entries) if pid is not None}
+        self._dirty = self.created
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, prompt_id: str) -> bool:
+        return prompt_id in self._positions
+
+    def get(self, prompt_id: str) -> Optional[dict]:
+        """Load a single entry from disk, or None if the prompt_id is unknown."""
+        i = self._positions.get(prompt_id)
+        if i is None:
+            return None
+        _, start, end = self._entries[i]
+        with self.path.open("rb") as f:
+            f.seek(start)
+            return json.loads(f.read(end - start))
+
+    def encode(self, entry: dict) -> bytes:
+        """Bytes upsert() writes for `entry` (to time serialization separately).
+
+        The entry's span starts at its "{": the leading indent is written
+        with the separator, so replacing an entry keeps the indent as it is.
+        """
+        return encode_entry(entry)[len(_INDENT):]
+
+    def upsert(self, prompt_id: Optional[str], entry: dict, data: Optional[bytes] = None):
+        """Append a new entry, or replace the stored entry with this prompt_id."""
+        if data is None:
+            data = self.encode(entry)
+        i = self._positions.get(prompt_id) if prompt_id is not None else None
+        if i is None and not self._tail_ok():
+            # Re-saved by another tool (or the index is off): normalize first
+            self._rewrite()
+            i = self._positions.get(prompt_id) if prompt_id is not None else None
+        if i is None:
+            self._append(prompt_id, data)
+        elif i == len(self._entries) - 1:
+            self._replace_last(data)
+        else:
+            self._replace_middle(i, data)
+        self._dirty = True
+
+    def _tail_ok(self) -> bool:
+        """True if only whitespace and the closing "]" follow the last entry."""
+        end = self._entries[-1][2] if self._entries else 0
+        with self.path.open("rb") as f:
+            f.seek(end)
+            tail = f.read(_TAIL_MAX + 1)
+        if len(tail) > _TAIL_MAX:
+            return False
+        tail = tail.strip()
+        if not self._entries:
+            return tail[:1] == b"[" and tail[1:].strip() == b"]"
+        return tail == b"]"
+
+    def _rewrite(self):
+        """Rewrite the file in our layout from a streaming scan and rebuild the index."""
+        tmp = self.path.with_suffix(".tmp")
+        entries = []
+        with self.path.open("rb") as src, tmp.open("wb") as dst:
+            pos = 0
+            for prompt_id, _, _, raw in iter_entry_spans(src):
+                data = self.encode(json.loads(raw))
+                dst.write(_SEPARATOR if entries else _OPEN)
+                pos += len(_SEPARATOR if entries else _OPEN)
+                entries.append([prompt_id, pos, pos + len(data)])
+                dst.write(data)
+                pos += len(data)
+            dst.write(_CLOSE if entries else _EMPTY)
+        tmp.replace(self.path)
+        self._entries = entries
+        self._positions = {pid: i for i, (pid, _, _) in enumerate(entries) if pid is not None}
+        write_index(self.path, entries)
+
+    def _append(self, prompt_id: Optional[str], data: bytes):
+        with self.path.open("r+b") as f:
+            if self._entries:
+                # Overwrite whatever whitespace + "]" follows the last entry
+                f.seek(self._entries[-1][2])
+                start = f.tell() + len(_SEPARATOR)
+                f.write(_SEPARATOR + data + _CLOSE)
+            else:
+                f.seek(0)
+                start = len(_OPEN)
+                f.write(_OPEN + data + _CLOSE)
+            f.truncate()
+        self._entries.append([prompt_id, start, start + len(data)])
+        if prompt_id is not None:
+            self._positions[prompt_id] = len(self._entries) - 1
+
+    def _replace_last(self, data: bytes):
+        span = self._entries[-1]
+        with self.path.open("r+b") as f:
+            f.seek(span[1])
+            f.write(data + _CLOSE)
+            f.truncate()
+        span[2] = span[1] + len(data)
+
+    def _replace_middle(self, i: int, data: bytes):
+        """Rewrite the file around entry i (rare: out-of-order prompt updates)."""
+        _, start, end = self._entries[i]
+        tmp = self.path.with_suffix(".tmp")
+        with self.path.open("rb") as src, tmp.open("wb") as dst:
+            remaining = start
+            while remaining:
+                chunk = src.read(min(remaining, 1 << 20))
+                remaining -= len(chunk)
+                dst.write(chunk)
+            dst.write(data)
+            src.seek(end)
+            shutil.copyfileobj(src, dst)
+        tmp.replace(self.path)
+
+        delta = len(data) - (end - start)
+        self._entries[i][2] = start + len(data)
+        for span in self._entries[i + 1:]:
+            span[1] += delta
+            span[2] += delta
+
+    def close(self):
+        """Persist the sidecar index."""
+        if self._dirty:
+            write_index(self.path, self._entries)
+            self._dirty = False
+
+
+# ---------- Deduplicated history ----------
+def encode_chunk(message) -> str:
+    """Compact JSON of one history message (key order preserved)."""
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+def chunk_hash(encoded: str) -> str:
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def load_chunks(session_file: Path) -> Dict[str, str]:
+    """Return {hash: compact JSON} from a session's chunk table ({} if none)."""
+    chunks = {}
+    try:
+        with chunks_path(session_file).open("r", encoding="utf-8") as f:
+            for line in f:
+                digest, sep, encoded = line.rstrip("\n").partition("\t")
+                if sep:
+                    chunks[digest] = encoded
+    except FileNotFoundError:
+        pass
+    return chunks
+
+
+class ChunkTable:
+    """
+    Append-only table of history messages for one session file.
+
+    One line per message: "<blake2b hash>\t<compact JSON>\n". put() only
+    writes messages the table does not hold yet; call flush() before writing
+    an entry that references them, so readers never see a dangling hash.
+    """
+
+    def __init__(self, session_file: Path):
+        self.path = chunks_path(session_file)
+        self._hashes = set(load_chunks(session_file))
+        self._file: Optional[TextIO] = None
+
+    def put(self, message) -> str:
+        encoded = encode_chunk(message)
+        digest = chunk_hash(encoded)
+        if digest not in self._hashes:
+            if self._file is None:
+                self._file = self.path.open("a", encoding="utf-8", newline="\n")
+            self._file.write(f"{digest}\t{encoded}\n")
+            self._hashes.add(digest)
+        return digest
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def dedup_history(entry: dict, table: ChunkTable) -> dict:
+    """Replace the entry's request_text message list with chunk references."""
+    request = entry.get("request")
+    if not isinstance(request, dict):
+        return entry
+    history = request.get("request_text")
+    if isinstance(history, str):
+        # --raw: the history is still JSON text
+        try:
+            history = json.loads(history)
+        except ValueError:
+            return entry
+    if isinstance(history, list):
+        request["request_text"] = {REFS_KEY: [table.put(message) for message in history]}
+    return entry
+
+
+def is_deduplicated(entry: dict) -> bool:
+    request = entry.get("request")
+    return (isinstance(request, dict) and isinstance(request.get("request_text"), dict)
+            and REFS_KEY in request["request_text"])
+
+
+def expand_entry(entry: dict, chunks: Dict[str, str], decoded: Optional[dict] = None) -> dict:
+    """
+    Resolve {"$refs": [...]} in request_text back into the message list.
+
+    `decoded` is an optional hash -> message cache shared across entries of
+    a session, so each message is decoded once.
+    """
+    if not is_deduplicated(entry):
+        return entry
+    if decoded is None:
+        decoded = {}
+    messages = []
+    for digest in entry["request"]["request_text"][REFS_KEY]:
+        message = decoded.get(digest)
+        if message is None:
+            message = decoded[digest] = json.loads(chunks[digest])
+        messages.append(message)
+    entry["request"]["request_text"] = messages
+    return entry
@@ -0,0 +1,292 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+Synthetic telemetry for benchmarks and manual testing.
+
+Writes realistic inputs for the .logging pipeline without running Gemini or
+Claude:
+
+    gemini   a log.jsonl like Gemini CLI's file exporter writes it:
+             pretty-printed OTLP log records back to back, with the event mix
+             from telemetry.md (config, user_prompt, api_request/response/error,
+             tool_call, file_operation, tool_output_truncated) and optionally
+             metric records (token.usage, api.request.latency).
+    claude   Claude Code transcripts (<dir>/<project>/<session-id>.jsonl), one
+             JSON line per user/assistant message, with tool_use/tool_result
+             turns, streamed assistant parts and usage blocks.
+
+Every API request carries the whole conversation so far in request_text, so
+file size grows quadratically with prompts per session, just like real logs.
+Output is deterministic for a given --seed.
+
+Usage:
+    uv run .logging/synth_telemetry.py gemini /tmp/log.jsonl --sessions 8 --prompts 20
+    uv run .logging/synth_telemetry.py claude /tmp/claude --sessions 8 --prompts 20
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+# ---------- Configuration ----------
+START_TIME = datetime(2025, 1, 6, 9, 0, tzinfo=timezone.utc)
+MODELS = ("gemini-2.5-pro", "gemini-2.5-flash")
+CLAUDE_MODEL = "claude-sonnet-4-5-20250929"
+WORDS = (
+    "bonfire", "map", "report", "prisma", "schema", "route", "component", "state", "store",
+    "deploy", "azure", "chat", "message", "error", "fix", "test", "layout", "page", "server",
+    "client", "token", "query", "index", "form", "validate", "marker", "region", "user", "admin",
+    "session", "cache", "build", "lint", "type", "props", "hook", "effect", "render", "api",
+)
+# function_name -> argument factory
+TOOLS = {
+    "read_file": lambda rng: {"absolute_path": f"/work/app/{rng.choice(WORDS)}/{rng.choice(WORDS)}.tsx"},
+    "write_file": lambda rng: {"file_path": f"/work/lib/{rng.choice(WORDS)}.ts", "content": _text(rng, 60)},
+    "replace": lambda rng: {"file_path": f"/work/components/{rng.choice(WORDS)}.tsx",
+                            "old_string": _text(rng, 8), "new_string": _text(rng, 10)},
+    "run_shell_command": lambda rng: {"command": rng.choice(("npm run build", "npm test", "git status",
+                                                             "npx prisma generate", "ls -la app"))},
+    "search_file_content": lambda rng: {"pattern": rng.choice(WORDS), "include": "*.ts*"},
+    "glob": lambda rng: {"pattern": f"**/*{rng.choice(WORDS)}*"},
+}
+FILE_OPERATIONS = {"read_file": "read", "write_file": "create", "replace": "update"}
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+def _hr_time(dt: datetime) -> List[int]:
+    seconds = dt.timestamp()
+    return [int(seconds), int(seconds % 1 * 1e9)]
+
+# ---------- Gemini CLI log ----------
+def log_record(dt: datetime, body: str, attributes: dict) -> dict:
+    """One OTLP log record as Gemini's file exporter writes it."""
+    return {
+        "hrTime": _hr_time(dt),
+        "hrTimeObserved": _hr_time(dt),
+        "resource": {"attributes": {"service.name": "gemini-cli", "service.version": "0.11.0"}},
+        "instrumentationScope": {"name": "gemini-cli"},
+        "body": body,
+        "attributes": attributes,
+    }
+
+def metric_record(dt: datetime, name: str, unit: str, points: List[dict], histogram: bool) -> dict:
+    """A metric as written to log.jsonl (see metrics_agg.file_metric_points)."""
+    return {
+        "descriptor": {"name": name, "type": "HISTOGRAM" if histogram else "COUNTER", "unit": unit},
+        "dataPointType": 0 if histogram else 3,
+        "aggregationTemporality": 0,
+        "dataPoints": [{"startTime": _hr_time(dt), "endTime": _hr_time(dt), **point} for point in points],
+    }
+
+def gemini_session_records(rng: random.Random, session_id: str, start: datetime, prompts: int,
+                           tool_ratio: float, error_ratio: float, message_words: int,
+                           metrics: bool):
+    """Yield the records of one Gemini CLI session in log order."""
+    now = start
+    model = rng.choice(MODELS)
+    common = {"session.id": session_id, "installation.id": "synthetic", "user.email": "dev@example.com"}
+
+    def event(name: str, body: str, **attrs) -> dict:
+        return log_record(now, body, {**common, "event.name": name, "event.timestamp": _iso(now), **attrs})
+
+    yield event("gemini_cli.config", "CLI configuration loaded.", model=model, sandbox_enabled=False,
+                approval_mode="default", output_format="text", mcp_servers_count=0)
+
+    history: List[dict] = []
+    for p in range(prompts):
+        prompt_id = f"{session_id}########{p}"
+        prompt = _text(rng, message_words)
+        yield event("gemini_cli.user_prompt", f"User prompt. Length: {len(prompt)}.",
+                    prompt_id=prompt_id, prompt=prompt, prompt_length=len(prompt), auth_type="oauth-personal")
+        history.append({"role": "user", "parts": [{"text": prompt}]})
+
+        # Model <-> tool rounds until the model answers without a tool call
+        while True:
+            yield event("gemini_cli.api_request", f"API request to {model}.",
+                        model=model, prompt_id=prompt_id, request_text=json.dumps(history))
+            duration = int(rng.lognormvariate(7.3, 0.6))
+            now += timedelta(milliseconds=duration)
+            if rng.random() < error_ratio:
+                yield event("gemini_cli.api_error", f"API error: {model}.", model=model, prompt_id=prompt_id,
+                            error="Resource exhausted", error_type="RESOURCE_EXHAUSTED",
+                            status_code=429, duration_ms=duration, auth_type="oauth-personal")
+                break
+
+            call_tool = rng.random() < tool_ratio
+            answer = _text(rng, message_words * 2)
+            parts: List[dict] = [{"text": answer}]
+            if call_tool:
+                tool = rng.choice(sorted(TOOLS))
+                args = TOOLS[tool](rng)
+                parts.append({"functionCall": {"name": tool, "args": args}})
+            input_tokens = sum(len(json.dumps(m)) for m in history) // 4
+            output_tokens = len(answer) // 4
+            yield event("gemini_cli.api_response", f"API response from {model}. Status: 200. Duration: {duration}ms.",
+                        model=model, prompt_id=prompt_id, status_code=200, duration_ms=duration,
+                        input_token_count=input_tokens, output_token_count=output_tokens,
+                        cached_content_token_count=input_tokens // 2, thoughts_token_count=rng.randint(0, 400),
+                        tool_token_count=0, total_token_count=input_tokens + output_tokens,
+                        response_text=json.dumps([{"candidates": [{"content": {"role": "model", "parts": parts},
+                                                                   "finishReason": "STOP"}]}]),
+                        auth_type="oauth-personal")
+            history.append({"role": "model", "parts": parts})
+            if metrics:
+                yield metric_record(now, "gemini_cli.token.usage", "token", [
+                    {"attributes": {**common, "model": model, "type": "input"}, "value": input_tokens},
+                    {"attributes": {**common, "model": model, "type": "output"}, "value": output_tokens},
+                ], histogram=False)
+                yield metric_record(now, "gemini_cli.api.request.latency", "ms", [
+                    {"attributes": {**common, "model": model},
+                     "value": {"count": 1, "sum": duration, "min": duration, "max": duration,
+                               "buckets": {"boundaries": [100, 1000, 10000], "counts": [0, 0, 1, 0]}}},
+                ], histogram=True)
+            if not call_tool:
+                break
+
+            tool_duration = int(rng.lognormvariate(5.5, 1.2))
+            now += timedelta(milliseconds=tool_duration)
+            success = rng.random() > 0.08
+            tool_attrs = {"function_name": tool, "function_args": json.dumps(args), "duration_ms": tool_duration,
+                          "success": success, "decision": "auto_accept", "prompt_id": prompt_id,
+                          "tool_type": "native"}
+            if not success:
+                tool_attrs.update(error="Command failed", error_type="execution_failed")
+            yield event("gemini_cli.tool_call", f"Tool call: {tool}. Success: {success}. Duration: {tool_duration}ms.",
+                        **tool_attrs)
+            output = _text(rng, message_words * 4)
+            if tool in FILE_OPERATIONS:
+                yield event("gemini_cli.file_operation", f"File operation: {FILE_OPERATIONS[tool]}.",
+                            tool_name=tool, operation=FILE_OPERATIONS[tool], lines=rng.randint(5, 400),
+                            extension=".tsx", programming_language="TypeScript")
+            elif rng.random() < 0.1:
+                yield event("gemini_cli.tool_output_truncated", "Tool output truncated.", tool_name=tool,
+                            original_content_length=len(output) * 10, truncated_content_length=len(output),
+                            threshold=len(output), lines=200, prompt_id=prompt_id)
+            history.append({"role": "user", "parts": [{"functionResponse": {"name": tool,
+                                                                             "response": {"output": output}}}]})
+        now += timedelta(seconds=rng.randint(5, 120))
+
+def write_gemini_log(path: Path, sessions: int = 4, prompts: int = 10, tool_ratio: float = 0.6,
+                     error_ratio: float = 0.02, message_words: int = 40, metrics: bool = False,
+                     seed: int = 1) -> Dict[str, int]:
+    """Write a synthetic log.jsonl; returns {"records": N, "bytes": size}."""
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    records = 0
+    with path.open("w", encoding="utf-8", newline="\n") as f:
+        for s in range(sessions):
+            session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            start = START_TIME + timedelta(hours=3 * s)
+            for record in gemini_session_records(rng, session_id, start, prompts, tool_ratio,
+                                                 error_ratio, message_words, metrics):
+                f.write(json.dumps(record, indent=2, ensure_ascii=False) + "\n")
+                records += 1
+    return {"records": records, "bytes": path.stat().st_size}
+
+# ---------- Claude Code transcripts ----------
+def claude_session_lines(rng: random.Random, session_id: str, start: datetime, prompts: int,
+                         tool_ratio: float, message_words: int):
+    """Yield the transcript lines of one Claude Code session."""
+    now = start
+    parent = None
+    common = {"sessionId": session_id, "cwd": "/work", "version": "2.0.14", "gitBranch": "main",
+              "isSidechain": False, "userType": "external"}
+
+    def line(kind: str, message: dict) -> dict:
+        nonlocal parent
+        entry_uuid = str(uuid.UUID(int=rng.getrandbits(128)))
+        entry = {"parentUuid": parent, **common, "type": kind, "message": message,
+                 "uuid": entry_uuid, "timestamp": _iso(now)}
+        parent = entry_uuid
+        return entry
+
+    for _ in range(prompts):
+        yield line("user", {"role": "user", "content": _text(rng, message_words)})
+        while True:
+            now += timedelta(milliseconds=int(rng.lognormvariate(7.5, 0.6)))
+            message_id = f"msg_{rng.getrandbits(64):016x}"
+            usage = {"input_tokens": rng.randint(3, 40), "output_tokens": rng.randint(20, 800),
+                     "cache_creation_input_tokens": rng.randint(0, 4000),
+                     "cache_read_input_tokens": rng.randint(10000, 60000)}
+            # Claude Code writes one line per content block of a streamed message
+            blocks = [{"type": "text", "text": _text(rng, message_words * 2)}]
+            if rng.random() < 0.3:
+                blocks.insert(0, {"type": "thinking", "thinking": _text(rng, message_words), "signature": "sig"})
+            call_tool = rng.random() < tool_ratio
+            if call_tool:
+                tool_id = f"toolu_{rng.getrandbits(64):016x}"
+                blocks.append({"type": "tool_use", "id": tool_id, "name": rng.choice(("Bash", "Read", "Edit", "Grep")),
+                               "input": {"command": rng.choice(("npm test", "git status")), "description": "check"}})
+            for block in blocks:
+                yield line("assistant", {"id": message_id, "type": "message", "role": "assistant",
+                                         "model": CLAUDE_MODEL, "content": [block],
+                                         "stop_reason": None, "usage": usage})
+            if not call_tool:
+                break
+            now += timedelta(milliseconds=int(rng.lognormvariate(5.5, 1.2)))
+            yield line("user", {"role": "user", "content": [{"tool_use_id": tool_id, "type": "tool_result",
+                                                             "content": _text(rng, message_words * 4)}]})
+        now += timedelta(seconds=rng.randint(5, 120))
+
+def write_claude_logs(directory: Path, sessions: int = 4, prompts: int = 10, tool_ratio: float = 0.6,
+                      message_words: int = 40, seed: int = 1) -> Dict[str, int]:
+    """Write synthetic transcripts to <directory>/synthetic-project/; returns {"records", "bytes", "files"}."""
+    rng = random.Random(seed)
+    project = directory / "synthetic-project"
+    project.mkdir(parents=True, exist_ok=True)
+    records = size = 0
+    for s in range(sessions):
+        session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        path = project / f"{session_id}.jsonl"
+        with path.open("w", encoding="utf-8", newline="\n") as f:
+            for entry in claude_session_lines(rng, session_id, START_TIME + timedelta(hours=3 * s),
+                                              prompts, tool_ratio, message_words):
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                records += 1
+        size += path.stat().st_size
+    return {"records": records, "bytes": size, "files": sessions}
+
+# ---------- Main Function ----------
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Gemini CLI / Claude Code telemetry")
+    parser.add_argument("kind", choices=("gemini", "claude"), help="gemini: log.jsonl, claude: transcripts")
+    parser.add_argument("output", type=Path, help="Log file (gemini) or directory (claude)")
+    parser.add_argument("--sessions", type=int, default=4, help="Sessions (default: %(default)s)")
+    parser.add_argument("--prompts", type=int, default=10, help="Prompts per session (default: %(default)s)")
+    parser.add_argument("--tool-ratio", type=float, default=0.6,
+                        help="Probability that a model response calls a tool (default: %(default)s)")
+    parser.add_argument("--error-ratio", type=float, default=0.02,
+                        help="Probability of an api_error per request, gemini only (default: %(default)s)")
+    parser.add_argument("--message-words", type=int, default=40,
+                        help="Words per prompt; responses and tool output are longer, so this sets "
+                             "how fast the history grows (default: %(default)s)")
+    parser.add_argument("--metrics", action="store_true", help="Also write metric records (gemini only)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.kind == "gemini":
+        stats = write_gemini_log(args.output, args.sessions, args.prompts, args.tool_ratio,
+                                 args.error_ratio, args.message_words, args.metrics, args.seed)
+    else:
+        stats = write_claude_logs(args.output, args.sessions, args.prompts, args.tool_ratio,
+                                  args.message_words, args.seed)
+    print(f"✅ {args.output}: {stats['records']:,} records, {stats['bytes'] / 1e6:.1f} MB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+SQLite telemetry store for Gemini CLI telemetry.
+
+Normalizes telemetry records into indexed tables (sessions, prompts,
+requests, responses, errors, tool_calls, plus OTLP metric_points) so questions like "which sessions
+used model X last week" or "slowest tool calls" are answered by an index
+lookup instead of a scan over every session JSON file.
+
+Fed incrementally by:
+    uv run .logging/process-api-requests.py --db
+    uv run .logging/watcher.py --db
+    uv run .logging/otlp_receiver.py --db   (or server.py --db)
+
+Query it with:
+    uv run .logging/telemetry_db.py sessions --model gemini-2.5-pro --days 7
+    uv run .logging/telemetry_db.py slow-tools --limit 20
+    uv run .logging/telemetry_db.py sql "SELECT model, COUNT(*) FROM responses GROUP BY model"
+
+Ingestion is idempotent: re-feeding the same records (e.g. from both the
+watcher and the processor) does not create duplicate rows.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from telemetry_events import (
+    EVENT_ERROR, EVENT_REQUEST, EVENT_RESPONSE,
+    extract_attributes, get_event_name, get_event_timestamp, get_prompt_id, get_session_id,
+)
+
+# ---------- Configuration ----------
+DEFAULT_DB_FILE = Path(".") / ".logging" / "telemetry.db"
+
+EVENT_USER_PROMPT = "gemini_cli.user_prompt"
+EVENT_TOOL_CALL = "gemini_cli.tool_call"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id  TEXT PRIMARY KEY,
+    first_seen  TEXT,
+    last_seen   TEXT
+);
+CREATE TABLE IF NOT EXISTS prompts (
+    prompt_id     TEXT PRIMARY KEY,
+    session_id    TEXT NOT NULL,
+    first_seen    TEXT,
+    prompt        TEXT,
+    prompt_length INTEGER
+);
+CREATE TABLE IF NOT EXISTS requests (
+    id                  INTEGER PRIMARY KEY,
+    session_id          TEXT NOT NULL,
+    prompt_id           TEXT NOT NULL,
+    timestamp           TEXT NOT NULL,
+    model               TEXT,
+    request_text_length INTEGER,
+    UNIQUE (session_id, prompt_id, timestamp)
+);
+CREATE TABLE IF NOT EXISTS responses (
+    id                         INTEGER PRIMARY KEY,
+    session_id                 TEXT NOT NULL,
+    prompt_id                  TEXT NOT NULL,
+    timestamp                  TEXT NOT NULL,
+    model                      TEXT,
+    status_code                TEXT,
+    duration_ms                REAL,
+    input_token_count          INTEGER,
+    output_token_count         INTEGER,
+    cached_content_token_count INTEGER,
+    thoughts_token_count       INTEGER,
+    tool_token_count           INTEGER,
+    total_token_count          INTEGER,
+    UNIQUE (session_id, prompt_id, timestamp)
+);
+CREATE TABLE IF NOT EXISTS errors (
+    id          INTEGER PRIMARY KEY,
+    session_id  TEXT NOT NULL,
+    prompt_id   TEXT NOT NULL,
+    timestamp   TEXT NOT NULL,
+    model       TEXT,
+    error       TEXT,
+    error_type  TEXT,
+    status_code TEXT,
+    duration_ms REAL,
+    UNIQUE (session_id, prompt_id, timestamp)
+);
+CREATE TABLE IF NOT EXISTS tool_calls (
+    id            INTEGER PRIMARY KEY,
+    session_id    TEXT NOT NULL,
+    prompt_id     TEXT NOT NULL,
+    timestamp     TEXT NOT NULL,
+    function_name TEXT,
+    function_args TEXT,
+    duration_ms   REAL,
+    success       INTEGER,
+    decision      TEXT,
+    error         TEXT,
+    error_type    TEXT,
+    tool_type     TEXT,
+    UNIQUE (session_id, prompt_id, timestamp, function_name)
+);
+CREATE TABLE IF NOT EXISTS metric_points (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL,
+    timestamp   TEXT NOT NULL,
+    session_id  TEXT,
+    unit        TEXT,
+    attributes  TEXT NOT NULL,
+    value       REAL,
+    count       INTEGER,
+    sum         REAL,
+    UNIQUE (name, timestamp, attributes)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_first_seen ON sessions (first_seen);
+CREATE INDEX IF NOT EXISTS idx_prompts_session ON prompts (session_id);
+CREATE INDEX IF NOT EXISTS idx_requests_model_time ON requests (model, timestamp);
+CREATE INDEX IF NOT EXISTS idx_requests_session ON requests (session_id);
+CREATE INDEX IF NOT EXISTS idx_responses_model_time ON responses (model, timestamp);
+CREATE INDEX IF NOT EXISTS idx_responses_session ON responses (session_id);
+CREATE INDEX IF NOT EXISTS idx_responses_duration ON responses (duration_ms);
+CREATE INDEX IF NOT EXISTS idx_errors_session ON errors (session_id);
+CREATE INDEX IF NOT EXISTS idx_tool_calls_name_duration ON tool_calls (function_name, duration_ms);
+CREATE INDEX IF NOT EXISTS idx_tool_calls_duration ON tool_calls (duration_ms);
+CREATE INDEX IF NOT EXISTS idx_tool_calls_session ON tool_calls (session_id);
+CREATE INDEX IF NOT EXISTS idx_metric_points_name_time ON metric_points (name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_metric_points_session ON metric_points (session_id);
+"""
+
+# Upserts per table; rows produced by record_rows() bind in this column order
+STATEMENTS = {
+    "sessions": """
+        INSERT INTO sessions (session_id, first_seen, last_seen) VALUES (?, ?, ?)
+        ON CONFLICT (session_id) DO UPDATE SET
+            first_seen = min(coalesce(first_seen, excluded.first_seen), coalesce(excluded.first_seen, first_seen)),
+            last_seen = max(coalesce(last_seen, excluded.last_seen), coalesce(excluded.last_seen, last_seen))
+    """,
+    "prompts": """
+        INSERT INTO prompts (prompt_id, session_id, first_seen, prompt, prompt_length) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (prompt_id) DO UPDATE SET
+            first_seen = min(coalesce(first_seen, excluded.first_seen), coalesce(excluded.first_seen, first_seen)),
+            prompt = coalesce(excluded.prompt, prompt),
+            prompt_length = coalesce(excluded.prompt_length, prompt_length)
+    """,
+    "requests": """
+        INSERT OR IGNORE INTO requests (session_id, prompt_id, timestamp, model, request_text_length)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "responses": """
+        INSERT OR IGNORE INTO responses (session_id, prompt_id, timestamp, model, status_code, duration_ms,
+            input_token_count, output_token_count, cached_content_token_count, thoughts_token_count,
+            tool_token_count, total_token_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "errors": """
+        INSERT OR IGNORE INTO errors (session_id, prompt_id, timestamp, model, error, error_type, status_code,
+            duration_ms)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "tool_calls": """
+        INSERT OR IGNORE INTO tool_calls (session_id, prompt_id, timestamp, function_name, function_args,
+            duration_ms, success, decision, error, error_type, tool_type)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "metric_points": """
+        INSERT OR IGNORE INTO metric_points (name, timestamp, session_id, unit, attributes, value, count, sum)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+}
+
+# ---------- Record Normalization ----------
+def _num(value):
+    """
+    Coerce a numeric attribute to int/float for SQLite. Watcher, live tail and
+    OTLP records come from json (already int/float); process-api-requests.py
+    decodes with ijson, which yields Decimal for non-integers; numeric
+    strings are parsed as float.
+    """
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _text(value) -> Optional[str]:
+    """Store strings as-is and anything structured as compact JSON."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+def _bool(value) -> Optional[int]:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        return {"true": 1, "false": 0}.get(value.lower())
+    return None
+
+def record_rows(record: dict) -> List[Tuple[str, tuple]]:
+    """
+    Normalize one telemetry record into (table, row) pairs.
+
+    Pure function (no database access), so it can run in worker processes
+    and its output can be pickled back to the process that owns the
+    connection. Records without session.id produce no rows.
+    """
+    attrs = extract_attributes(record)
+    session_id = get_session_id(attrs)
+    if not session_id:
+        return []
+    prompt_id = get_prompt_id(attrs)
+    event_name = get_event_name(record)
+    timestamp = get_event_timestamp(record)
+    if timestamp is not None and not isinstance(timestamp, str):
+        timestamp = str(timestamp)
+
+    rows = [("sessions", (session_id, timestamp, timestamp))]
+    if not prompt_id:
+        return rows
+
+    is_user_prompt = event_name == EVENT_USER_PROMPT
+    rows.append(("prompts", (
+        prompt_id, session_id, timestamp,
+        attrs.get("prompt") if is_user_prompt else None,
+        _num(attrs.get("prompt_length")) if is_user_prompt else None,
+    )))
+
+    key = (session_id, prompt_id, timestamp or "")
+    if event_name == EVENT_REQUEST:
+        request_text = attrs.get("request_text")
+        rows.append(("requests", key + (
+            attrs.get("model"),
+            len(request_text) if isinstance(request_text, str) else None,
+        )))
+    elif event_name == EVENT_RESPONSE:
+        rows.append(("responses", key + (
+            attrs.get("model"),
+            _text(attrs.get("status_code")),
+            _num(attrs.get("duration_ms")),
+            _num(attrs.get("input_token_count")),
+            _num(attrs.get("output_token_count")),
+            _num(attrs.get("cached_content_token_count")),
+            _num(attrs.get("thoughts_token_count")),
+            _num(attrs.get("tool_token_count")),
+            _num(attrs.get("total_token_count")),
+        )))
+    elif event_name == EVENT_ERROR:
+        rows.append(("errors", key + (
+            attrs.get("model"),
+            _text(attrs.get("error")),
+            _text(attrs.get("error_type")),
+            _text(attrs.get("status_code")),
+            _num(attrs.get("duration_ms")),
+        )))
+    elif event_name == EVENT_TOOL_CALL:
+        rows.append(("tool_calls", key + (
+            attrs.get("function_name"),
+            _text(attrs.get("function_args")),
+            _num(attrs.get("duration_ms")),
+            _bool(attrs.get("success")),
+            _text(attrs.get("decision")),
+            _text(attrs.get("error")),
+            _text(attrs.get("error_type")),
+            _text(attrs.get("tool_type")),
+        )))
+    return rows
+
+def metric_point_rows(point: dict) -> List[Tuple[str, tuple]]:
+    """
+    Normalize one metric data point (as flattened by otlp_receiver.py) into
+    (table, row) pairs. Histogram/summary points store count and sum.
+    """
+    attrs = point.get("attributes") or {}
+    return [("metric_points", (
+        point["name"],
+        point.get("timestamp") or "",
+        get_session_id(attrs),
+        point.get("unit"),
+        json.dumps(attrs, ensure_ascii=False, sort_keys=True, default=str),
+        _num(point.get("value")),
+        _num(point.get("count")),
+        _num(point.get("sum")),
+    ))]
+
+# ---------- Store ----------
+class TelemetryDB:
+    """
+    Connection to the telemetry database.
+
+    Rows are buffered and written with executemany() in one transaction on
+    flush(), so feeding a record costs no I/O by itself. Not thread-safe:
+    a caller feeding it from several threads (the OTLP receiver) serializes
+    access itself.
+    """
+
+    def __init__(self, path: Path = DEFAULT_DB_FILE, batch_size: int = 5000):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._pending: List[Tuple[str, tuple]] = []
+
+    def ingest(self, record: dict):
+        """Queue the rows of one telemetry record."""
+        self.add_rows(record_rows(record))
+
+    def ingest_metric(self, point: dict):
+        """Queue one metric data point."""
+        self.add_rows(metric_point_rows(point))
+
+    def add_rows(self, rows: Iterable[Tuple[str, tuple]]):
+        """Queue rows produced by record_rows()."""
+        self._pending.extend(rows)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write queued rows in a single transaction."""
+        if not self._pending:
+            return
+        by_table = {}
+        for table, row in self._pending:
+            by_table.setdefault(table, []).append(row)
+        with self.conn:
+            # Parents first so readers never see orphaned rows
+            for table in STATEMENTS:
+                if table in by_table:
+                    self.conn.executemany(STATEMENTS[table], by_table[table])
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+# ---------- Queries ----------
+def sessions_using_model(conn: sqlite3.Connection, model: str, days: Optional[int] = None) -> List[tuple]:
+    """(session_id, first_seen, requests) for sessions that sent requests to `model`."""
+    since = ""
+    if days is not None:
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
+    return conn.execute("""
+        SELECT r.session_id, s.first_seen, COUNT(*)
+        FROM requests r JOIN sessions s ON s.session_id = r.session_id
+        WHERE r.model = ? AND r.timestamp >= ?
+        GROUP BY r.session_id ORDER BY s.first_seen DESC
+    """, (model, since)).fetchall()
+
+def slowest_tool_calls(conn: sqlite3.Connection, limit: int = 20) -> List[tuple]:
+    """(duration_ms, function_name, success, session_id, timestamp, function_args), slowest first."""
+    return conn.execute("""
+        SELECT duration_ms, function_name, success, session_id, timestamp, function_args
+        FROM tool_calls WHERE duration_ms IS NOT NULL
+        ORDER BY duration_ms DESC LIMIT ?
+    """, (limit,)).fetchall()
+
+# ---------- Main Function ----------
+def main():
+    parser = argparse.ArgumentParser(description="Query the Gemini CLI telemetry database")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_FILE,
+                        help=f"Database file (default: {DEFAULT_DB_FILE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("sessions", help="Sessions that used a model")
+    p.add_argument("--model", required=True)
+    p.add_argument("--days", type=int, help="Only the last N days")
+
+    p = sub.add_parser("slow-tools", help="Slowest tool calls")
+    p.add_argument("--limit", type=int, default=20)
+
+    p = sub.add_parser("sql", help="Run a read-only SQL query")
+    p.add_argument("query")
+
+    args = parser.parse_args()
+    if not args.db.exists():
+        print(f"❌ Database not found: {args.db}")
+        print("   Run process-api-requests.py or watcher.py with --db first.")
+        return 1
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    if args.command == "sessions":
+        rows = sessions_using_model(conn, args.model, args.days)
+        for session_id, first_seen, count in rows:
+            print(f"{first_seen or '?':<26} {session_id}  ({count} requests)")
+        print(f"\n{len(rows)} session(s)")
+    elif args.command == "slow-tools":
+        for duration, name, success, session_id, timestamp, fn_args in slowest_tool_calls(conn, args.limit):
+            status = {1: "ok", 0: "failed"}.get(success, "?")
+            print(f"{duration:>10.0f} ms  {name:<24} {status:<6} {timestamp}  {session_id}")
+            if fn_args:
+                print(f"{'':>14}{fn_args[:120]}")
+    else:
+        cursor = conn.execute(args.query)
+        if cursor.description:
+            print("\t".join(col[0] for col in cursor.description))
+        for row in cursor:
+            print("\t".join("" if v is None else str(v) for v in row))
+    conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
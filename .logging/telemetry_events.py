@@ -0,0 +1,114 @@
+"""
+Helpers for Gemini CLI telemetry records (OTLP-style log records from
+log.jsonl): field extraction and the reduction of a record to the
+(session_id, prompt_id, timestamp, kind, payload) op that session grouping
+works on.
+
+Shared by process-api-requests.py and server.py. Stdlib only.
+"""
+
+from __future__ import annotations
+import json
+from typing import List, Optional
+
+# Event types we care about
+EVENT_REQUEST = "gemini_cli.api_request"
+EVENT_RESPONSE = "gemini_cli.api_response"
+EVENT_ERROR = "gemini_cli.api_error"
+
+def extract_attributes(record: dict) -> dict:
+    """Extract attributes from OTLP-style record."""
+    return record.get("attributes", {}) if isinstance(record.get("attributes"), dict) else {}
+
+def get_prompt_id(attrs: dict) -> Optional[str]:
+    """Extract prompt_id from attributes."""
+    return attrs.get("prompt_id")
+
+def get_session_id(attrs: dict) -> Optional[str]:
+    """Extract session.id from attributes."""
+    return attrs.get("session.id")
+
+def get_event_timestamp(record: dict) -> Optional[str]:
+    """Extract timestamp from record."""
+    # Try attributes first (where event.timestamp actually is)
+    attrs = extract_attributes(record)
+    timestamp = attrs.get("event.timestamp")
+    if timestamp:
+        return timestamp
+    # Fallbacks for other formats
+    return (record.get("timestamp") or
+            record.get("event_timestamp") or
+            record.get("time"))
+
+def get_event_name(record: dict) -> Optional[str]:
+    """Extract event name from record."""
+    attrs = extract_attributes(record)
+    return attrs.get("event.name") or record.get("event") or record.get("name")
+
+def parse_json_fields(attrs: dict, fields: List[str], verbose: bool = False) -> dict:
+    """
+    Parse JSON string fields into objects for cleaner output.
+
+    Args:
+        attrs: Attribute dictionary potentially containing JSON strings
+        fields: List of field names to attempt parsing
+        verbose: Enable debug output
+
+    Returns:
+        New dict with parsed fields
+    """
+    result = attrs.copy()
+
+    for field in fields:
+        if field in result and isinstance(result[field], str):
+            try:
+                parsed = json.loads(result[field])
+                result[field] = parsed
+                if verbose:
+                    print(f"   ✓ Parsed JSON field: {field}")
+            except (json.JSONDecodeError, TypeError, ValueError) as e:
+                # Keep as string if parsing fails
+                if verbose:
+                    print(f"   ⚠ Could not parse {field}: {e}")
+                pass
+
+    return result
+
+# Fields that commonly contain JSON strings
+JSON_STRING_FIELDS = [
+    "request_text",
+    "response_text",
+    "function_args",  # tool arguments might be JSON strings
+]
+
+# Maps event names to the entry field they fill
+EVENT_KINDS = {
+    EVENT_REQUEST: "request",
+    EVENT_RESPONSE: "response",
+    EVENT_ERROR: "error",
+}
+
+def record_to_op(record: dict, verbose: bool = False, parse_json: bool = True) -> Optional[tuple]:
+    """
+    Reduce a telemetry record to what session grouping needs:
+    (session_id, prompt_id, timestamp, kind, payload).
+
+    Returns None for records without session_id or prompt_id. `kind` is
+    "request"/"response"/"error" or None for other events; `payload` holds
+    the attributes for API events, with JSON_STRING_FIELDS parsed unless
+    `parse_json` is False (raw passthrough: the fields stay the encoded
+    text Gemini wrote, and readers decode them on demand).
+    """
+    attrs = extract_attributes(record)
+    prompt_id = get_prompt_id(attrs)
+    session_id = get_session_id(attrs)
+    if not session_id or not prompt_id:
+        return None
+    kind = EVENT_KINDS.get(get_event_name(record))
+    if not kind:
+        payload = None
+    elif parse_json:
+        payload = parse_json_fields(attrs, JSON_STRING_FIELDS, verbose)
+    else:
+        payload = dict(attrs)
+    return (session_id, prompt_id, get_event_timestamp(record), kind, payload)
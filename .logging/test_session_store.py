@@ -0,0 +1,73 @@
+"""
+Tests for session_store.SessionStore.
+
+Run from the .logging directory:
+    python -m unittest test_session_store
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from session_store import SessionStore, index_path, load_index
+
+
+def entry(prompt_id: str, text: str = "x") -> dict:
+    return {"request": {"prompt_id": prompt_id, "text": text}, "response": None, "error": None}
+
+
+class SessionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "session.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def upsert(self, *entries: dict):
+        store = SessionStore(self.path)
+        for e in entries:
+            store.upsert(e["request"]["prompt_id"], e)
+        store.close()
+
+    def assert_canonical(self, expected: list):
+        text = self.path.read_text(encoding="utf-8")
+        self.assertEqual(text, json.dumps(expected, indent=2, ensure_ascii=False))
+
+    def test_append_and_replace(self):
+        self.upsert(entry("1"), entry("2"), entry("2", "y"), entry("3"), entry("1", "z"))
+        self.assert_canonical([entry("1", "z"), entry("2", "y"), entry("3")])
+
+    def test_replace_after_index_rebuild(self):
+        self.upsert(entry("1"), entry("2"))
+        for text in ("a", "b", "c"):
+            index_path(self.path).unlink()
+            self.upsert(entry("2", text))
+        index_path(self.path).unlink()
+        self.upsert(entry("1", "d"))
+        self.assert_canonical([entry("1", "d"), entry("2", "c")])
+
+    def test_spans_match_rebuilt_index(self):
+        self.upsert(entry("1"), entry("2"), entry("3"))
+        written = load_index(self.path)
+        index_path(self.path).unlink()
+        self.assertEqual(load_index(self.path), written)
+
+    def test_append_after_foreign_tail(self):
+        self.upsert(entry("1"))
+        with self.path.open("ab") as f:
+            f.write(b"\n")
+        self.upsert(entry("2"))
+        self.assert_canonical([entry("1"), entry("2")])
+
+    def test_append_to_resaved_file(self):
+        self.path.write_text(json.dumps([entry("1"), entry("2")], indent=4) + "\n", encoding="utf-8")
+        self.upsert(entry("3"), entry("2", "y"))
+        store = SessionStore(self.path)
+        self.assertEqual([store.get(pid) for pid in ("1", "2", "3")], [entry("1"), entry("2", "y"), entry("3")])
+        self.assertEqual(len(json.loads(self.path.read_text(encoding="utf-8"))), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
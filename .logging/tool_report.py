@@ -0,0 +1,263 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+Tool call report from the watcher's structured tool rows.
+
+watcher.py appends one JSON row per gemini_cli.tool_call to
+.logging/sessions/<folder>/tools.jsonl:
+
+    {"time", "session", "prompt_id", "tool", "success", "duration_ms",
+     "error_type", "args"}
+
+This script reads every tools.jsonl in one streaming pass and reports, per
+tool, the call count, failure rate and latency percentiles (p50/p95/p99,
+via metrics_agg.LogSketch), optionally broken down per hour or day, plus the
+slowest argument patterns across all sessions. Nothing but the aggregates is
+kept in memory.
+
+An argument pattern groups calls that did the same kind of work:
+    run_shell_command  command=git      (first word of the command)
+    read_file          file_path=*.py   (file extension)
+    web_fetch          url=github.com   (host)
+    other tools        keys=a,b         (sorted argument names)
+
+Usage:
+    uv run .logging/tool_report.py [--since 2025-10-01] [--until ...] [--days N]
+                                   [--by hour|day] [--tool NAME]
+                                   [--min-calls N] [--limit N] [--json]
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from metrics_agg import LogSketch, _number
+
+# ---------- Configuration ----------
+BASE = Path(".")
+SESS_BASE = BASE / ".logging" / "sessions"
+TOOLS_FILE = "tools.jsonl"
+
+WINDOW_FORMATS = {"hour": "%Y-%m-%dT%H:00Z", "day": "%Y-%m-%d"}
+PATH_KEYS = ("file_path", "absolute_path", "path", "dir_path")
+# Patterns need this many calls before they are ranked (p95 of 1 call is noise)
+DEFAULT_MIN_CALLS = 3
+DEFAULT_LIMIT = 10
+
+# ---------- Input ----------
+def parse_time(value) -> Optional[datetime]:
+    """Parse an ISO timestamp (naive values are taken as UTC)."""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def iter_rows(sessions_dir: Path) -> Iterator[dict]:
+    """Yield tool rows from every session folder, one line at a time."""
+    for path in sorted(sessions_dir.glob(f"*/{TOOLS_FILE}")):
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # partially written last line
+                if isinstance(row, dict):
+                    yield row
+
+def arg_pattern(args) -> str:
+    """Coarse pattern of a tool call's arguments (see module docstring)."""
+    if not isinstance(args, dict) or not args:
+        return "-"
+    command = args.get("command")
+    if isinstance(command, str) and command.split():
+        return f"command={command.split()[0]}"
+    for key in PATH_KEYS:
+        value = args.get(key)
+        if isinstance(value, str) and value:
+            suffix = PurePosixPath(value.replace("\\", "/")).suffix
+            return f"{key}=*{suffix}" if suffix else f"{key}=(no extension)"
+    url = args.get("url")
+    if isinstance(url, str) and url:
+        return f"url={urlparse(url).hostname or url}"
+    return "keys=" + ",".join(sorted(args))
+
+# ---------- Aggregation ----------
+class ToolStats:
+    """Call count, failures and latency sketch for one group of calls."""
+
+    __slots__ = ("calls", "failures", "unknown", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.unknown = 0
+        self.latency = LogSketch()
+
+    def add(self, row: dict):
+        self.calls += 1
+        success = row.get("success")
+        if success is False:
+            self.failures += 1
+        elif success is None:
+            self.unknown += 1
+        duration = _number(row.get("duration_ms"))
+        if duration is not None:
+            self.latency.add(duration)
+
+    def summary(self) -> dict:
+        known = self.calls - self.unknown
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "failure_rate": round(self.failures / known, 4) if known else None,
+            "latency_ms": self.latency.summary(),
+        }
+
+class ToolReport:
+    """Streaming aggregation of tool rows: per tool, per window and per argument pattern."""
+
+    def __init__(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 by: Optional[str] = None, tool: Optional[str] = None):
+        self.since = since
+        self.until = until
+        self.by = by
+        self.tool = tool
+        self.tools: Dict[str, ToolStats] = {}
+        self.windows: Dict[str, Dict[str, ToolStats]] = {}
+        self.patterns: Dict[Tuple[str, str], ToolStats] = {}
+        self.sessions = set()
+        self.first: Optional[datetime] = None
+        self.last: Optional[datetime] = None
+
+    def add(self, row: dict):
+        name = row.get("tool") or "(unknown)"
+        if self.tool and name != self.tool:
+            return
+        when = parse_time(row.get("time"))
+        if self.since or self.until:
+            if when is None or (self.since and when < self.since) or (self.until and when >= self.until):
+                return
+        if when is not None:
+            self.first = when if self.first is None else min(self.first, when)
+            self.last = when if self.last is None else max(self.last, when)
+        self.sessions.add(row.get("session"))
+
+        self.tools.setdefault(name, ToolStats()).add(row)
+        self.patterns.setdefault((name, arg_pattern(row.get("args"))), ToolStats()).add(row)
+        if self.by:
+            window = when.astimezone(timezone.utc).strftime(WINDOW_FORMATS[self.by]) if when else "(no time)"
+            self.windows.setdefault(window, {}).setdefault(name, ToolStats()).add(row)
+
+    def snapshot(self, min_calls: int = DEFAULT_MIN_CALLS, limit: int = DEFAULT_LIMIT) -> dict:
+        by_calls = sorted(self.tools.items(), key=lambda item: -item[1].calls)
+        ranked = [
+            (key, stats) for key, stats in self.patterns.items()
+            if stats.calls >= min_calls and stats.latency.count
+        ]
+        ranked.sort(key=lambda item: -item[1].latency.quantile(0.95))
+        return {
+            "window": [self.first.isoformat(), self.last.isoformat()] if self.first else None,
+            "calls": sum(stats.calls for stats in self.tools.values()),
+            "sessions": len(self.sessions),
+            "tools": {name: stats.summary() for name, stats in by_calls},
+            "windows": {
+                window: {name: stats.summary() for name, stats in sorted(tools.items())}
+                for window, tools in sorted(self.windows.items())
+            },
+            "slowest_patterns": [
+                {"tool": name, "pattern": pattern, **stats.summary()}
+                for (name, pattern), stats in ranked[:limit]
+            ],
+        }
+
+def build_report(sessions_dir: Path, **options) -> ToolReport:
+    """Single pass over all tools.jsonl files."""
+    report = ToolReport(**options)
+    for row in iter_rows(sessions_dir):
+        report.add(row)
+    return report
+
+# ---------- Output ----------
+def _format_stats(label: str, summary: dict, width: int = 32) -> str:
+    rate = summary["failure_rate"]
+    rate_s = f"{rate * 100:5.1f}%" if rate is not None else "    -"
+    latency = summary["latency_ms"]
+    if not latency.get("count"):
+        return f"   {label:<{width}} n={summary['calls']:<6} fail={rate_s}  -"
+    return (f"   {label:<{width}} n={summary['calls']:<6} fail={rate_s}  p50={latency['p50']:>9.1f}  "
+            f"p95={latency['p95']:>9.1f}  p99={latency['p99']:>9.1f}  max={latency['max']:>9.1f}")
+
+def print_report(snapshot: dict, min_calls: int):
+    window = snapshot["window"]
+    span = f"{window[0]} – {window[1]}" if window else "no timestamps"
+    print(f"🔧 Tool calls: {snapshot['calls']:,} in {snapshot['sessions']} sessions ({span})")
+
+    print("\n⏱️  Per tool (ms)")
+    for name, summary in snapshot["tools"].items():
+        print(_format_stats(name, summary))
+    if not snapshot["tools"]:
+        print("   -")
+
+    for window_name, tools in snapshot["windows"].items():
+        print(f"\n🗓️  {window_name}")
+        for name, summary in tools.items():
+            print(_format_stats(name, summary))
+
+    print(f"\n🐢 Slowest argument patterns (by p95, ≥{min_calls} calls)")
+    for row in snapshot["slowest_patterns"]:
+        print(_format_stats(f"{row['tool']}  {row['pattern']}", row, width=48))
+    if not snapshot["slowest_patterns"]:
+        print("   -")
+
+# ---------- Main Function ----------
+def main():
+    parser = argparse.ArgumentParser(description="Per-tool call counts, failure rates and latency percentiles")
+    parser.add_argument("--sessions", type=Path, default=SESS_BASE,
+                        help=f"Watcher session folders (default: {SESS_BASE})")
+    parser.add_argument("--since", help="Only calls at or after this ISO time/date")
+    parser.add_argument("--until", help="Only calls before this ISO time/date")
+    parser.add_argument("--days", type=int, help="Only calls from the last N days")
+    parser.add_argument("--by", choices=sorted(WINDOW_FORMATS), help="Also break down per hour or day (UTC)")
+    parser.add_argument("--tool", help="Only this tool (function_name)")
+    parser.add_argument("--min-calls", type=int, default=DEFAULT_MIN_CALLS,
+                        help="Minimum calls for an argument pattern to be ranked (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT,
+                        help="Number of slowest argument patterns (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if not args.sessions.exists():
+        print(f"❌ Sessions folder not found: {args.sessions}")
+        return 1
+
+    since = parse_time(args.since) if args.since else None
+    until = parse_time(args.until) if args.until else None
+    if (args.since and since is None) or (args.until and until is None):
+        print("❌ --since/--until must be ISO dates or timestamps")
+        return 1
+    if args.days:
+        since = datetime.now(timezone.utc) - timedelta(days=args.days)
+
+    report = build_report(args.sessions, since=since, until=until, by=args.by, tool=args.tool)
+    snapshot = report.snapshot(args.min_calls, args.limit)
+    if args.json:
+        print(json.dumps(snapshot, indent=2, ensure_ascii=False))
+    else:
+        print_report(snapshot, args.min_calls)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
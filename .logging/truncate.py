@@ -14,7 +14,8 @@ logdir.mkdir(parents=True, exist_ok=True)
 (logdir / "log.jsonl").write_text("", encoding="utf-8")
 
 # reset watcher state so next record starts a new session folder
-state = {"processed_count": 0, "last_size": 0, "current_sid": None, "session_folder": None}
+state = {"offset": 0, "last_size": 0, "inode": None, "signature": "",
+         "current_sid": None, "session_folder": None}
 (logdir / ".state.json").write_text(json.dumps(state), encoding="utf-8")
 
 print("New session: truncated .logging/log.jsonl and reset watcher state.")
@@ -1,10 +1,10 @@
 #!/usr/bin/env -S uv run --script
 # /// script
 # requires-python = ">=3.10"
-# dependencies = ["ijson>=3.2.3","watchfiles>=0.21"]
+# dependencies = ["watchfiles>=0.21"]
 # ///
 """
-Gemini telemetry watcher using ijson (streaming, multi-value) + watchfiles.
+Gemini telemetry watcher using byte-offset resume (jsonscan) + watchfiles.
 
 - Input: .logging/log.jsonl  (actually pretty-printed JSON objects, back-to-back)
 - Output per session:
@@ -12,27 +12,50 @@ Gemini telemetry watcher using ijson (streaming, multi-value) + watchfiles.
         prompts.log
         responses.log
         tools.log
+        tools.jsonl   (one JSON row per tool call, for tool_report.py)
 
 Session rollover triggers:
-- File truncation/rotation (size shrank → next record opens new folder)
+- File truncation/rotation (size shrank, inode changed or the bytes before
+  the saved offset no longer match → next record opens new folder)
 - Session id changes (attributes["session.id"] or similar)
 
+Resume: .state.json stores the byte offset just past the last complete record,
+so each change event only reads the newly appended tail. A record Gemini is
+still writing is held back until it is complete.
+
+With --db [PATH] every record is also normalized into the SQLite telemetry
+store (telemetry_db.py, default .logging/telemetry.db).
+
+With --stats [SECONDS] the watcher prints its counters every SECONDS
+(default 10): records and bytes processed, per-stage timings
+(pipeline_stats.py), peak memory, and the lag between the log's size (write
+position) and the processed offset.
+
 This script NEVER launches Gemini. Start Gemini yourself.
 """
 
 from __future__ import annotations
+import argparse
+import asyncio
 import json
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Tuple
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, List, Optional, TextIO, Tuple
 
-import ijson
 from watchfiles import awatch, Change
 
+from jsonscan import iter_values
+from pipeline_stats import PipelineStats
+from telemetry_db import DEFAULT_DB_FILE, TelemetryDB
+
 BASE = Path(".")
 LOG_FILE = BASE / ".logging" / "log.jsonl"
 SESS_BASE = BASE / ".logging" / "sessions"
 STATE_FILE = BASE / ".logging" / ".state.json"
+# Bytes kept from just before the saved offset to detect in-place rewrites
+SIGNATURE_BYTES = 64
 SESS_BASE.mkdir(parents=True, exist_ok=True)
 
 # ---------- helpers ----------
@@ -71,6 +94,8 @@ def normalize(rec: dict) -> dict:
     tool_args = attrs.get("function_args", {}) or {}
     tool_ok = attrs.get("success", "")
     tool_dur = attrs.get("duration_ms", "")
+    tool_error = attrs.get("error_type", "") or ""
+    prompt_id = attrs.get("prompt_id", "") or ""
     return {
         "event": event,
         "time": t,
@@ -84,6 +109,8 @@ def normalize(rec: dict) -> dict:
         "tool_args": tool_args,
         "tool_ok": tool_ok,
         "tool_dur": tool_dur,
+        "tool_error": tool_error,
+        "prompt_id": prompt_id,
     }
 
 def open_session_folder(first_info: dict, suffix_bump: int = 0) -> Path:
@@ -97,127 +124,332 @@ def open_session_folder(first_info: dict, suffix_bump: int = 0) -> Path:
     folder.mkdir(parents=True, exist_ok=True)
     return folder
 
-def write_prompt(folder: Path, info: dict):
-    with (folder / "prompts.log").open("a", encoding="utf-8") as f:
-        f.write(f"[{ts_folder(info['time'])}] session={info['sid']}\n{info['prompt'].rstrip()}\n---\n")
+class SessionWriter:
+    """
+    Buffered writer for the per-session prompts/responses/tools logs.
+
+    Handles stay open across change events instead of being opened and closed
+    for every telemetry record. Buffered text is flushed once it exceeds
+    `flush_bytes` or is older than `flush_interval` seconds, when a session
+    rolls over, and at the end of every processing pass (before the state
+    offset is saved). At most `max_sessions` session folders keep handles
+    open; the least recently used folder's handles are closed first.
+    """
+
+    def __init__(self, max_sessions: int = 8, flush_bytes: int = 64 * 1024,
+                 flush_interval: float = 1.0):
+        self.max_sessions = max_sessions
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._handles: "OrderedDict[Path, Dict[str, TextIO]]" = OrderedDict()
+        self._pending: Dict[Path, List[str]] = {}
+        self._pending_bytes = 0
+        self._oldest: Optional[float] = None
+
+    def write(self, folder: Path, name: str, text: str):
+        self._pending.setdefault(folder / name, []).append(text)
+        self._pending_bytes += len(text)
+        if self._oldest is None:
+            self._oldest = monotonic()
+        if (self._pending_bytes >= self.flush_bytes
+                or monotonic() - self._oldest >= self.flush_interval):
+            self.flush()
+
+    def _handle(self, path: Path) -> TextIO:
+        folder = path.parent
+        files = self._handles.get(folder)
+        if files is None:
+            while len(self._handles) >= self.max_sessions:
+                _, old_files = self._handles.popitem(last=False)
+                for f in old_files.values():
+                    f.close()
+            files = self._handles[folder] = {}
+        else:
+            self._handles.move_to_end(folder)
+        f = files.get(path.name)
+        if f is None:
+            f = files[path.name] = path.open("a", encoding="utf-8")
+        return f
+
+    def flush(self):
+        """Write all buffered text and flush the touched handles."""
+        for path, parts in self._pending.items():
+            f = self._handle(path)
+            f.write("".join(parts))
+            f.flush()
+        self._pending.clear()
+        self._pending_bytes = 0
+        self._oldest = None
 
-def write_resp(folder: Path, info: dict):
-    with (folder / "responses.log").open("a", encoding="utf-8") as f:
-        f.write(
-            f"[{ts_folder(info['time'])}] session={info['sid']} model={info['model']} "
-            f"tokens(in={info['in_tok']},out={info['out_tok']})\n{info['resp'].rstrip()}\n---\n"
-        )
+    def close(self):
+        self.flush()
+        for files in self._handles.values():
+            for f in files.values():
+                f.close()
+        self._handles.clear()
+
+def write_prompt(writer: SessionWriter, folder: Path, info: dict):
+    writer.write(folder, "prompts.log",
+                 f"[{ts_folder(info['time'])}] session={info['sid']}\n{info['prompt'].rstrip()}\n---\n")
+
+def write_resp(writer: SessionWriter, folder: Path, info: dict):
+    writer.write(
+        folder, "responses.log",
+        f"[{ts_folder(info['time'])}] session={info['sid']} model={info['model']} "
+        f"tokens(in={info['in_tok']},out={info['out_tok']})\n{info['resp'].rstrip()}\n---\n"
+    )
+
+def _as_bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    return None
+
+def _as_number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def tool_row(info: dict) -> dict:
+    """Machine-readable tool call row (tools.jsonl); types normalized, args decoded."""
+    args = info["tool_args"]
+    if isinstance(args, str):
+        try:
+            args = json.loads(args)
+        except ValueError:
+            pass
+    return {
+        "time": info["time"],
+        "session": info["sid"],
+        "prompt_id": info["prompt_id"] or None,
+        "tool": info["tool_name"],
+        "success": _as_bool(info["tool_ok"]),
+        "duration_ms": _as_number(info["tool_dur"]),
+        "error_type": info["tool_error"] or None,
+        "args": args,
+    }
 
-def write_tool(folder: Path, info: dict):
+def write_tool(writer: SessionWriter, folder: Path, info: dict):
     try:
         args_s = json.dumps(info["tool_args"], ensure_ascii=False)
     except Exception:
         args_s = str(info["tool_args"])
-    with (folder / "tools.log").open("a", encoding="utf-8") as f:
-        f.write(
-            f"[{ts_folder(info['time'])}] session={info['sid']} tool={info['tool_name']} "
-            f"success={info['tool_ok']} duration_ms={info['tool_dur']}\nargs={args_s}\n---\n"
-        )
+    writer.write(
+        folder, "tools.log",
+        f"[{ts_folder(info['time'])}] session={info['sid']} tool={info['tool_name']} "
+        f"success={info['tool_ok']} duration_ms={info['tool_dur']}\nargs={args_s}\n---\n"
+    )
+    writer.write(folder, "tools.jsonl", json.dumps(tool_row(info), ensure_ascii=False, default=str) + "\n")
 
 # ---------- state handling ----------
+def fresh_state() -> dict:
+    return {"offset": 0, "last_size": 0, "inode": None, "signature": "",
+            "current_sid": None, "session_folder": None}
+
 def load_state() -> dict:
     if STATE_FILE.exists():
         try:
-            return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+            state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+            return {**fresh_state(), **state}
         except Exception:
             pass
-    return {"processed_count": 0, "last_size": 0, "current_sid": None, "session_folder": None}
+    return fresh_state()
 
 def save_state(state: dict):
     STATE_FILE.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
 
+def read_signature(f, offset: int) -> str:
+    """Hex of the bytes just before `offset` (the tail of the last record)."""
+    start = max(0, offset - SIGNATURE_BYTES)
+    f.seek(start)
+    return f.read(offset - start).hex()
+
+def resume_offset(f, state: dict, size: int, inode: int) -> int:
+    """
+    Return the byte offset to continue from, or 0 if the file was truncated,
+    rotated or rewritten since the state was saved.
+    """
+    offset = state.get("offset", 0)
+
+    # Pre-offset state files only know how many records were handled;
+    # translate that into a byte offset once.
+    if "processed_count" in state:
+        count = state.pop("processed_count")
+        offset = 0
+        for i, (_, end, _) in enumerate(iter_values(f)):
+            if i >= count:
+                break
+            offset = end
+        return offset
+
+    if size < offset or size < state.get("last_size", 0):
+        return 0
+    if state.get("inode") is not None and state["inode"] != inode:
+        return 0
+    if offset and read_signature(f, offset) != state.get("signature"):
+        return 0
+    return offset
+
 # ---------- processing ----------
-def process_all(state: dict) -> dict:
+def process_all(state: dict, writer: SessionWriter, db: Optional[TelemetryDB] = None,
+                stats: Optional[PipelineStats] = None) -> dict:
     """
-    Re-parse the file and process only NEW objects by skipping first N=processed_count.
-    This avoids partial-object issues and keeps the code simple.
+    Process records appended since the saved byte offset.
+    Only complete records are consumed; a partially written trailing object
+    stays after the offset and is picked up on the next change.
+    `stats` collects stage timings (scan, parse, db, normalize, session,
+    write, flush), record/byte counters and the offset/size gauges.
     """
     if not LOG_FILE.exists():
         return state
+    stats = stats or PipelineStats(enabled=False)
+    stats.skip()
 
-    size = LOG_FILE.stat().st_size
-    # Detect truncation/rotation
-    if size < state.get("last_size", 0):
-        state["processed_count"] = 0
-        state["current_sid"] = None
-        state["session_folder"] = None
+    stat = LOG_FILE.stat()
+    size = stat.st_size
+    inode = stat.st_ino
 
-    processed = 0
     new_objs = 0
     session_folder: Optional[Path] = Path(state["session_folder"]) if state.get("session_folder") else None
     current_sid = state.get("current_sid")
 
     with LOG_FILE.open("rb") as f:
-        try:
-            # ijson will iterate over multiple concatenated JSON values
-            records = ijson.items(f, "", multiple_values=True)
-            for rec in records:
-                processed += 1
-                if processed <= state.get("processed_count", 0):
-                    continue  # already handled in a previous run
-
-                info = normalize(rec)
-
-                # rotate session folder on session id change or if none yet
-                if info["sid"] != current_sid or session_folder is None:
-                    # new folder based on this record's timestamp
-                    session_folder = open_session_folder(info)
-                    current_sid = info["sid"]
-
-                # route by event
-                ev = info["event"]
-                if ev == "gemini_cli.user_prompt":
-                    write_prompt(session_folder, info)
-                elif ev == "gemini_cli.api_response":
-                    write_resp(session_folder, info)
-                elif ev == "gemini_cli.tool_call":
-                    write_tool(session_folder, info)
-                # else ignore other events (config, metrics, etc.)
-
-                new_objs += 1
+        offset = resume_offset(f, state, size, inode)
+        if offset == 0 and state.get("offset", 0) > 0:
+            # Truncation/rotation: next record opens a new session folder
+            writer.flush()
+            session_folder = None
+            current_sid = None
 
-        except Exception:
-            # Likely trailing incomplete JSON while Gemini is writing; ignore for now.
-            print("Failed to parse line:", rec)
-            pass
+        start_offset = offset
+        for _, end, raw in iter_values(f, offset):
+            stats.lap("scan")
+            try:
+                rec = json.loads(raw)
+            except ValueError:
+                print("Failed to parse record at offset", offset)
+                offset = end
+                continue
+            offset = end
+            stats.lap("parse")
+            if not isinstance(rec, dict):
+                continue
+            if db is not None:
+                db.ingest(rec)
+                stats.lap("db")
+
+            info = normalize(rec)
+            stats.lap("normalize")
+
+            # rotate session folder on session id change or if none yet
+            if info["sid"] != current_sid or session_folder is None:
+                writer.flush()
+                # new folder based on this record's timestamp
+                session_folder = open_session_folder(info)
+                current_sid = info["sid"]
+                stats.lap("session")
+
+            # route by event
+            ev = info["event"]
+            if ev == "gemini_cli.user_prompt":
+                write_prompt(writer, session_folder, info)
+            elif ev == "gemini_cli.api_response":
+                write_resp(writer, session_folder, info)
+            elif ev == "gemini_cli.tool_call":
+                write_tool(writer, session_folder, info)
+            # else ignore other events (config, metrics, etc.)
+
+            new_objs += 1
+            stats.lap("write")
+
+        signature = read_signature(f, offset)
+
+    # Everything up to `offset` must be on disk before the offset is saved
+    writer.flush()
+    if db is not None:
+        db.flush()
+    stats.lap("flush")
+    stats.count("records", new_objs)
+    stats.count("processed_bytes", offset - start_offset)
+    stats.set("offset", offset)
+    stats.set("log_size", size)
 
     # update state
-    state["processed_count"] = processed
+    changed = new_objs or offset != state.get("offset") or inode != state.get("inode")
+    state["offset"] = offset
     state["last_size"] = size
+    state["inode"] = inode
+    state["signature"] = signature
     state["current_sid"] = current_sid
     state["session_folder"] = str(session_folder) if session_folder else None
-    if new_objs:
+    if changed:
         save_state(state)
     return state
 
+# ---------- stats ----------
+def format_lag(stats: PipelineStats) -> str:
+    """One-line counters with the lag between the log's size and the processed offset."""
+    try:
+        size = LOG_FILE.stat().st_size
+    except OSError:
+        size = 0
+    lag = max(size - stats.gauges.get("offset", 0), 0)
+    stages = "  ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in
+                       sorted(stats.seconds.items(), key=lambda item: -item[1])[:4])
+    return (f"📈 records={stats.counters['records']:,} "
+            f"processed={stats.counters['processed_bytes'] / 1e6:.2f}MB lag={lag:,}B  {stages}  "
+            f"peak={stats.snapshot()['peak_rss_mb']}MB")
+
+async def report_stats(stats: PipelineStats, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        print(format_lag(stats), flush=True)
+
 # ---------- watcher main ----------
-async def main():
+async def main(db_path: Optional[Path] = None, stats_interval: Optional[float] = None):
     # Ensure folder exists; don’t create/clear the log (user controls it)
     LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
 
     # Prime once (in case the file already has content)
+    writer = SessionWriter()
+    db = TelemetryDB(db_path) if db_path else None
+    stats = PipelineStats(enabled=stats_interval is not None)
+    reporter = asyncio.create_task(report_stats(stats, stats_interval)) if stats.enabled else None
     state = load_state()
-    state = process_all(state)
-
-    # React to changes
-    async for changes in awatch(LOG_FILE.parent, debounce=150):
-        # only act if our file changed
-        if not any(str(p) == str(LOG_FILE) and (chg in (Change.modified, Change.added) or Change.deleted)
-                   for chg, p in changes):
-            continue
-        # if deleted, just reset counters and wait for re-creation
-        if any(chg == Change.deleted and str(p) == str(LOG_FILE) for chg, p in changes):
-            state = {"processed_count": 0, "last_size": 0, "current_sid": None, "session_folder": None}
-            save_state(state)
-            continue
-        # modified/added → (re)process
-        state = process_all(state)
+    state = process_all(state, writer, db, stats)
+
+    # React to changes (watchfiles reports absolute paths)
+    log_path = str(LOG_FILE.resolve())
+    try:
+        async for changes in awatch(LOG_FILE.parent, debounce=150):
+            # only act if our file changed
+            if not any(p == log_path and (chg in (Change.modified, Change.added) or Change.deleted)
+                       for chg, p in changes):
+                continue
+            # if deleted, just reset counters and wait for re-creation
+            if any(chg == Change.deleted and p == log_path for chg, p in changes):
+                state = fresh_state()
+                save_state(state)
+                continue
+            # modified/added → (re)process
+            state = process_all(state, writer, db, stats)
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+            print(stats.format("Watcher stats"))
+        writer.close()
+        if db is not None:
+            db.close()
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Watch Gemini telemetry and split it into session folders")
+    parser.add_argument("--db", type=Path, nargs="?", const=DEFAULT_DB_FILE, metavar="PATH",
+                        help=f"Also feed the SQLite telemetry store (default: {DEFAULT_DB_FILE})")
+    parser.add_argument("--stats", type=float, nargs="?", const=10.0, metavar="SECONDS",
+                        help="Print counters, stage timings and processing lag every SECONDS (default: 10)")
+    args = parser.parse_args()
+    asyncio.run(main(args.db, args.stats))
@@ -7,25 +7,66 @@ Extracts data from project logs, git history, and code to help fill out
 the IBE160 reflection report.
 
 Usage:
-    python extract-reflection-data.py
+    python extract-reflection-data.py [--rebuild]
 
 Output:
     reflection-data.md - Markdown file with all extracted data
+
+Session files are read in one streaming pass that feeds both the prompt and
+the AI usage extractors. Per-file results are cached in
+.logging/.reflection-cache.json by path, size and mtime, so after adding one
+session only that session is read again.
+Git statistics come from a single `git log` pass and are cached by HEAD sha.
+Code metrics count the lines of every code file (one pruned directory walk,
+line counts cached per file by size and mtime).
+--rebuild ignores all cached results.
 """
 
+import argparse
 import json
 import os
 import subprocess
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / ".logging"))
+from session_archive import iter_session_raw
+from session_store import expand_entry, is_deduplicated, load_chunks
+
+# Bump when the cached per-file results change shape
+CACHE_VERSION = 1
+PROMPTS_PER_SESSION = 10
+MAX_PROMPT_CHARS = 500
+
+# git log --format fields/records (separators that never occur in commit text)
+GIT_FIELD = "\x1f"
+GIT_RECORD = "\x1e"
+GIT_LOG_FORMAT = "%h%x1f%an%x1f%s%x1f%b%x1e"
+RECENT_COMMITS = 20
+CHALLENGE_PATTERN = re.compile(r"fix|bug|error")
+MAX_CHALLENGES = 10
+DIFF_RANGE = "HEAD~10..HEAD"
+
+CODE_EXTENSIONS = {".ts", ".tsx", ".js", ".jsx"}
+TYPESCRIPT_EXTENSIONS = {".ts", ".tsx"}
+# Pruned while walking (dependencies, build output, VCS data)
+IGNORED_DIRS = {"node_modules", ".next", ".git"}
+KEY_FILE_MIN_LINES = 50
+READ_BUFFER = 1 << 20
 
 class ReflectionDataExtractor:
-    def __init__(self, project_root: str = "."):
+    def __init__(self, project_root: str = ".", use_cache: bool = True):
         self.project_root = Path(project_root)
         self.logging_dir = self.project_root / ".logging" / "requests"
         self.output_file = self.project_root / "reflection-data.md"
+        self.cache_file = self.project_root / ".logging" / ".reflection-cache.json"
+        self.cache = self._load_cache() if use_cache else self._empty_cache()
+        self._sessions = None
+        self._git_history = None
 
     def extract_all(self):
         """Extract all data and generate markdown report"""
@@ -41,8 +82,31 @@ class ReflectionDataExtractor:
         }
 
         self.generate_markdown_report(data)
+        self._save_cache()
         print(f"\n✅ Report generated: {self.output_file}")
 
+    def _empty_cache(self) -> Dict[str, Any]:
+        return {"version": CACHE_VERSION, "sessions": {}}
+
+    def _load_cache(self) -> Dict[str, Any]:
+        """Load cached per-file results (empty if missing, unreadable or outdated)"""
+        try:
+            cache = json.loads(self.cache_file.read_text(encoding="utf-8"))
+            if isinstance(cache, dict) and cache.get("version") == CACHE_VERSION:
+                return cache
+        except (OSError, ValueError):
+            pass
+        return self._empty_cache()
+
+    def _save_cache(self):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.cache, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.cache_file)
+        except OSError as e:
+            print(f"    ⚠️  Could not write cache {self.cache_file}: {e}")
+
     def extract_tech_stack(self) -> Dict[str, Any]:
         """Extract technology stack from package.json"""
         print("  📦 Extracting tech stack...")
@@ -71,38 +135,96 @@ class ReflectionDataExtractor:
         backend_keywords = ["prisma", "zod", "next-auth", "ai", "anthropic", "azure"]
         return [dep for dep in deps.keys() if any(kw in dep.lower() for kw in backend_keywords)]
 
+    def _session_files(self) -> List[Path]:
+        """Session files in the logging directory (.json and .archive)"""
+        return sorted(self.logging_dir.glob("*.json")) + sorted(self.logging_dir.glob("*.archive"))
+
+    def scan_sessions(self) -> List[Dict[str, Any]]:
+        """Summarize every session file in one streaming pass, reusing cached summaries"""
+        if self._sessions is not None:
+            return self._sessions
+        self._sessions = []
+        if not self.logging_dir.exists():
+            return self._sessions
+
+        cached = self.cache.get("sessions", {})
+        current = {}
+        files = self._session_files()
+        read = 0
+        for session_file in files:
+            stat = session_file.stat()
+            key = session_file.name
+            entry = cached.get(key)
+            if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                try:
+                    summary = self._summarize_session(session_file)
+                except Exception as e:
+                    print(f"    ⚠️  Error reading {session_file.name}: {e}")
+                    continue
+                entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "summary": summary}
+                read += 1
+            current[key] = entry
+            self._sessions.append(entry["summary"])
+
+        # Files that disappeared drop out of the cache
+        self.cache["sessions"] = current
+        print(f"    🗂️  {len(files)} session files ({read} read, {len(files) - read} cached)")
+        return self._sessions
+
+    def _summarize_session(self, session_file: Path) -> Dict[str, Any]:
+        """Key prompts and usage totals of one session file, entry by entry"""
+        prompts = []
+        usage = {"prompts": 0, "input_tokens": 0, "output_tokens": 0, "duration_ms": 0}
+        models = set()
+        chunks = None
+        decoded = {}
+
+        for i, raw in enumerate(iter_session_raw(session_file)):
+            entry = json.loads(raw)
+            request = entry.get("request") or {}
+            response = entry.get("response") or {}
+
+            usage["prompts"] += 1
+            usage["input_tokens"] += response.get("input_token_count", 0) or 0
+            usage["output_tokens"] += response.get("output_token_count", 0) or 0
+            usage["duration_ms"] += response.get("duration_ms", 0) or 0
+            if request.get("model"):
+                models.add(request["model"])
+
+            # Only the first prompts per session are reported; skip decoding the rest
+            if i < PROMPTS_PER_SESSION and request.get("request_text"):
+                if is_deduplicated(entry):
+                    if chunks is None:
+                        chunks = load_chunks(session_file)
+                    request = expand_entry(entry, chunks, decoded)["request"]
+                prompt_text = self._extract_prompt_text(self._decode_json_field(request["request_text"]))
+                prompts.append({
+                    "timestamp": request.get("event.timestamp", ""),
+                    "prompt": prompt_text[:MAX_PROMPT_CHARS] + "..." if len(prompt_text) > MAX_PROMPT_CHARS else prompt_text,
+                    "model": request.get("model", "unknown"),
+                    "input_tokens": response.get("input_token_count", 0),
+                    "output_tokens": response.get("output_token_count", 0),
+                    "duration_ms": response.get("duration_ms", 0)
+                })
+
+        usage["models"] = sorted(models)
+        return {"prompts": prompts, "usage": usage}
+
     def extract_prompts(self) -> List[Dict[str, Any]]:
         """Extract key prompts from logging directory"""
         print("  💬 Extracting AI prompts...")
 
-        if not self.logging_dir.exists():
-            return []
+        prompts = [prompt for session in self.scan_sessions() for prompt in session["prompts"]]
+        return prompts[:20]  # Return top 20 prompts
 
-        prompts = []
-        for json_file in self.logging_dir.glob("*.json"):
+    def _decode_json_field(self, value: Any) -> Any:
+        """Decode fields stored as JSON text (process-api-requests.py --raw)"""
+        if isinstance(value, str) and value[:1] in ("[", "{"):
             try:
-                with open(json_file) as f:
-                    session_data = json.load(f)
-
-                for entry in session_data[:10]:  # First 10 prompts per session
-                    request = entry.get("request", {})
-                    response = entry.get("response", {})
-
-                    if request.get("request_text"):
-                        prompt_text = self._extract_prompt_text(request["request_text"])
-
-                        prompts.append({
-                            "timestamp": request.get("event.timestamp", ""),
-                            "prompt": prompt_text[:500] + "..." if len(prompt_text) > 500 else prompt_text,
-                            "model": request.get("model", "unknown"),
-                            "input_tokens": response.get("input_token_count", 0),
-                            "output_tokens": response.get("output_token_count", 0),
-                            "duration_ms": response.get("duration_ms", 0)
-                        })
-            except Exception as e:
-                print(f"    ⚠️  Error reading {json_file.name}: {e}")
-
-        return prompts[:20]  # Return top 20 prompts
+                return json.loads(value)
+            except ValueError:
+                pass
+        return value
 
     def _extract_prompt_text(self, request_text: Any) -> str:
         """Extract clean text from request"""
@@ -114,45 +236,89 @@ class ReflectionDataExtractor:
                         return parts[0].get("text", "")
         return str(request_text)[:500]
 
+    def _git(self, *args: str) -> str:
+        return subprocess.check_output(
+            ["git", *args],
+            cwd=self.project_root,
+            text=True,
+            encoding="utf-8",
+            errors="replace"
+        )
+
+    def _iter_git_log(self) -> Iterator[List[str]]:
+        """Stream [hash, author, subject, body] per commit of HEAD's history"""
+        process = subprocess.Popen(
+            ["git", "log", f"--format={GIT_LOG_FORMAT}"],
+            cwd=self.project_root,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace"
+        )
+        pending = ""
+        for chunk in iter(lambda: process.stdout.read(1 << 16), ""):
+            records = (pending + chunk).split(GIT_RECORD)
+            pending = records.pop()
+            for record in records:
+                yield record.lstrip("\n").split(GIT_FIELD, 3)
+        process.stdout.close()
+        if process.wait():
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+
+    def _files_changed(self) -> int:
+        try:
+            return len(self._git("diff", "--name-only", DIFF_RANGE).split())
+        except subprocess.CalledProcessError:
+            return 0  # Fewer commits than the range
+
+    def _scan_git_history(self) -> Dict[str, Any]:
+        """One git log pass (diff stats run alongside), cached by HEAD sha"""
+        if self._git_history is not None:
+            return self._git_history
+
+        head = self._git("rev-parse", "HEAD").strip()
+        cached = self.cache.get("git")
+        if cached and cached.get("head") == head:
+            self._git_history = cached["history"]
+            return self._git_history
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            files_changed = pool.submit(self._files_changed)
+
+            total_commits = 0
+            recent_commits = []
+            authors = set()
+            challenges = []
+            for commit, author, subject, body in self._iter_git_log():
+                total_commits += 1
+                authors.add(author)
+                if len(recent_commits) < RECENT_COMMITS:
+                    recent_commits.append(f"{commit} {subject}")
+                if len(challenges) < MAX_CHALLENGES and CHALLENGE_PATTERN.search(subject + "\n" + body):
+                    challenges.append({"commit": commit, "message": subject})
+
+            self._git_history = {
+                "total_commits": str(total_commits),
+                "recent_commits": recent_commits,
+                "contributors": sorted(authors),
+                "files_changed": files_changed.result(),
+                "challenges": challenges
+            }
+
+        self.cache["git"] = {"head": head, "history": self._git_history}
+        return self._git_history
+
     def extract_git_stats(self) -> Dict[str, Any]:
         """Extract git statistics"""
         print("  📊 Extracting git statistics...")
 
         try:
-            # Total commits
-            total_commits = subprocess.check_output(
-                ["git", "rev-list", "--count", "HEAD"],
-                cwd=self.project_root,
-                text=True
-            ).strip()
-
-            # Recent commits
-            recent_commits = subprocess.check_output(
-                ["git", "log", "--oneline", "-20"],
-                cwd=self.project_root,
-                text=True
-            ).strip().split("\n")
-
-            # Contributors
-            contributors = subprocess.check_output(
-                ["git", "log", "--format=%an", "|", "sort", "-u"],
-                cwd=self.project_root,
-                text=True,
-                shell=True
-            ).strip().split("\n")
-
-            # Files changed
-            files_changed = subprocess.check_output(
-                ["git", "diff", "--name-only", "HEAD~10..HEAD"],
-                cwd=self.project_root,
-                text=True
-            ).strip().split("\n")
-
+            history = self._scan_git_history()
             return {
-                "total_commits": total_commits,
-                "recent_commits": recent_commits,
-                "contributors": contributors,
-                "files_changed": len(files_changed)
+                "total_commits": history["total_commits"],
+                "recent_commits": history["recent_commits"],
+                "contributors": history["contributors"],
+                "files_changed": history["files_changed"]
             }
         except Exception as e:
             print(f"    ⚠️  Git stats error: {e}")
@@ -163,23 +329,7 @@ class ReflectionDataExtractor:
         print("  🐛 Extracting technical challenges...")
 
         try:
-            commits = subprocess.check_output(
-                ["git", "log", "--all", "--grep=fix\\|bug\\|error", "--oneline", "-10"],
-                cwd=self.project_root,
-                text=True
-            ).strip().split("\n")
-
-            challenges = []
-            for commit in commits:
-                if commit:
-                    hash_msg = commit.split(" ", 1)
-                    if len(hash_msg) == 2:
-                        challenges.append({
-                            "commit": hash_msg[0],
-                            "message": hash_msg[1]
-                        })
-
-            return challenges
+            return self._scan_git_history()["challenges"]
         except Exception as e:
             print(f"    ⚠️  Challenges extraction error: {e}")
             return []
@@ -197,23 +347,13 @@ class ReflectionDataExtractor:
         total_duration_ms = 0
         models_used = set()
 
-        for json_file in self.logging_dir.glob("*.json"):
-            try:
-                with open(json_file) as f:
-                    session_data = json.load(f)
-
-                for entry in session_data:
-                    total_prompts += 1
-                    response = entry.get("response", {})
-                    total_input_tokens += response.get("input_token_count", 0)
-                    total_output_tokens += response.get("output_token_count", 0)
-                    total_duration_ms += response.get("duration_ms", 0)
-
-                    model = entry.get("request", {}).get("model")
-                    if model:
-                        models_used.add(model)
-            except:
-                pass
+        for session in self.scan_sessions():
+            usage = session["usage"]
+            total_prompts += usage["prompts"]
+            total_input_tokens += usage["input_tokens"]
+            total_output_tokens += usage["output_tokens"]
+            total_duration_ms += usage["duration_ms"]
+            models_used.update(usage["models"])
 
         return {
             "total_prompts": total_prompts,
@@ -225,6 +365,35 @@ class ReflectionDataExtractor:
             "models_used": list(models_used)
         }
 
+    def _iter_code_files(self) -> Iterator[os.DirEntry]:
+        """Walk the project once with scandir, skipping IGNORED_DIRS instead of filtering afterwards"""
+        pending = [str(self.project_root)]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in IGNORED_DIRS:
+                                pending.append(entry.path)
+                        elif os.path.splitext(entry.name)[1] in CODE_EXTENSIONS and entry.is_file():
+                            yield entry
+            except OSError:
+                continue  # Unreadable directory (os.walk skips these too)
+
+    @staticmethod
+    def _count_lines(path: Path) -> Optional[int]:
+        """Count lines like len(readlines()), in binary chunks (None if unreadable)"""
+        lines = 0
+        last = b"\n"
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(READ_BUFFER), b""):
+                    lines += chunk.count(b"\n")
+                    last = chunk[-1:]
+        except OSError:
+            return None
+        return lines + (last != b"\n")
+
     def extract_code_metrics(self) -> Dict[str, Any]:
         """Extract code metrics"""
         print("  📈 Extracting code metrics...")
@@ -236,31 +405,37 @@ class ReflectionDataExtractor:
             "key_files": []
         }
 
-        code_extensions = {".ts", ".tsx", ".js", ".jsx"}
-
-        for ext in code_extensions:
-            files = list(self.project_root.rglob(f"*{ext}"))
-            # Exclude node_modules
-            files = [f for f in files if "node_modules" not in str(f)]
-
-            metrics["total_files"] += len(files)
-            if ext in {".ts", ".tsx"}:
-                metrics["typescript_files"] += len(files)
-
-            for file in files[:5]:  # Sample first 5
-                try:
-                    with open(file) as f:
-                        lines = len(f.readlines())
-                        metrics["total_lines"] += lines
-
-                        if lines > 50:  # Significant files
-                            metrics["key_files"].append({
-                                "path": str(file.relative_to(self.project_root)),
-                                "lines": lines
-                            })
-                except:
-                    pass
-
+        cached = self.cache.get("code", {})
+        current = {}
+        to_count = []
+        for entry in self._iter_code_files():
+            path = os.path.relpath(entry.path, self.project_root)
+            stat = entry.stat()
+            hit = cached.get(path)
+            if hit and hit[0] == stat.st_size and hit[1] == stat.st_mtime_ns:
+                current[path] = hit
+            else:
+                current[path] = [stat.st_size, stat.st_mtime_ns, None]
+                to_count.append(path)
+
+        with ThreadPoolExecutor() as pool:
+            counts = pool.map(lambda path: self._count_lines(self.project_root / path), to_count)
+            for path, lines in zip(to_count, counts):
+                current[path][2] = lines
+
+        for path, (_, _, lines) in sorted(current.items()):
+            metrics["total_files"] += 1
+            if os.path.splitext(path)[1] in TYPESCRIPT_EXTENSIONS:
+                metrics["typescript_files"] += 1
+            if lines is None:
+                continue  # Unreadable
+            metrics["total_lines"] += lines
+            if lines > KEY_FILE_MIN_LINES:  # Significant files
+                metrics["key_files"].append({"path": Path(path).as_posix(), "lines": lines})
+
+        metrics["key_files"].sort(key=lambda f: -f["lines"])
+        self.cache["code"] = {path: hit for path, hit in current.items() if hit[2] is not None}
+        print(f"    📁 {metrics['total_files']} files ({len(to_count)} counted, {len(current) - len(to_count)} cached)")
         return metrics
 
     def generate_markdown_report(self, data: Dict[str, Any]):
@@ -322,7 +497,7 @@ class ReflectionDataExtractor:
             metrics = data["code_metrics"]
             f.write(f"- **Total code files:** {metrics.get('total_files', 0)}\n")
             f.write(f"- **TypeScript files:** {metrics.get('typescript_files', 0)}\n")
-            f.write(f"- **Total lines of code (sampled):** {metrics.get('total_lines', 0):,}\n")
+            f.write(f"- **Total lines of code:** {metrics.get('total_lines', 0):,}\n")
 
             f.write("\n### Key Files\n")
             for file in metrics.get("key_files", [])[:10]:
@@ -332,6 +507,10 @@ class ReflectionDataExtractor:
             f.write("**Use this data to fill out your reflection report!**\n")
 
 if __name__ == "__main__":
-    extractor = ReflectionDataExtractor()
+    parser = argparse.ArgumentParser(description="Extract data for the IBE160 reflection report")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore cached results (session summaries, git statistics, line counts)")
+    args = parser.parse_args()
+
+    extractor = ReflectionDataExtractor(use_cache=not args.rebuild)
     extractor.extract_all()
     print("\n📄 Now fill out the template using reflection-data.md as reference!")